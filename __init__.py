@@ -4,6 +4,6 @@ try:
 	from .extensions import db, login_manager
 	from . import models, services
 except Exception:
-	# fallback when file is executed directly (python __init__.py)
-	from extensions import db, login_manager
-	import models, services
+	# fallback when the project root is on sys.path (scripts, pytest)
+	from backend.extensions import db, login_manager
+	from backend import models, services
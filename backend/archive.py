@@ -0,0 +1,137 @@
+"""Arquivamento dos atendimentos concluídos (``animal`` -> ``animal_history``).
+
+Animais ``Concluído`` há mais de ``ARCHIVE_AFTER_DAYS`` dias saem da tabela
+quente em lotes de ``chunk_size`` linhas. Cada lote roda numa transação:
+
+1. ``INSERT INTO animal_history ... SELECT ... FROM animal`` dos ids do lote
+   (o id original vai para ``animal_history.animal_id``);
+2. ``DELETE FROM animal ... RETURNING`` dos mesmos ids, com o mesmo filtro de
+   status e data de conclusão do passo 1: uma linha alterada depois da
+   leitura dos candidatos não sai de ``animal`` sem ter sido copiada. As colunas
+   devolvidas abatem os contadores materializados (backend/counters.py).
+   Os triggers de busca (FTS5) e de versões (ETags) disparam normalmente;
+3. remoção das marcas de lembrete desses animais.
+
+Um lote interrompido é desfeito inteiro, e a próxima execução continua de
+onde parou. O histórico fica no mesmo arquivo do banco para que a cópia e a
+remoção sejam uma única transação local. Um banco anexado (ATTACH) não tem
+commit atômico entre arquivos no modo WAL.
+
+As listagens e contagens usam só a tabela quente. O histórico entra quando
+pedido (``?historico=1`` na dashboard, :func:`history_summary`).
+"""
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, insert, literal, select
+
+try:
+    from .extensions import db
+    from .models import Animal, AnimalHistory, AppointmentReminder
+    from .counters import apply_deltas, bucket
+    from .stats import grouped_summary
+except Exception:
+    from extensions import db
+    from models import Animal, AnimalHistory, AppointmentReminder
+    from counters import apply_deltas, bucket
+    from stats import grouped_summary
+
+DEFAULT_AFTER_DAYS = 90
+DEFAULT_CHUNK_SIZE = 5000
+COMPLETED = 'Concluído'
+
+# colunas copiadas de animal para animal_history (além de animal_id e archived_at)
+COLUMNS = ('nome', 'especie', 'raca', 'idade', 'contato', 'procedimento', 'dono_id', 'clinic_id',
+           'data_agendamento', 'status', 'token_validated', 'data_conclusao')
+
+
+class ArchiveResult:
+    """Resumo do arquivamento: linhas movidas, lotes e vazão."""
+
+    def __init__(self):
+        self.candidates = 0
+        self.moved = 0
+        self.chunks = 0
+        self.elapsed = 0.0
+        self.dry_run = False
+        self.cutoff = None
+
+    @property
+    def rows_per_second(self):
+        return self.moved / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        if self.dry_run:
+            return f"[simulação] {self.candidates} atendimentos concluídos antes de {self.cutoff:%d/%m/%Y} seriam arquivados"
+        return (f"{self.moved} atendimentos concluídos antes de {self.cutoff:%d/%m/%Y} arquivados em "
+                f"{self.chunks} lotes, {self.elapsed:.2f}s ({self.rows_per_second:.0f} linhas/s)")
+
+
+def archive_criteria(cutoff):
+    return (Animal.status == COMPLETED, Animal.data_conclusao < cutoff)
+
+
+def _move_chunk(ids, cutoff, now):
+    """Move um lote para o histórico; retorna quantas linhas saíram de ``animal``."""
+    in_chunk = (Animal.id.in_(ids), *archive_criteria(cutoff))
+    db.session.execute(
+        insert(AnimalHistory).from_select(
+            ['animal_id', *COLUMNS, 'archived_at'],
+            select(Animal.id, *(getattr(Animal, name) for name in COLUMNS),
+                   literal(now, AnimalHistory.archived_at.type))
+            .where(*in_chunk),
+        )
+    )
+    removed = db.session.execute(
+        delete(Animal).where(*in_chunk)
+        .returning(Animal.clinic_id, Animal.status, Animal.procedimento, Animal.data_agendamento)
+        .execution_options(synchronize_session=False)
+    ).all()
+    deltas = Counter()
+    for row in removed:
+        deltas[bucket(*row)] -= 1
+    apply_deltas(deltas)
+    db.session.execute(delete(AppointmentReminder).where(AppointmentReminder.animal_id.in_(ids)))
+    return len(removed)
+
+
+def archive_completed(older_than_days=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, now=None):
+    """Arquiva os atendimentos concluídos há mais de ``older_than_days`` dias.
+
+    Os ids candidatos são lidos uma vez e movidos em lotes de
+    ``chunk_size``, com um commit por lote.
+    """
+    started = time.perf_counter()
+    if older_than_days is None:
+        config = current_app.config if has_app_context() else {}
+        older_than_days = config.get('ARCHIVE_AFTER_DAYS', DEFAULT_AFTER_DAYS)
+    now = now or datetime.utcnow()
+    result = ArchiveResult()
+    result.cutoff = now - timedelta(days=older_than_days)
+    result.dry_run = dry_run
+
+    ids = db.session.scalars(
+        select(Animal.id).where(*archive_criteria(result.cutoff)).order_by(Animal.id)
+    ).all()
+    result.candidates = len(ids)
+    db.session.commit()
+    if dry_run:
+        return result
+
+    for start in range(0, len(ids), chunk_size):
+        try:
+            result.moved += _move_chunk(ids[start:start + chunk_size], result.cutoff, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        result.chunks += 1
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def history_summary(*criteria):
+    """Totais do histórico no formato de ``stats.dashboard_summary`` (GROUP BY em ``animal_history``)."""
+    return grouped_summary(*criteria, model=AnimalHistory)
@@ -0,0 +1,216 @@
+"""Arquivos estáticos com nome por conteúdo, pré-comprimidos e com cache longo.
+
+``python run.py assets build`` copia cada arquivo de ``frontend/static`` para
+``ASSETS_DIR`` (padrão ``frontend/dist``) com o hash do conteúdo no nome
+(``css/style.3f2a9c1b0d.css``), grava ao lado as versões ``.gz`` e, com o
+módulo ``brotli`` instalado, ``.br`` dos arquivos de texto, e escreve
+``manifest.json`` (nome lógico -> nome com hash). As referências ``url(...)``
+dos CSS são reescritas para os nomes com hash.
+
+Nos templates, ``asset_url('css/style.css')`` resolve pelo manifesto para
+``/assets/css/style.3f2a9c1b0d.css``. Essas URLs nunca mudam de conteúdo,
+então são servidas com ``Cache-Control: public, max-age=31536000, immutable``
+e, conforme o ``Accept-Encoding``, direto do ``.br``/``.gz`` já comprimido.
+Sem manifesto (desenvolvimento, build não rodado) ``asset_url`` cai em
+``url_for('static', ...)`` e nada muda.
+
+Bibliotecas de terceiros (``VENDOR``, versão fixa) ficam versionadas em
+``frontend/static/js/vendor`` e passam pelo mesmo build, para que clínicas
+sem internet não dependam de CDN. ``python run.py assets vendor --force``
+baixa de novo as versões fixadas (ao atualizar uma biblioteca).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só são gerados os .gz
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+ONE_YEAR = 365 * 24 * 3600
+# extensões que valem a pena comprimir (imagens já são comprimidas)
+COMPRESSIBLE = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.html'}
+# codificações servidas, em ordem de preferência
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# bibliotecas de terceiros: caminho em frontend/static -> URL de origem (versão fixa)
+VENDOR = {
+    'js/vendor/chart.umd.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js',
+    'js/vendor/chart.LICENSE.md': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/LICENSE.md',
+}
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+class BuildResult:
+    """Resumo de um build: arquivos copiados e comprimidos."""
+
+    def __init__(self, manifest, gzipped, brotlied, missing_vendor):
+        self.manifest = manifest
+        self.gzipped = gzipped
+        self.brotlied = brotlied
+        self.missing_vendor = missing_vendor
+
+    def summary(self):
+        text = (f'{len(self.manifest)} arquivos, {self.gzipped} .gz, '
+                f'{self.brotlied} .br' + ('' if brotli else ' (módulo brotli não instalado)'))
+        if self.missing_vendor:
+            text += f'; faltando (rode `assets vendor`): {", ".join(self.missing_vendor)}'
+        return text
+
+
+def hashed_name(name, data):
+    """``css/style.css`` -> ``css/style.<hash>.css``."""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    base, ext = posixpath.splitext(name)
+    return f'{base}.{digest}{ext}'
+
+
+def _source_files(source):
+    for directory, _, files in os.walk(source):
+        for filename in sorted(files):
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, source).replace(os.sep, '/'), path
+
+
+def _rewrite_css(name, data, manifest):
+    """Troca as referências ``url(...)`` relativas pelos nomes com hash."""
+    folder = posixpath.dirname(name)
+
+    def replace(match):
+        quote, target = match.groups()
+        path, sep, rest = target.partition('?')
+        if not sep:
+            path, sep, rest = target.partition('#')
+        if re.match(r'^(?:[a-z]+:|/|#)', path, re.I):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(folder, path))
+        if resolved not in manifest:
+            return match.group(0)
+        relative = posixpath.relpath(manifest[resolved], folder or '.')
+        return f'url({quote}{relative}{sep}{rest}{quote})'
+
+    return CSS_URL.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build(source, output, clean=False):
+    """Gera os arquivos com hash, as versões comprimidas e o manifesto.
+
+    Os builds anteriores são mantidos (páginas já abertas ainda pedem os nomes
+    antigos durante o deploy), a não ser com ``clean=True``.
+    """
+    if clean and os.path.isdir(output):
+        shutil.rmtree(output)
+    files = dict(_source_files(source))
+    manifest = {}
+    gzipped = brotlied = 0
+    # CSS por último: as imagens e fontes referenciadas já têm o nome final
+    for name in sorted(files, key=lambda n: (n.endswith('.css'), n)):
+        with open(files[name], 'rb') as f:
+            data = f.read()
+        if name.endswith('.css'):
+            data = _rewrite_css(name, data, manifest)
+        target = hashed_name(name, data)
+        manifest[name] = target
+        path = os.path.join(output, *target.split('/'))
+        _write(path, data)
+        if posixpath.splitext(name)[1] not in COMPRESSIBLE:
+            continue
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            _write(path + '.gz', compressed)
+            gzipped += 1
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            if len(compressed) < len(data):
+                _write(path + '.br', compressed)
+                brotlied += 1
+    _write(os.path.join(output, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    missing = [name for name in VENDOR if name not in manifest]
+    return BuildResult(manifest, gzipped, brotlied, missing)
+
+
+def vendor(source, force=False, timeout=30):
+    """Baixa as bibliotecas de ``VENDOR`` para ``source``; retorna os caminhos baixados."""
+    fetched = []
+    for name, url in VENDOR.items():
+        path = os.path.join(source, *name.split('/'))
+        if os.path.exists(path) and not force:
+            continue
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            data = response.read()
+        _write(path, data)
+        fetched.append(name)
+    return fetched
+
+
+def load_manifest(output):
+    path = os.path.join(output, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def asset_url(filename):
+    """URL de um arquivo estático: com hash se houver build, senão a de ``static``."""
+    assets = current_app.extensions['assets']
+    hashed = assets['manifest'].get(filename)
+    if hashed:
+        return url_for('assets', filename=hashed)
+    return url_for('static', filename=filename)
+
+
+def serve_asset(filename):
+    """Serve um arquivo com hash, pré-comprimido quando o cliente aceita."""
+    directory = current_app.config['ASSETS_DIR']
+    if filename == MANIFEST or filename.endswith(('.gz', '.br')):
+        raise NotFound()
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ENCODINGS:
+        candidate = safe_join(directory, filename + suffix)
+        if request.accept_encodings[name] and candidate and os.path.isfile(candidate):
+            encoding, filename = name, filename + suffix
+            break
+    response = send_from_directory(directory, filename, mimetype=mimetype, max_age=ONE_YEAR)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """Carrega o manifesto, registra ``/assets/<arquivo>`` e o helper ``asset_url``."""
+    output = app.config['ASSETS_DIR']
+    manifest = load_manifest(output)
+    app.extensions['assets'] = {'manifest': manifest}
+    if not manifest:
+        logger.info('Sem %s em %s: arquivos estáticos servidos sem hash (rode `assets build`).',
+                    MANIFEST, output)
+    app.add_url_rule(f"{app.config['ASSETS_URL_PATH']}/<path:filename>", 'assets', serve_asset)
+    app.add_template_global(asset_url)
+    return manifest
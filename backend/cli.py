@@ -0,0 +1,354 @@
+"""Comandos de linha de comando (`python run.py <comando>`)."""
+import click
+from flask.cli import with_appcontext
+
+from backend.extensions import db
+
+
+def init_database(admin_password='admin'):
+    """Cria as tabelas, aplica as migrações e cria o usuário admin se não existir.
+
+    Roda no contexto da aplicação; retorna ``(migrações aplicadas, admin criado?)``.
+    """
+    from backend import migrations
+    from backend.models import User
+
+    db.create_all()
+    # migrações pendentes (índices/colunas em bancos existentes)
+    applied = migrations.upgrade(db.engine)
+    created = False
+    if not User.query.filter_by(username='admin').first():
+        admin_user = User(username='admin', role='admin')
+        admin_user.set_password(admin_password)
+        db.session.add(admin_user)
+        db.session.commit()
+        created = True
+    return applied, created
+
+
+@click.command('init-db')
+@click.option('--admin-password', default='admin', show_default=True,
+              help='Senha do admin, se ele ainda não existir.')
+@with_appcontext
+def init_db_command(admin_password):
+    """Cria o esquema, aplica as migrações e cria o admin (rode no deploy)."""
+    applied, created = init_database(admin_password)
+    if applied:
+        click.echo(f'Migrações aplicadas: {", ".join(map(str, applied))}')
+    if created:
+        click.echo('Usuário admin criado.')
+    click.echo('Banco pronto.')
+
+
+@click.command('migrate')
+@click.option('--target', type=int, default=None, help='Versão máxima a aplicar.')
+@click.option('--status', 'show_status', is_flag=True, help='Apenas lista as migrações pendentes.')
+@with_appcontext
+def migrate_command(target, show_status):
+    """Aplica as migrações de esquema pendentes ao banco configurado."""
+    from backend import migrations
+
+    if show_status:
+        click.echo(f'Versão atual: {migrations.current_version(db.engine)}')
+        for version, description, _ in migrations.pending_migrations(db.engine):
+            click.echo(f'  pendente {version}: {description}')
+        return
+
+    applied = migrations.upgrade(db.engine, target=target)
+    if applied:
+        click.echo(f'Migrações aplicadas: {", ".join(map(str, applied))}')
+    else:
+        click.echo('Banco já está atualizado.')
+
+
+@click.command('sms-worker')
+@click.option('--once', is_flag=True, help='Drena a fila uma vez e sai.')
+@with_appcontext
+def sms_worker_command(once):
+    """Entrega os SMS pendentes da outbox (processo dedicado)."""
+    from flask import current_app
+    from backend.sms import OutboxWorker
+
+    worker = OutboxWorker(current_app._get_current_object())
+    if once:
+        click.echo(f'SMS enviados: {worker.drain()}')
+        worker.provider.close()
+        return
+    click.echo('Worker de SMS em execução (Ctrl+C para sair)...')
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        worker.provider.close()
+
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(['animals', 'appointments']))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None,
+              help='Arquivo de saída (padrão: stdout).')
+@click.option('--gzip', 'compress', is_flag=True, help='Comprime a saída com gzip.')
+@click.option('--clinic-id', type=int, default=None)
+@click.option('--status', default=None)
+@click.option('--from', 'date_from', default=None, help='Data inicial (AAAA-MM-DD).')
+@click.option('--to', 'date_to', default=None, help='Data final inclusiva (AAAA-MM-DD).')
+@click.option('--date-field', type=click.Choice(['agendamento', 'conclusao']), default='agendamento')
+@click.option('--chunk-size', type=int, default=5000)
+@with_appcontext
+def export_command(kind, fmt, output, compress, clinic_id, status, date_from, date_to, date_field, chunk_size):
+    """Exporta animais ou agendamentos com tutor e clínica em streaming."""
+    import sys
+    from backend.exports import generate_export
+
+    chunks = generate_export(
+        fmt, compress=compress, chunk_size=chunk_size,
+        clinic_id=clinic_id, status=status, date_from=date_from, date_to=date_to,
+        date_field=date_field, appointments_only=(kind == 'appointments'),
+    )
+    stream = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+    finally:
+        if output:
+            stream.close()
+
+
+@click.command('import-animals')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Padrão: pela extensão do arquivo.')
+@click.option('--batch-size', type=int, default=1000, help='Linhas por transação.')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), default=None,
+              help='Grava o relatório de erros por linha (CSV).')
+@click.option('--dry-run', is_flag=True, help='Valida e deduplica sem gravar.')
+@with_appcontext
+def import_animals_command(path, fmt, batch_size, errors_path, dry_run):
+    """Importa tutores e animais de um arquivo CSV/JSONL em lotes."""
+    from backend.imports import import_records
+
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        result = import_records(stream, fmt, batch_size=batch_size, dry_run=dry_run)
+    if errors_path and result.errors:
+        with open(errors_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(result.errors_csv())
+    for error in result.errors[:20]:
+        click.echo(f"  linha {error['linha']}: {error['erro']}", err=True)
+    if len(result.errors) > 20:
+        click.echo(f'  ... e mais {len(result.errors) - 20} erros', err=True)
+    click.echo(result.summary())
+
+
+@click.command('counters')
+@click.argument('action', type=click.Choice(['verify', 'rebuild']))
+@with_appcontext
+def counters_command(action):
+    """Compara (verify) ou recalcula (rebuild) a tabela animal_counter a partir de animal."""
+    from backend import counters
+
+    if action == 'rebuild':
+        found = counters.rebuild()
+        db.session.commit()
+    else:
+        found = counters.drift()
+    for (clinic_id, status, procedimento, dia), (stored, actual) in sorted(found.items()):
+        click.echo(f'  clínica={clinic_id or "-"} status={status!r} procedimento={procedimento or "-"} '
+                   f'dia={dia or "-"}: armazenado {stored}, real {actual}')
+    if not found:
+        click.echo('Contadores consistentes.')
+    elif action == 'rebuild':
+        click.echo(f'{len(found)} baldes divergentes corrigidos.')
+    else:
+        click.echo(f'{len(found)} baldes divergentes (use "counters rebuild").')
+        raise SystemExit(1)
+
+
+@click.command('search-index')
+@click.argument('action', type=click.Choice(['rebuild', 'optimize']))
+@with_appcontext
+def search_index_command(action):
+    """Reindexa (rebuild) ou compacta (optimize) os índices de busca FTS5."""
+    from backend import search
+
+    if not search.fts_available():
+        raise click.ClickException('Índices FTS5 ausentes: rode "python run.py migrate".')
+    conn = db.session.connection()
+    if action == 'rebuild':
+        search.rebuild(conn)
+    else:
+        search.optimize(conn)
+    db.session.commit()
+    click.echo('Índices de busca atualizados.')
+
+
+@click.command('event-broker')
+@click.option('--socket', 'path', default=None, help='Caminho do socket (padrão: EVENTS_SOCKET).')
+@with_appcontext
+def event_broker_command(path):
+    """Relay local de eventos para vários workers (EVENTS_BROKER=socket)."""
+    from flask import current_app
+    from backend.events import serve_relay, socket_path
+
+    path = path or socket_path(current_app)
+    click.echo(f'Relay de eventos em {path}')
+    serve_relay(path)
+
+
+@click.command('auto-schedule')
+@click.argument('clinic_id', type=int)
+@click.argument('dia')
+@with_appcontext
+def auto_schedule_command(clinic_id, dia):
+    """Agenda os animais reivindicados pela clínica nas vagas livres de DIA (AAAA-MM-DD)."""
+    from datetime import date
+    from backend.scheduling import SchedulingError
+    from backend.services import auto_schedule_day
+
+    try:
+        dia = date.fromisoformat(dia)
+    except ValueError:
+        raise click.BadParameter('use AAAA-MM-DD', param_hint='DIA')
+    try:
+        scheduled, remaining = auto_schedule_day(clinic_id, dia)
+    except SchedulingError as e:
+        raise click.ClickException(str(e))
+    for animal_id, slot in scheduled:
+        click.echo(f'  animal {animal_id}: {slot:%d/%m/%Y %H:%M}')
+    click.echo(f'{len(scheduled)} agendados, {remaining} sem vaga.')
+
+
+@click.command('reminders')
+@click.option('--hours', type=int, default=None, help='Janela à frente (padrão: REMINDER_HOURS).')
+@click.option('--batch-size', type=int, default=2000, help='Agendamentos por transação.')
+@with_appcontext
+def reminders_command(hours, batch_size):
+    """Enfileira os SMS de lembrete dos agendamentos próximos (idempotente; rode no cron)."""
+    from flask import current_app
+    from backend.reminders import send_reminders
+
+    result = send_reminders(hours or current_app.config.get('REMINDER_HOURS', 24), batch_size=batch_size)
+    click.echo(result.summary())
+
+
+@click.command('archive')
+@click.option('--older-than', 'older_than', type=int, default=None,
+              help='Dias desde a conclusão (padrão: ARCHIVE_AFTER_DAYS).')
+@click.option('--chunk-size', type=int, default=5000, help='Linhas por transação.')
+@click.option('--dry-run', is_flag=True, help='Apenas conta o que seria arquivado.')
+@with_appcontext
+def archive_command(older_than, chunk_size, dry_run):
+    """Move atendimentos concluídos antigos de animal para animal_history."""
+    from backend.archive import archive_completed
+
+    click.echo(archive_completed(older_than, chunk_size=chunk_size, dry_run=dry_run).summary())
+
+
+@click.command('delete-clinic')
+@click.argument('clinic_id', type=int)
+@click.option('--reassign-to', type=int, default=None,
+              help='Clínica que recebe animais e histórico (padrão: devolve para a fila).')
+@click.option('--chunk-size', type=int, default=5000, show_default=True,
+              help='Linhas por transação (0 = tudo numa transação).')
+@click.option('--pause', type=float, default=0.0, help='Segundos entre lotes.')
+@with_appcontext
+def delete_clinic_command(clinic_id, reassign_to, chunk_size, pause):
+    """Remove a clínica CLINIC_ID em lotes (também retoma uma remoção interrompida)."""
+    from backend.clinic_deletion import DeletionError, delete_clinic
+
+    try:
+        result = delete_clinic(clinic_id, reassign_to, chunk_size=chunk_size or None, pause=pause)
+    except DeletionError as e:
+        raise click.ClickException(str(e))
+    click.echo(result.summary())
+
+
+@click.command('assets')
+@click.argument('action', type=click.Choice(['build', 'vendor']))
+@click.option('--clean', is_flag=True, help='build: apaga os builds anteriores de ASSETS_DIR.')
+@click.option('--force', is_flag=True, help='vendor: baixa de novo mesmo se já existir.')
+@with_appcontext
+def assets_command(action, clean, force):
+    """Gera os estáticos com hash e pré-comprimidos (build) ou baixa as bibliotecas de terceiros (vendor)."""
+    from flask import current_app
+    from backend import assets
+
+    app = current_app._get_current_object()
+    if action == 'vendor':
+        try:
+            fetched = assets.vendor(app.static_folder, force=force)
+        except OSError as e:
+            raise click.ClickException(f'Falha ao baixar ({e}); copie os arquivos de VENDOR manualmente '
+                                       f'para {app.static_folder}.')
+        for name in fetched:
+            click.echo(f'  {name}')
+        click.echo(f'{len(fetched)} arquivos baixados; versione-os e rode "assets build".')
+        return
+    result = assets.build(app.static_folder, app.config['ASSETS_DIR'], clean=clean)
+    app.extensions['assets']['manifest'] = result.manifest
+    click.echo(result.summary())
+
+
+@click.group('maintenance')
+def maintenance_group():
+    """Correções de dados em lote, retomáveis (substituem os scripts avulsos)."""
+
+
+@maintenance_group.command('run')
+@click.argument('fixes', nargs=-1)
+@click.option('--chunk-size', type=int, default=5000, show_default=True, help='Linhas por transação.')
+@click.option('--dry-run', is_flag=True, help='Apenas conta o que seria alterado.')
+@click.option('--restart', is_flag=True, help='Ignora o checkpoint e começa do primeiro id.')
+@click.option('--pause', type=float, default=0.0, help='Segundos entre lotes (folga para outros workers).')
+@with_appcontext
+def maintenance_run_command(fixes, chunk_size, dry_run, restart, pause):
+    """Roda as correções FIXES (todas, na ordem, se nenhuma for dada)."""
+    from backend import maintenance
+
+    unknown = [name for name in fixes if name not in maintenance.FIXES_BY_NAME]
+    if unknown:
+        raise click.BadParameter(f'desconhecidas: {", ".join(unknown)} '
+                                 f'(use: {", ".join(maintenance.FIXES_BY_NAME)})', param_hint='FIXES')
+
+    def progress(result, last_id, max_id):
+        click.echo(f'  {result.fix.name}: id {last_id}/{max_id}, {result.changed} alteradas')
+
+    for fix in maintenance.FIXES:
+        if fixes and fix.name not in fixes:
+            continue
+        result = maintenance.run_fix(fix, chunk_size=chunk_size, dry_run=dry_run, restart=restart,
+                                     pause=pause, progress=progress)
+        click.echo(result.summary())
+
+
+@maintenance_group.command('status')
+@with_appcontext
+def maintenance_status_command():
+    """Lista as correções disponíveis e as interrompidas (com checkpoint)."""
+    from backend import maintenance
+
+    saved = maintenance.checkpoints()
+    db.session.commit()
+    for fix in maintenance.FIXES:
+        line = f'  {fix.name:<22} {fix.description}'
+        if fix.name in saved:
+            last_id, changed, updated_at = saved[fix.name]
+            line += f' [interrompida no id {last_id}, {changed} alteradas, {updated_at}]'
+        click.echo(line)
+
+
+def register_commands(app):
+    """Registra os comandos CLI da aplicação"""
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(sms_worker_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_animals_command)
+    app.cli.add_command(counters_command)
+    app.cli.add_command(search_index_command)
+    app.cli.add_command(event_broker_command)
+    app.cli.add_command(auto_schedule_command)
+    app.cli.add_command(reminders_command)
+    app.cli.add_command(archive_command)
+    app.cli.add_command(delete_clinic_command)
+    app.cli.add_command(assets_command)
+    app.cli.add_command(maintenance_group)
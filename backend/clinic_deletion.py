@@ -0,0 +1,287 @@
+"""Remoção de clínicas em lote, sem carregar animais, histórico ou horários.
+
+Política (:func:`delete_clinic`):
+
+- **animais**: com ``reassign_to`` passam para a outra clínica como estão
+  (status, agendamento e token). Sem destino, voltam para a fila
+  (``clinic_id`` NULL). Os ``Agendado`` viram ``Aguardando`` e perdem o
+  horário e o token, pois o horário era da clínica removida. Os
+  ``Concluído`` só perdem a clínica;
+- **histórico** (``animal_history``): mesma clínica de destino ou NULL;
+- **horários** (``clinic_hours``): removidos com a clínica;
+- **conta da clínica**: removida. Se ela também for tutora de algum animal,
+  vira uma conta comum (``role='user'``) em vez de ser apagada.
+
+Cada passo é um único comando (``UPDATE ... WHERE clinic_id = :id``,
+``DELETE``) e nenhum registro filho é carregado no ORM. Esses comandos são
+a única política: o esquema não tem regras ``ON DELETE`` (o SQLite só as
+aplicaria com ``PRAGMA foreign_keys`` e as tabelas recriadas), e os
+contadores precisam das linhas do ``RETURNING``. Os triggers de busca e de
+versões disparam normalmente.
+
+Clínicas com mais de ``CLINIC_DELETE_SYNC_LIMIT`` linhas (animais +
+histórico) são removidas em segundo plano (:func:`start_deletion`). A conta
+é desativada na hora, os animais são movidos em lotes de ``chunk_size``
+(uma transação curta por lote) e a clínica some no fim.
+
+A remoção em andamento fica marcada no banco (``clinic.deleting_since``,
+renovado a cada lote), então outro worker ou o comando de linha não
+começam a mesma remoção em paralelo. Se o processo cair no meio, a marca
+expira depois de ``CLINIC_DELETE_STALE_AFTER`` segundos sem lote (padrão
+60); basta remover de novo (rota ou ``python run.py delete-clinic``), que o
+trabalho continua com o que sobrou.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, text
+
+try:
+    from .extensions import db
+    from .models import Clinic
+    from .counters import apply_deltas, bucket, count as counted_animals
+    from .events import emit
+    from . import identity
+except Exception:
+    from extensions import db
+    from models import Clinic
+    from counters import apply_deltas, bucket, count as counted_animals
+    from events import emit
+    import identity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_LIMIT = 20000
+DEFAULT_CHUNK_SIZE = 5000
+# segundos sem lote concluído até uma remoção ser considerada interrompida
+DEFAULT_STALE_AFTER = 60
+WAITING = 'Aguardando'
+# status que dependem da clínica e voltam para a fila sem ela
+RESET_STATUSES = {'Agendado'}
+
+
+class DeletionError(Exception):
+    """Remoção inválida (clínica inexistente ou destino inválido); a mensagem é exibida ao usuário."""
+
+
+class DeletionResult:
+    """Resumo da remoção: linhas movidas, devolvidas à fila, lotes e tempo."""
+
+    def __init__(self, clinic_id, reassign_to=None):
+        self.clinic_id = clinic_id
+        self.reassign_to = reassign_to
+        self.animals = 0
+        self.released = 0
+        self.history = 0
+        self.chunks = 0
+        self.account = None
+        self.background = False
+        self.elapsed = 0.0
+
+    def summary(self):
+        if self.background:
+            return f'Clínica {self.clinic_id}: remoção em segundo plano iniciada'
+        target = f'para a clínica {self.reassign_to}' if self.reassign_to else 'para a fila'
+        released = f' ({self.released} agendamentos cancelados)' if self.released else ''
+        return (f'Clínica {self.clinic_id} removida: {self.animals} animais{released} e {self.history} '
+                f'registros do histórico movidos {target} em {self.chunks} lotes, {self.elapsed:.2f}s')
+
+
+def _chunk_filter(table, chunk_size):
+    """Filtro das linhas da clínica, limitado a um lote pelo índice ``(clinic_id, id)``."""
+    if not chunk_size:
+        return f'{table}.clinic_id = :id'
+    return (f'{table}.id IN (SELECT id FROM {table} WHERE clinic_id = :id ORDER BY id '
+            f'LIMIT {int(chunk_size)})')
+
+
+def _move_animals(conn, clinic_id, reassign_to, chunk_size=None):
+    """Move (um lote de) animais da clínica; retorna ``(movidos, devolvidos à fila)``."""
+    rows = conn.execute(text(
+        f'UPDATE animal SET clinic_id = :target WHERE {_chunk_filter("animal", chunk_size)} '
+        'RETURNING id, status, procedimento, data_agendamento'
+    ), {'id': clinic_id, 'target': reassign_to}).all()
+    deltas = Counter()
+    for _, status, procedimento, data_agendamento in rows:
+        deltas[bucket(clinic_id, status, procedimento, data_agendamento)] -= 1
+        deltas[bucket(reassign_to, status, procedimento, data_agendamento)] += 1
+
+    reset = [row for row in rows if reassign_to is None and row.status in RESET_STATUSES]
+    if reset:
+        conn.execute(text(
+            'UPDATE animal SET status = :waiting, data_agendamento = NULL, verification_token = NULL, '
+            'token_validated = 0 WHERE id IN (SELECT value FROM json_each(:ids))'
+        ), {'waiting': WAITING, 'ids': json.dumps([row.id for row in reset])})
+        for _, status, procedimento, data_agendamento in reset:
+            deltas[bucket(None, status, procedimento, data_agendamento)] -= 1
+            deltas[bucket(None, WAITING, procedimento, None)] += 1
+    apply_deltas(deltas, conn)
+    return len(rows), len(reset)
+
+
+def _move_history(conn, clinic_id, reassign_to, chunk_size=None):
+    return conn.execute(text(
+        f'UPDATE animal_history SET clinic_id = :target WHERE {_chunk_filter("animal_history", chunk_size)}'
+    ), {'id': clinic_id, 'target': reassign_to}).rowcount
+
+
+def _detach_account(clinic_id):
+    """Desliga a conta da clínica: apaga o usuário ou, se for tutor, rebaixa para ``user``."""
+    user_id = db.session.scalar(text('SELECT user_id FROM clinic WHERE id = :id'), {'id': clinic_id})
+    if user_id is None:
+        return None
+    db.session.execute(text('UPDATE clinic SET user_id = NULL WHERE id = :id'), {'id': clinic_id})
+    deleted = db.session.execute(text(
+        'DELETE FROM "user" WHERE id = :user_id '
+        'AND NOT EXISTS (SELECT 1 FROM animal WHERE dono_id = :user_id) '
+        'AND NOT EXISTS (SELECT 1 FROM animal_history WHERE dono_id = :user_id)'
+    ), {'user_id': user_id}).rowcount
+    if not deleted:
+        db.session.execute(text('UPDATE "user" SET role = \'user\' WHERE id = :user_id'), {'user_id': user_id})
+    identity.cache.invalidate([user_id])
+    return user_id
+
+
+def _check(clinic_id, reassign_to):
+    if db.session.scalar(text('SELECT 1 FROM clinic WHERE id = :id'), {'id': clinic_id}) is None:
+        raise DeletionError('Clínica não encontrada.')
+    if reassign_to is not None:
+        if reassign_to == clinic_id:
+            raise DeletionError('Escolha outra clínica para receber os animais.')
+        if db.session.scalar(text('SELECT 1 FROM clinic WHERE id = :id'), {'id': reassign_to}) is None:
+            raise DeletionError('Clínica de destino não encontrada.')
+
+
+def _stale_cutoff():
+    stale_after = current_app.config.get('CLINIC_DELETE_STALE_AFTER', DEFAULT_STALE_AFTER)
+    return datetime.utcnow() - timedelta(seconds=stale_after)
+
+
+def _claim(clinic_id):
+    """Marca a remoção como em andamento (sem commit); falha se outra estiver ativa."""
+    claimed = db.session.execute(text(
+        'UPDATE clinic SET deleting_since = :now WHERE id = :id '
+        'AND (deleting_since IS NULL OR deleting_since < :stale)'
+    ), {'id': clinic_id, 'now': datetime.utcnow(), 'stale': _stale_cutoff()}).rowcount
+    if not claimed:
+        db.session.rollback()
+        raise DeletionError('A remoção desta clínica já está em andamento.')
+
+
+def _release(clinic_id):
+    """Desfaz a marca depois de uma falha, para que a remoção possa ser retomada já."""
+    db.session.rollback()
+    db.session.execute(text('UPDATE clinic SET deleting_since = NULL WHERE id = :id'), {'id': clinic_id})
+    db.session.commit()
+
+
+def deletion_size(clinic_id):
+    """Linhas a mover: animais (pelos contadores) mais registros do histórico."""
+    history = db.session.scalar(text('SELECT count(*) FROM animal_history WHERE clinic_id = :id'),
+                                {'id': clinic_id})
+    return counted_animals(clinic_id=clinic_id) + history
+
+
+def delete_clinic(clinic_id, reassign_to=None, chunk_size=None, pause=0.0, claimed=False):
+    """Remove a clínica seguindo a política do módulo.
+
+    Sem ``chunk_size`` tudo acontece numa transação (um comando por tabela);
+    com ``chunk_size`` animais e histórico são movidos em lotes, um commit
+    por lote, e a clínica é apagada no último. ``claimed`` indica que quem
+    chamou já marcou a remoção (:func:`start_deletion`).
+    """
+    started = time.perf_counter()
+    result = DeletionResult(clinic_id, reassign_to)
+    _check(clinic_id, reassign_to)
+    if not claimed:
+        _claim(clinic_id)
+    try:
+        result.account = _detach_account(clinic_id)
+        for move, attr in ((_move_animals, 'animals'), (_move_history, 'history')):
+            while True:
+                moved = move(db.session.connection(), clinic_id, reassign_to, chunk_size)
+                if move is _move_animals:
+                    moved, released = moved
+                    result.released += released
+                setattr(result, attr, getattr(result, attr) + moved)
+                if not chunk_size or moved < chunk_size:
+                    break
+                # renova a marca junto com o lote
+                db.session.execute(text('UPDATE clinic SET deleting_since = :now WHERE id = :id'),
+                                   {'id': clinic_id, 'now': datetime.utcnow()})
+                db.session.commit()
+                result.chunks += 1
+                if pause:
+                    time.sleep(pause)
+        db.session.execute(text('DELETE FROM clinic_hours WHERE clinic_id = :id'), {'id': clinic_id})
+        db.session.execute(text('DELETE FROM clinic WHERE id = :id'), {'id': clinic_id})
+        if result.animals:
+            emit('clinic.deleted', reassign_to, queue_changed=result.released > 0 or reassign_to is None,
+                 deleted_clinic_id=clinic_id, animals=result.animals)
+        db.session.commit()
+    except Exception:
+        _release(clinic_id)
+        raise
+    result.chunks += 1
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+@event.listens_for(Clinic, 'before_delete')
+def _release_children(mapper, connection, clinic):
+    """``session.delete(clinic)`` segue a mesma política (animais para a fila), sem carregar os filhos.
+
+    ``Clinic.animais`` e ``Clinic.horarios`` têm ``passive_deletes``: o ORM
+    deixa os filhos para o banco, e aqui eles são tratados em lote.
+    """
+    _move_animals(connection, clinic.id, None)
+    _move_history(connection, clinic.id, None)
+    connection.execute(text('DELETE FROM clinic_hours WHERE clinic_id = :id'), {'id': clinic.id})
+
+
+def in_progress(clinic_id):
+    """``True`` se alguma remoção (de qualquer processo) estiver ativa para a clínica."""
+    return db.session.scalar(text('SELECT 1 FROM clinic WHERE id = :id AND deleting_since >= :stale'),
+                             {'id': clinic_id, 'stale': _stale_cutoff()}) is not None
+
+
+def _run_in_background(app, clinic_id, reassign_to, chunk_size):
+    with app.app_context():
+        try:
+            result = delete_clinic(clinic_id, reassign_to, chunk_size=chunk_size, claimed=True)
+            logger.info(result.summary())
+        except Exception:
+            logger.exception('Falha na remoção da clínica %s (remova de novo para continuar)', clinic_id)
+        finally:
+            db.session.remove()
+
+
+def start_deletion(app, clinic_id, reassign_to=None):
+    """Remove já as clínicas pequenas; as grandes vão para uma thread em lotes.
+
+    A conta da clínica é desativada antes de a thread começar, então ela
+    perde o acesso na hora mesmo que os animais ainda estejam sendo movidos.
+    """
+    _check(clinic_id, reassign_to)
+    limit = app.config.get('CLINIC_DELETE_SYNC_LIMIT', DEFAULT_SYNC_LIMIT)
+    if deletion_size(clinic_id) <= limit:
+        return delete_clinic(clinic_id, reassign_to)
+
+    result = DeletionResult(clinic_id, reassign_to)
+    result.background = True
+    _claim(clinic_id)
+    try:
+        result.account = _detach_account(clinic_id)
+        db.session.commit()
+    except Exception:
+        _release(clinic_id)
+        raise
+    chunk_size = app.config.get('CLINIC_DELETE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    threading.Thread(target=_run_in_background, args=(app, clinic_id, reassign_to, chunk_size),
+                     name=f'clinic-deletion-{clinic_id}', daemon=True).start()
+    return result
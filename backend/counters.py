@@ -0,0 +1,230 @@
+"""Contadores materializados de animais (clínica × status × procedimento × dia).
+
+A tabela ``animal_counter`` guarda quantos animais existem em cada balde e é
+mantida incrementalmente:
+
+- alterações pelo ORM (``schedule_animal``, ``mark_animal_complete``,
+  ``edit_animal``, exclusões, cadastros) são capturadas no evento
+  ``after_flush`` da sessão e aplicadas na mesma transação;
+- comandos em lote que não passam pelo ORM (reivindicação por UPDATE
+  condicional, importação) chamam :func:`record_claimed` e
+  :func:`record_inserted` explicitamente, na mesma transação.
+
+As leituras (:func:`summary`, :func:`count`) somam apenas os baldes, sem varrer ``animal``.
+:func:`rebuild` recalcula tudo a partir de ``animal`` e informa a diferença
+(``python run.py counters verify|rebuild``).
+"""
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+try:
+    from .extensions import db
+    from .models import Animal, AnimalCounter, Clinic
+    from .stats import PROCEDIMENTOS, normalize_procedimento
+except Exception:
+    from extensions import db
+    from models import Animal, AnimalCounter, Clinic
+    from stats import PROCEDIMENTOS, normalize_procedimento
+
+# colunas de Animal que definem o balde
+KEY_ATTRS = ('clinic_id', 'status', 'procedimento', 'data_agendamento')
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str) and value:
+        return value[:10]
+    return ''
+
+
+def bucket(clinic_id, status, procedimento, data_agendamento):
+    """Chave normalizada ``(clinic_id, status, procedimento, dia)``; 0/'' = vazio."""
+    return (
+        clinic_id or 0,
+        (status or '').strip(),
+        normalize_procedimento(procedimento) or '',
+        _day(data_agendamento),
+    )
+
+
+def bucket_of(values):
+    """Balde de um ``Animal`` ou de um dict/linha com as colunas de ``KEY_ATTRS``."""
+    if isinstance(values, dict):
+        return bucket(*(values.get(attr) for attr in KEY_ATTRS))
+    return bucket(*(getattr(values, attr) for attr in KEY_ATTRS))
+
+
+def apply_deltas(deltas, conn=None):
+    """Soma ``deltas`` (``{balde: +n/-n}``) na tabela dentro da transação atual."""
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+    conn = conn or db.session.connection()
+    stmt = sqlite_insert(AnimalCounter.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['clinic_id', 'status', 'procedimento', 'dia'],
+        set_={'total': AnimalCounter.__table__.c.total + stmt.excluded.total},
+    )
+    conn.execute(stmt, [
+        {'clinic_id': key[0], 'status': key[1], 'procedimento': key[2], 'dia': key[3], 'total': n}
+        for key, n in deltas.items()
+    ])
+
+
+def _old_value(state, attr):
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.obj(), attr)
+
+
+def _old_bucket(obj):
+    state = db.inspect(obj)
+    return bucket(*(_old_value(state, attr) for attr in KEY_ATTRS))
+
+
+@event.listens_for(Session, 'before_flush')
+def _capture_deleted_animals(session, flush_context, instances):
+    # depois do DELETE os atributos expirados não podem mais ser carregados
+    deleted = [obj for obj in session.deleted if isinstance(obj, Animal)]
+    if deleted:
+        pending = session.info.setdefault('animal_counter_deleted', Counter())
+        for obj in deleted:
+            pending[_old_bucket(obj)] -= 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_animal_changes(session, flush_context):
+    deltas = session.info.pop('animal_counter_deleted', None) or Counter()
+    for obj in session.new:
+        if isinstance(obj, Animal):
+            deltas[bucket_of(obj)] += 1
+    for obj in session.dirty:
+        if not isinstance(obj, Animal) or obj in session.deleted:
+            continue
+        state = db.inspect(obj)
+        if not any(state.attrs[attr].history.has_changes() for attr in KEY_ATTRS):
+            continue
+        deltas[_old_bucket(obj)] -= 1
+        deltas[bucket_of(obj)] += 1
+    if deltas:
+        apply_deltas(deltas, session.connection())
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('animal_counter_deleted', None)
+
+
+def record_claimed(rows, clinic_id):
+    """Move animais reivindicados por UPDATE em lote do balde "sem clínica" para ``clinic_id``.
+
+    ``rows`` são linhas/objetos com ``status``, ``procedimento`` e
+    ``data_agendamento`` já retornados pelo UPDATE ... RETURNING.
+    """
+    deltas = Counter()
+    for row in rows:
+        values = (row.status, row.procedimento, row.data_agendamento)
+        deltas[bucket(None, *values)] -= 1
+        deltas[bucket(clinic_id, *values)] += 1
+    apply_deltas(deltas)
+
+
+def record_inserted(rows):
+    """Soma animais gravados por INSERT em lote (dicts com as colunas de ``KEY_ATTRS``)."""
+    apply_deltas(Counter(bucket_of(row) for row in rows))
+
+
+def compute_from_animals(conn=None):
+    """Recalcula os baldes a partir de ``animal`` (GROUP BY + normalização em Python)."""
+    conn = conn or db.session.connection()
+    rows = conn.execute(
+        select(Animal.clinic_id, Animal.status, Animal.procedimento,
+               func.date(Animal.data_agendamento), func.count())
+        .group_by(Animal.clinic_id, Animal.status, Animal.procedimento, func.date(Animal.data_agendamento))
+    )
+    totals = Counter()
+    for clinic_id, status, procedimento, day, total in rows:
+        totals[bucket(clinic_id, status, procedimento, day)] += total
+    return totals
+
+
+def stored(conn=None):
+    conn = conn or db.session.connection()
+    table = AnimalCounter.__table__
+    rows = conn.execute(select(table.c.clinic_id, table.c.status, table.c.procedimento,
+                               table.c.dia, table.c.total))
+    return Counter({tuple(row[:4]): row[4] for row in rows if row[4]})
+
+
+def drift(conn=None):
+    """Baldes divergentes: ``{balde: (armazenado, real)}``."""
+    expected = compute_from_animals(conn)
+    current = stored(conn)
+    return {
+        key: (current.get(key, 0), expected.get(key, 0))
+        for key in set(expected) | set(current)
+        if current.get(key, 0) != expected.get(key, 0)
+    }
+
+
+def rebuild(conn=None):
+    """Substitui o conteúdo da tabela pelos valores recalculados; retorna a divergência corrigida."""
+    conn = conn or db.session.connection()
+    found = drift(conn)
+    conn.execute(delete(AnimalCounter.__table__))
+    apply_deltas(compute_from_animals(conn), conn)
+    return found
+
+
+def count(clinic_id=None, status_range=None, unassigned=False):
+    """Soma dos baldes de uma clínica (ou sem clínica) e/ou de uma faixa de status ``(>=, <)``."""
+    table = AnimalCounter.__table__
+    stmt = select(func.coalesce(func.sum(table.c.total), 0))
+    if unassigned:
+        stmt = stmt.where(table.c.clinic_id == 0)
+    elif clinic_id is not None:
+        stmt = stmt.where(table.c.clinic_id == clinic_id)
+    if status_range:
+        stmt = stmt.where(table.c.status >= status_range[0], table.c.status < status_range[1])
+    return db.session.scalar(stmt)
+
+
+def summary():
+    """Mesmo formato de :func:`backend.stats.dashboard_summary`, somando apenas os baldes."""
+    table = AnimalCounter.__table__
+    by_status = Counter()
+    by_procedimento = dict.fromkeys(PROCEDIMENTOS, 0)
+    by_clinic = Counter()
+    rows = db.session.execute(
+        select(table.c.clinic_id, table.c.status, table.c.procedimento, func.sum(table.c.total))
+        .group_by(table.c.clinic_id, table.c.status, table.c.procedimento)
+    )
+    for clinic_id, status, procedimento, total in rows:
+        if not total:
+            continue
+        by_status[status] += total
+        by_clinic[clinic_id] += total
+        if procedimento:
+            by_procedimento[procedimento] = by_procedimento.get(procedimento, 0) + total
+
+    clinic_ids = [cid for cid in by_clinic if cid]
+    names = dict(db.session.execute(
+        select(Clinic.id, Clinic.nome).where(Clinic.id.in_(clinic_ids))
+    ).all()) if clinic_ids else {}
+    return {
+        'total': sum(by_status.values()),
+        'status_counts': dict(by_status),
+        'procedimento_counts': by_procedimento,
+        'clinic_counts': {
+            (cid or None): {'nome': names.get(cid), 'total': total}
+            for cid, total in by_clinic.items()
+        },
+    }
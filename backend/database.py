@@ -0,0 +1,101 @@
+"""Perfis de ajuste do engine SQLite.
+
+O perfil é escolhido por ``SQLITE_PROFILE`` (config ou variável de ambiente)
+e aplicado em toda conexão nova do pool via evento ``connect``:
+
+- ``tuned`` (padrão): WAL, ``synchronous=NORMAL``, ``busy_timeout``, mmap,
+  cache maior e tabelas temporárias em memória. Leitores deixam de bloquear
+  escritores e escritas concorrentes esperam em vez de falhar com
+  "database is locked".
+- ``default``: comportamento padrão do SQLite (journal ``DELETE``), útil para
+  comparação em benchmarks.
+
+``SQLITE_PRAGMAS`` (dict) sobrescreve pragmas individuais do perfil.
+"""
+import os
+
+from sqlalchemy import event
+
+SQLITE_PROFILES = {
+    'default': {},
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,           # ms
+        'mmap_size': 256 * 1024 * 1024,  # bytes
+        'cache_size': -64000,           # KiB (valor negativo = tamanho em KiB)
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_PROFILE = 'tuned'
+
+# pool do SQLAlchemy para bancos em arquivo: conexões reaproveitadas entre
+# requisições, com limite para não abrir um arquivo por thread sem controle
+POOL_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'pool_recycle': 3600,
+}
+
+
+def _is_sqlite(uri):
+    return uri.startswith('sqlite')
+
+
+def _is_memory(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def get_profile(app):
+    """Pragmas do perfil configurado, com as sobrescritas de ``SQLITE_PRAGMAS``."""
+    name = app.config.get('SQLITE_PROFILE') or os.environ.get('SQLITE_PROFILE') or DEFAULT_PROFILE
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f'Perfil SQLite desconhecido: {name!r} (opções: {", ".join(SQLITE_PROFILES)})')
+    pragmas = dict(SQLITE_PROFILES[name])
+    pragmas.update(app.config.get('SQLITE_PRAGMAS') or {})
+    return name, pragmas
+
+
+def engine_options(app):
+    """Opções de engine (pool e ``connect_args``) para o perfil configurado.
+
+    Deve ser chamado antes de ``db.init_app``; opções já definidas em
+    ``SQLALCHEMY_ENGINE_OPTIONS`` têm precedência.
+    """
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    options = {}
+    if _is_sqlite(uri) and not _is_memory(uri):
+        _, pragmas = get_profile(app)
+        options.update(POOL_OPTIONS)
+        connect_args = {'check_same_thread': False}
+        if 'busy_timeout' in pragmas:
+            # timeout do driver sqlite3 em segundos; espera pelo lock de escrita
+            connect_args['timeout'] = pragmas['busy_timeout'] / 1000
+        options['connect_args'] = connect_args
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def install_profile(app, engine):
+    """Registra o evento que aplica os pragmas do perfil a cada conexão."""
+    if engine.dialect.name != 'sqlite':
+        return
+    name, pragmas = get_profile(app)
+    app.config['SQLITE_PROFILE'] = name
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
@@ -0,0 +1,308 @@
+"""Eventos em tempo real (pub/sub) para as filas das clínicas e a visão do admin.
+
+Os serviços chamam :func:`emit` durante a transação; os eventos ficam na
+sessão e só são publicados depois do commit (um rollback os descarta), então
+ninguém é avisado de uma alteração que não aconteceu.
+
+Canais:
+
+- ``clinic:<id>``: animais da clínica (agendamento, token validado, conclusão...);
+- ``queue``: fila de espera (animal novo aguardando, animal reivindicado);
+- ``admin``: todos os eventos.
+
+O broker é plugável (``EVENTS_BROKER``, como ``SMS_PROVIDER``):
+
+- ``local``: fan-out em memória, só dentro do processo;
+- ``socket``: cada processo (ex.: workers do gunicorn) conecta a um relay
+  local (``python run.py event-broker``) que repassa cada publicação a todos
+  os processos; dentro de cada processo a entrega é a mesma do ``local``;
+- ``"modulo:Classe"``: outro broker (Redis, NATS...) com a mesma interface.
+
+Assinantes recebem os eventos numa fila limitada; quem fica para trás perde
+os mais antigos e recebe um evento ``reset`` (o cliente recarrega os dados
+pela API). Nada aqui consulta o banco: conexões ociosas só esperam na fila.
+"""
+import importlib
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+try:
+    from .extensions import db
+except Exception:
+    from extensions import db
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 256
+DEFAULT_SOCKET = 'events.sock'
+
+
+class Subscription:
+    """Fila de um assinante; :meth:`get` devolve ``None`` se nada chegar no timeout."""
+
+    def __init__(self, broker, channels, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self._queue = queue.Queue(maxsize)
+        # serializa os publicadores: entre descartar o mais antigo e enfileirar
+        # de novo, outro publicador não pode ocupar a vaga liberada
+        self._put_lock = threading.Lock()
+        self.lagged = False
+
+    def put(self, message):
+        with self._put_lock:
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                # assinante lento: descarta o mais antigo e avisa para recarregar
+                self.lagged = True
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._queue.put_nowait(message)
+
+    def get(self, timeout=None):
+        try:
+            message = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if self.lagged:
+            self.lagged = False
+            return {'type': 'reset'}
+        return message
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Pub/sub em memória: cada mensagem vai para as filas dos assinantes do canal."""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({sub for subs in self._channels.values() for sub in subs})
+
+    def publish(self, channels, message):
+        self.deliver(dict(message, id=next(self._ids), channels=list(channels)))
+
+    def deliver(self, message):
+        """Entrega uma vez a cada assinante de qualquer um dos canais da mensagem."""
+        with self._lock:
+            subscribers = set()
+            for channel in message['channels']:
+                subscribers.update(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def close(self):
+        pass
+
+
+class SocketBroker(LocalBroker):
+    """Compartilha publicações entre processos via o relay de :func:`serve_relay`.
+
+    Uma única conexão por processo: publicar envia uma linha JSON ao relay e
+    uma thread lê tudo o que o relay repassa (inclusive o que este processo
+    publicou) e entrega aos assinantes locais. Se o relay cair, a thread
+    reconecta; o que for publicado sem conexão é descartado.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reader = threading.Thread(target=self._read_forever, name='events-relay', daemon=True)
+        self._reader.start()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        return sock
+
+    def publish(self, channels, message):
+        line = (json.dumps(dict(message, channels=list(channels))) + '\n').encode()
+        with self._send_lock:
+            try:
+                if self._sock is None:
+                    raise OSError('sem conexão')
+                self._sock.sendall(line)
+            except OSError:
+                logger.warning('Relay de eventos indisponível em %s; evento descartado', self.path)
+
+    def _read_forever(self):
+        while not self._closed.is_set():
+            try:
+                sock = self._connect()
+            except OSError:
+                time.sleep(1)
+                continue
+            with self._send_lock:
+                self._sock = sock
+            try:
+                for line in sock.makefile('rb'):
+                    message = json.loads(line)
+                    self.deliver(message)
+            except (OSError, ValueError):
+                pass
+            finally:
+                with self._send_lock:
+                    self._sock = None
+                sock.close()
+            # relay reiniciou: os assinantes podem ter perdido eventos
+            for subscription in self._all_subscriptions():
+                subscription.lagged = True
+            time.sleep(0.5)
+
+    def _all_subscriptions(self):
+        with self._lock:
+            return {sub for subs in self._channels.values() for sub in subs}
+
+    def close(self):
+        self._closed.set()
+        with self._send_lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+
+def serve_relay(path, ready=None):
+    """Relay local: repassa cada linha recebida de um cliente a todos os clientes.
+
+    Numera as mensagens (``id``) para que todos os processos vejam os mesmos
+    ids. Roda até o processo terminar (``python run.py event-broker``).
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(128)
+    clients = set()
+    lock = threading.Lock()
+    ids = itertools.count(1)
+
+    def handle(conn):
+        with lock:
+            clients.add(conn)
+        try:
+            for line in conn.makefile('rb'):
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                with lock:
+                    message['id'] = next(ids)
+                    data = (json.dumps(message) + '\n').encode()
+                    dead = []
+                    for client in clients:
+                        try:
+                            client.sendall(data)
+                        except OSError:
+                            dead.append(client)
+                    clients.difference_update(dead)
+        finally:
+            with lock:
+                clients.discard(conn)
+            conn.close()
+
+    if ready is not None:
+        ready.set()
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+BROKERS = {
+    'local': lambda app: LocalBroker(),
+    'socket': lambda app: SocketBroker(socket_path(app)),
+}
+
+
+def socket_path(app):
+    return app.config.get('EVENTS_SOCKET') or os.path.join(app.instance_path, DEFAULT_SOCKET)
+
+
+def create_broker(app):
+    name = app.config.get('EVENTS_BROKER', 'local')
+    if name in BROKERS:
+        return BROKERS[name](app)
+    module_name, _, attr = name.partition(':')
+    broker_cls = getattr(importlib.import_module(module_name), attr)
+    return broker_cls(app)
+
+
+def get_broker(app):
+    return app.extensions['events_broker']
+
+
+def emit(event_type, clinic_id=None, queue_changed=False, **data):
+    """Agenda um evento para depois do commit da sessão atual.
+
+    Vai para ``admin``, para ``clinic:<clinic_id>`` (se houver) e, com
+    ``queue_changed``, para ``queue`` (a fila de espera mudou).
+    """
+    message = dict(data, type=event_type, clinic_id=clinic_id, at=time.time())
+    channels = ['admin']
+    if clinic_id:
+        channels.append(f'clinic:{clinic_id}')
+    if queue_changed:
+        channels.append('queue')
+    db.session.info.setdefault('pending_events', []).append((channels, message))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(session):
+    pending = session.info.pop('pending_events', None)
+    if not pending:
+        return
+    if not has_app_context():
+        return
+    broker = current_app.extensions.get('events_broker')
+    if broker is None:
+        return
+    for channels, message in pending:
+        broker.publish(channels, message)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('pending_events', None)
+
+
+def init_events(app):
+    broker = create_broker(app)
+    app.extensions['events_broker'] = broker
+    return broker
@@ -0,0 +1,139 @@
+"""Exportação em streaming de animais/agendamentos (CSV ou JSONL).
+
+As linhas vêm de um cursor do banco em blocos de ``chunk_size`` (``yield_per``)
+e são convertidas e, opcionalmente, comprimidas com gzip bloco a bloco, então
+a memória usada não depende do tamanho da tabela. Usado pelas rotas de
+``backend/routes/exports.py`` e pelo comando ``python run.py export``.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+try:
+    from .extensions import db
+    from .models import Animal, User, Clinic
+except Exception:
+    from extensions import db
+    from models import Animal, User, Clinic
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 5000
+
+COLUMNS = (
+    ('id', Animal.id),
+    ('nome', Animal.nome),
+    ('especie', Animal.especie),
+    ('raca', Animal.raca),
+    ('idade', Animal.idade),
+    ('procedimento', Animal.procedimento),
+    ('status', Animal.status),
+    ('data_agendamento', Animal.data_agendamento),
+    ('token_validated', Animal.token_validated),
+    ('data_conclusao', Animal.data_conclusao),
+    ('tutor_id', Animal.dono_id),
+    ('tutor', User.username),
+    ('tutor_email', User.email),
+    ('tutor_contato', User.contato),
+    ('clinic_id', Animal.clinic_id),
+    ('clinica', Clinic.nome),
+)
+FIELDNAMES = [name for name, _ in COLUMNS]
+
+DATE_FIELDS = {
+    'agendamento': Animal.data_agendamento,
+    'conclusao': Animal.data_conclusao,
+}
+
+
+def parse_date(value):
+    """Converte ``YYYY-MM-DD`` em ``date`` (``None`` para vazio)."""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def build_query(clinic_id=None, status=None, date_from=None, date_to=None,
+                date_field='agendamento', appointments_only=False):
+    """SELECT de animais com tutor e clínica, filtrado e ordenado por id.
+
+    ``date_from``/``date_to`` são inclusivos e valem para ``date_field``.
+    """
+    stmt = select(*(column.label(name) for name, column in COLUMNS))\
+        .select_from(Animal)\
+        .outerjoin(User, User.id == Animal.dono_id)\
+        .outerjoin(Clinic, Clinic.id == Animal.clinic_id)
+    if clinic_id is not None:
+        stmt = stmt.where(Animal.clinic_id == clinic_id)
+    if status:
+        stmt = stmt.where(Animal.status == status)
+    date_column = DATE_FIELDS[date_field]
+    if appointments_only:
+        stmt = stmt.where(Animal.data_agendamento.isnot(None))
+    if date_from:
+        stmt = stmt.where(date_column >= datetime.combine(parse_date(date_from), time.min))
+    if date_to:
+        stmt = stmt.where(date_column < datetime.combine(parse_date(date_to) + timedelta(days=1), time.min))
+    return stmt.order_by(Animal.id)
+
+
+def iter_row_chunks(stmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Executa ``stmt`` numa conexão própria e devolve as linhas em blocos."""
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for partition in result.partitions():
+            yield partition
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDNAMES)
+    for rows in chunks:
+        writer.writerows([_plain(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _jsonl_chunks(chunks):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for rows in chunks:
+        yield ''.join(dumps(dict(zip(FIELDNAMES, map(_plain, row)))) + '\n' for row in rows)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def generate_export(fmt='csv', compress=False, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Gera o arquivo de exportação em pedaços de ``bytes``."""
+    if fmt not in FORMATS:
+        raise ValueError(f'Formato inválido: {fmt!r} (opções: {", ".join(FORMATS)})')
+    chunks = iter_row_chunks(build_query(**filters), chunk_size)
+    text_chunks = _csv_chunks(chunks) if fmt == 'csv' else _jsonl_chunks(chunks)
+    encoded = (chunk.encode('utf-8') for chunk in text_chunks)
+    return _gzip(encoded) if compress else encoded
+
+
+def export_filename(kind, fmt, compress=False):
+    name = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return name + '.gz' if compress else name
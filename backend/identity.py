@@ -0,0 +1,155 @@
+"""Identidade da requisição (usuário, papel e clínica) resolvida uma vez.
+
+:func:`current_identity` faz uma única consulta (``user`` LEFT JOIN
+``clinic``) e guarda o resultado em ``flask.g`` para o resto da requisição.
+Opcionalmente o resultado também fica num cache do processo por
+``IDENTITY_CACHE_TTL`` segundos (padrão 0, desativado); qualquer flush do
+ORM que crie, altere ou remova ``User``/``Clinic`` invalida as entradas
+afetadas.
+
+O cache é só do processo: escritas por SQL direto (remoção de clínica,
+``maintenance``) e escritas feitas em outros workers não o invalidam. Com
+ele ligado, uma conta removida ou rebaixada pode manter o papel e o escopo
+antigos nos outros processos por até ``IDENTITY_CACHE_TTL`` segundos; ligue
+só com um único processo ou se esse atraso for aceitável.
+"""
+import threading
+import time
+
+from flask import current_app, g, has_request_context, session
+from flask_login import UserMixin
+from sqlalchemy import event, false, select
+from sqlalchemy.orm import Session
+
+try:
+    from .extensions import db
+    from .models import User, Clinic, Animal
+except Exception:
+    from extensions import db
+    from models import User, Clinic, Animal
+
+DEFAULT_TTL = 0
+
+
+class Identity(UserMixin):
+    """Dados mínimos do usuário logado; também serve ao Flask-Login."""
+
+    def __init__(self, id, username, role, clinic_id=None, clinic_nome=None):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.clinic_id = clinic_id
+        self.clinic_nome = clinic_nome
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_clinic(self):
+        return self.role == 'clinic'
+
+    def can_manage(self, animal):
+        """Admin, tutor do animal ou clínica responsável por ele."""
+        if self.is_admin or animal.dono_id == self.id:
+            return True
+        return self.is_clinic and self.clinic_id is not None and animal.clinic_id == self.clinic_id
+
+    def animal_criteria(self):
+        """Filtros dos animais visíveis: todos (admin), os da clínica ou os do tutor."""
+        if self.is_admin:
+            return []
+        if self.is_clinic:
+            # clínica sem cadastro não vê nada
+            return [Animal.clinic_id == self.clinic_id] if self.clinic_id else [false()]
+        return [Animal.dono_id == self.id]
+
+
+class _IdentityCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def put(self, user_id, identity, ttl):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, identity)
+
+    def invalidate(self, user_ids=None):
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+
+
+cache = _IdentityCache()
+
+
+def load_identity(user_id):
+    """Consulta a identidade no banco (uma query) sem passar pelo cache."""
+    row = db.session.execute(
+        select(User.id, User.username, User.role, Clinic.id, Clinic.nome)
+        .outerjoin(Clinic, Clinic.user_id == User.id)
+        .where(User.id == user_id)
+        .limit(1)
+    ).first()
+    return Identity(*row) if row else None
+
+
+def get_identity(user_id):
+    """Identidade de ``user_id``, usando o cache do processo se habilitado."""
+    if user_id is None:
+        return None
+    ttl = current_app.config.get('IDENTITY_CACHE_TTL', DEFAULT_TTL)
+    if ttl > 0:
+        identity = cache.get(user_id)
+        if identity is not None:
+            return identity
+    identity = load_identity(user_id)
+    if identity is not None and ttl > 0:
+        cache.put(user_id, identity, ttl)
+    return identity
+
+
+def current_identity():
+    """Identidade do usuário da sessão (``None`` se não logado ou removido)."""
+    if not has_request_context():
+        return None
+    if 'identity' not in g:
+        g.identity = get_identity(session.get('user_id'))
+    return g.identity
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_on_flush(session, flush_context):
+    user_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Clinic):
+            if obj.user_id is None:
+                # clínica sem usuário (ou desvinculada): não sabemos quem
+                # apontava para ela, então limpar tudo
+                cache.invalidate()
+                return
+            user_ids.add(obj.user_id)
+            # usuário anterior, se a clínica mudou de dono
+            history = db.inspect(obj).attrs.user_id.history
+            user_ids.update(uid for uid in history.deleted or () if uid is not None)
+    if user_ids:
+        cache.invalidate(user_ids)
+
+
+def init_identity(app):
+    app.config.setdefault('IDENTITY_CACHE_TTL', DEFAULT_TTL)
+
+    @app.context_processor
+    def inject_identity():
+        return {'identity': current_identity()}
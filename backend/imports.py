@@ -0,0 +1,253 @@
+"""Importação em lote de tutores e animais a partir de CSV ou JSONL.
+
+O arquivo é lido e validado em uma única passada, linha a linha. As linhas
+válidas são agrupadas em lotes de ``batch_size``; para cada lote os tutores
+são resolvidos com uma consulta por ``username``/``email`` (tutores repetidos
+no arquivo são reaproveitados) e os novos ``User``/``Animal`` são gravados
+com INSERTs em lote (executemany), um commit por lote.
+
+Colunas aceitas (cabeçalho do CSV ou chaves do JSONL):
+``tutor_username`` (obrigatório), ``tutor_email``, ``tutor_contato``,
+``nome`` (obrigatório), ``especie`` (obrigatório), ``raca``, ``idade``,
+``procedimento``, ``contato``, ``status``.
+
+Tutores criados pela importação recebem uma senha inutilizável e precisam
+definir uma nova senha antes de entrar.
+"""
+import csv
+import io
+import json
+import time
+
+from sqlalchemy import func, insert, or_, select
+
+try:
+    from .extensions import db
+    from .models import User, Animal
+    from .counters import record_inserted
+    from .events import emit
+except Exception:
+    from extensions import db
+    from models import User, Animal
+    from counters import record_inserted
+    from events import emit
+
+DEFAULT_BATCH_SIZE = 1000
+# não é um hash válido: check_password_hash sempre retorna False
+UNUSABLE_PASSWORD = '!'
+
+ANIMAL_FIELDS = ('nome', 'especie', 'raca', 'idade', 'procedimento', 'contato', 'status')
+
+
+class ImportResult:
+    """Resumo da importação: contagens, erros por linha e vazão."""
+
+    def __init__(self):
+        self.rows = 0
+        self.animals = 0
+        self.users_created = 0
+        self.users_reused = 0
+        self.errors = []
+        self.elapsed = 0.0
+        self.dry_run = False
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.errors.append({'linha': line, 'erro': message})
+
+    def errors_csv(self):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=['linha', 'erro'])
+        writer.writeheader()
+        writer.writerows(self.errors)
+        return buffer.getvalue()
+
+    def summary(self):
+        prefix = '[simulação] ' if self.dry_run else ''
+        return (f"{prefix}{self.rows} linhas lidas, {self.animals} animais importados, "
+                f"{self.users_created} tutores criados, {self.users_reused} reaproveitados, "
+                f"{len(self.errors)} erros em {self.elapsed:.2f}s ({self.rows_per_second:.0f} linhas/s)")
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def iter_records(stream, fmt):
+    """Lê ``(linha, dict)`` de um arquivo texto CSV ou JSONL, sem carregá-lo inteiro."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_number, exc
+                continue
+            yield line_number, record if isinstance(record, dict) else ValueError('linha não é um objeto JSON')
+    else:
+        raise ValueError(f'Formato inválido: {fmt!r} (use csv ou jsonl)')
+
+
+def validate_record(record):
+    """Normaliza uma linha; retorna ``(dados, None)`` ou ``(None, mensagem de erro)``."""
+    data = {key: _clean(record.get(key)) for key in ('tutor_username', 'tutor_email', 'tutor_contato', *ANIMAL_FIELDS)}
+    missing = [key for key in ('tutor_username', 'nome', 'especie') if not data[key]]
+    if missing:
+        return None, f"campos obrigatórios ausentes: {', '.join(missing)}"
+    if data['idade'] is not None:
+        try:
+            data['idade'] = int(data['idade'])
+        except ValueError:
+            return None, f"idade inválida: {data['idade']!r}"
+        if data['idade'] < 0:
+            return None, 'idade negativa'
+    if data['tutor_email'] and '@' not in data['tutor_email']:
+        return None, f"email inválido: {data['tutor_email']!r}"
+    if data['procedimento']:
+        data['procedimento'] = data['procedimento'].lower()
+    data['status'] = data['status'] or 'Aguardando'
+    return data, None
+
+
+class _TutorIndex:
+    """Ids de tutores já resolvidos (por username e por email) durante a importação."""
+
+    def __init__(self):
+        self.by_username = {}
+        self.by_email = {}
+
+    def lookup(self, data):
+        user_id = self.by_username.get(data['tutor_username'])
+        if user_id is None and data['tutor_email']:
+            user_id = self.by_email.get(data['tutor_email'].lower())
+        return user_id
+
+    def add(self, user_id, username, email):
+        self.by_username[username] = user_id
+        if email:
+            self.by_email[email.lower()] = user_id
+
+
+def _resolve_tutors(batch, index, result, dry_run):
+    """Preenche ``index`` com os tutores do lote, criando os que não existem."""
+    pending = [data for _, data in batch if index.lookup(data) is None]
+    if not pending:
+        return
+    usernames = {data['tutor_username'] for data in pending}
+    emails = {data['tutor_email'].lower() for data in pending if data['tutor_email']}
+    # email sem diferenciar maiúsculas, como no índice da importação (ix_user_email_lower)
+    existing = db.session.execute(
+        select(User.id, User.username, User.email)
+        .where(or_(User.username.in_(usernames), func.lower(User.email).in_(emails)))
+    ).all()
+    for user_id, username, email in existing:
+        index.add(user_id, username, email)
+        result.users_reused += 1
+
+    new_users = {}
+    new_emails = {}
+    aliases = {}  # username -> username do tutor novo com o mesmo email
+    for data in pending:
+        username, email = data['tutor_username'], data['tutor_email']
+        if index.lookup(data) is not None or username in new_users or username in aliases:
+            continue
+        if email and email.lower() in new_emails:
+            aliases[username] = new_emails[email.lower()]
+            continue
+        new_users[username] = {
+            'username': username,
+            'email': email,
+            'contato': data['tutor_contato'],
+            'password_hash': UNUSABLE_PASSWORD,
+            'role': 'user',
+        }
+        if email:
+            new_emails[email.lower()] = username
+    if not new_users:
+        return
+    if dry_run:
+        # ids negativos só para manter a deduplicação durante a simulação
+        for offset, row in enumerate(new_users.values(), start=len(index.by_username) + 1):
+            index.add(-offset, row['username'], row['email'])
+    else:
+        created = db.session.execute(
+            insert(User).returning(User.id, User.username, User.email, sort_by_parameter_order=True),
+            list(new_users.values()),
+        ).all()
+        for user_id, username, email in created:
+            index.add(user_id, username, email)
+    for alias, username in aliases.items():
+        index.by_username[alias] = index.by_username[username]
+    result.users_created += len(new_users)
+
+
+def _flush_batch(batch, index, result, dry_run):
+    if not batch:
+        return
+    _resolve_tutors(batch, index, result, dry_run)
+    animals = [
+        dict({key: data[key] for key in ANIMAL_FIELDS},
+             dono_id=index.lookup(data), token_validated=False)
+        for _, data in batch
+    ]
+    if not dry_run:
+        db.session.execute(insert(Animal), animals)
+        # INSERT em lote não passa pelos eventos do ORM
+        record_inserted(animals)
+        emit('animals.imported', queue_changed=True, count=len(animals))
+        db.session.commit()
+    result.animals += len(animals)
+
+
+def import_records(stream, fmt='csv', batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Importa o conteúdo de ``stream`` (arquivo texto) e retorna um :class:`ImportResult`.
+
+    Um lote com erro de banco é desfeito e suas linhas entram no relatório;
+    os lotes anteriores continuam gravados.
+    """
+    result = ImportResult()
+    result.dry_run = dry_run
+    index = _TutorIndex()
+    batch = []
+    started = time.perf_counter()
+
+    def flush():
+        snapshot = (dict(index.by_username), dict(index.by_email),
+                    result.users_created, result.users_reused)
+        try:
+            _flush_batch(batch, index, result, dry_run)
+        except Exception as exc:
+            db.session.rollback()
+            # os tutores criados neste lote foram desfeitos junto com ele
+            index.by_username, index.by_email, result.users_created, result.users_reused = snapshot
+            for line, _ in batch:
+                result.add_error(line, f'falha ao gravar o lote: {exc.__class__.__name__}')
+        batch.clear()
+
+    for line, record in iter_records(stream, fmt):
+        result.rows += 1
+        if isinstance(record, Exception):
+            result.add_error(line, f'JSON inválido: {record}')
+            continue
+        data, error = validate_record(record)
+        if error:
+            result.add_error(line, error)
+            continue
+        batch.append((line, data))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,250 @@
+"""Correções de dados em lote (``python run.py maintenance run``).
+
+Substituem os antigos ``scripts/fix_animal_clinic_ids.py``,
+``sync_user_clinic_ids.py`` e ``migrate_clinic_users.py``, que faziam um
+UPDATE por usuário e usavam colunas que não existem mais (``clinic.name``,
+``clinic.contact``, ``user.clinic_id``). Hoje a conta de clínica é ligada pela
+coluna ``clinic.user_id``. As correções, na ordem em que rodam:
+
+- ``link-clinic-users``: liga cada clínica sem responsável à conta de
+  clínica de mesmo nome (``clinic.nome = user.username``) que ainda não tem
+  clínica. Só liga quando há uma única candidata;
+- ``create-user-clinics``: cria a clínica das contas de clínica que
+  continuam sem nenhuma (nome = usuário, telefone = contato);
+- ``animal-clinic-ids`` e ``history-clinic-ids``: animais (e histórico) cujo
+  ``clinic_id`` ainda guarda o id da conta de clínica, de antes de a
+  clínica existir, passam a apontar para a clínica dessa conta. Só são
+  corrigidas referências que não apontam para nenhuma clínica. Um id que
+  por acaso também é de uma clínica existente é ambíguo e fica como está.
+
+Cada correção é um único comando ``UPDATE ... FROM``/``INSERT ... SELECT``
+por lote de ``chunk_size`` linhas da tabela percorrida (por id, em ordem),
+e cada lote tem a sua transação. O bloqueio de escrita dura um lote, e os
+outros workers escrevem entre um lote e outro (``pause`` segundos). O
+último id processado é gravado em ``maintenance_checkpoint`` na mesma
+transação do lote. Uma execução interrompida continua do lote seguinte, e o
+checkpoint é apagado quando a correção termina. Os triggers de busca e de
+versões disparam normalmente; os contadores de ``animal`` são ajustados
+pelas linhas devolvidas pelo ``RETURNING``.
+"""
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import text
+
+try:
+    from .extensions import db
+    from .counters import apply_deltas, bucket
+except Exception:
+    from extensions import db
+    from counters import apply_deltas, bucket
+
+DEFAULT_CHUNK_SIZE = 5000
+
+CHECKPOINT_TABLE = (
+    'CREATE TABLE IF NOT EXISTS maintenance_checkpoint ('
+    ' name VARCHAR(50) NOT NULL PRIMARY KEY,'
+    ' last_id INTEGER NOT NULL,'
+    ' changed INTEGER NOT NULL,'
+    ' updated_at DATETIME NOT NULL)'
+)
+
+# conta de clínica -> menor id de clínica ligada a ela (referência legada em clinic_id)
+_ACCOUNT_CLINIC = '''
+    (SELECT c.user_id AS user_id, min(c.id) AS clinic_id FROM clinic c
+     JOIN "user" u ON u.id = c.user_id AND u.role = 'clinic'
+     GROUP BY c.user_id) AS account
+'''
+
+
+class Fix:
+    """Uma correção: tabela percorrida por id e o comando de um lote.
+
+    ``where`` é o filtro das linhas a corrigir (a tabela pelo próprio nome,
+    as demais como em ``joins``, usado também na contagem da simulação) e
+    ``statement`` o comando que as corrige no intervalo ``:lo < id <= :hi``.
+    """
+
+    def __init__(self, name, description, table, where, statement, joins='', counters=False):
+        self.name = name
+        self.description = description
+        self.table = table
+        self.where = where
+        self.statement = statement
+        self.joins = joins
+        self.counters = counters
+
+    def count(self, conn, lo=0):
+        sql = f'SELECT count(*) FROM {self.table} {self.joins} WHERE {self.table}.id > :lo AND {self.where}'
+        return conn.execute(text(sql), {'lo': lo}).scalar()
+
+    def apply(self, conn, lo, hi):
+        """Corrige o lote; retorna quantas linhas mudaram."""
+        result = conn.execute(text(self.statement.format(where=self.where)), {'lo': lo, 'hi': hi})
+        if not self.counters:
+            return result.rowcount
+        rows = result.all()
+        # RETURNING só enxerga a linha já alterada (clínica nova); a antiga
+        # era o id da conta dona dessa clínica
+        deltas = Counter()
+        for old_clinic, new_clinic, status, procedimento, data_agendamento in rows:
+            deltas[bucket(old_clinic, status, procedimento, data_agendamento)] -= 1
+            deltas[bucket(new_clinic, status, procedimento, data_agendamento)] += 1
+        apply_deltas(deltas, conn)
+        return len(rows)
+
+
+_UNLINKED_CLINIC = '''
+    clinic.user_id IS NULL AND u.role = 'clinic'
+    AND NOT EXISTS (SELECT 1 FROM clinic linked WHERE linked.user_id = u.id)
+    AND (SELECT count(*) FROM clinic same WHERE same.nome = clinic.nome AND same.user_id IS NULL) = 1
+'''
+_ORPHAN_ACCOUNT = '''
+    {table}.clinic_id IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM clinic existing WHERE existing.id = {table}.clinic_id)
+'''
+
+FIXES = [
+    Fix(
+        'link-clinic-users',
+        'liga clínicas sem responsável à conta de clínica de mesmo nome',
+        'clinic',
+        _UNLINKED_CLINIC,
+        '''UPDATE clinic SET user_id = u.id FROM "user" u
+           WHERE u.username = clinic.nome AND clinic.id > :lo AND clinic.id <= :hi AND {where}''',
+        joins='JOIN "user" u ON u.username = clinic.nome',
+    ),
+    Fix(
+        'create-user-clinics',
+        'cria a clínica das contas de clínica sem nenhuma',
+        '"user"',
+        '''"user".role = 'clinic' AND NOT EXISTS (SELECT 1 FROM clinic c WHERE c.user_id = "user".id)''',
+        '''INSERT INTO clinic (nome, telefone, user_id)
+           SELECT "user".username, "user".contato, "user".id FROM "user"
+           WHERE "user".id > :lo AND "user".id <= :hi AND {where} ORDER BY "user".id''',
+    ),
+    Fix(
+        'animal-clinic-ids',
+        'troca o id da conta de clínica em animal.clinic_id pela clínica da conta',
+        'animal',
+        _ORPHAN_ACCOUNT.format(table='animal'),
+        f'''UPDATE animal SET clinic_id = account.clinic_id FROM {_ACCOUNT_CLINIC}
+           WHERE animal.id > :lo AND animal.id <= :hi AND account.user_id = animal.clinic_id AND {{where}}
+           RETURNING (SELECT user_id FROM clinic WHERE clinic.id = animal.clinic_id), animal.clinic_id,
+                     animal.status, animal.procedimento, animal.data_agendamento''',
+        joins=f'JOIN {_ACCOUNT_CLINIC} ON account.user_id = animal.clinic_id',
+        counters=True,
+    ),
+    Fix(
+        'history-clinic-ids',
+        'o mesmo em animal_history.clinic_id',
+        'animal_history',
+        _ORPHAN_ACCOUNT.format(table='animal_history'),
+        f'''UPDATE animal_history SET clinic_id = account.clinic_id FROM {_ACCOUNT_CLINIC}
+           WHERE animal_history.id > :lo AND animal_history.id <= :hi
+             AND account.user_id = animal_history.clinic_id AND {{where}}''',
+        joins=f'JOIN {_ACCOUNT_CLINIC} ON account.user_id = animal_history.clinic_id',
+    ),
+]
+
+FIXES_BY_NAME = {fix.name: fix for fix in FIXES}
+
+
+class MaintenanceResult:
+    """Resumo de uma correção: linhas alteradas, lotes e de onde recomeçou."""
+
+    def __init__(self, fix, dry_run=False):
+        self.fix = fix
+        self.dry_run = dry_run
+        self.changed = 0
+        self.chunks = 0
+        self.resumed_from = 0
+        self.elapsed = 0.0
+
+    def summary(self):
+        if self.dry_run:
+            return f'[simulação] {self.fix.name}: {self.changed} linhas seriam alteradas'
+        resumed = f', retomada após o id {self.resumed_from}' if self.resumed_from else ''
+        return (f'{self.fix.name}: {self.changed} linhas alteradas em {self.chunks} lotes, '
+                f'{self.elapsed:.2f}s{resumed}')
+
+
+def _ensure_checkpoint_table(conn):
+    conn.execute(text(CHECKPOINT_TABLE))
+
+
+def checkpoints(conn=None):
+    """Correções interrompidas: ``{nome: (último id, linhas alteradas, atualizado em)}``."""
+    conn = conn or db.session.connection()
+    _ensure_checkpoint_table(conn)
+    rows = conn.execute(text('SELECT name, last_id, changed, updated_at FROM maintenance_checkpoint'))
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def _save_checkpoint(conn, name, last_id, changed):
+    conn.execute(text(
+        'INSERT INTO maintenance_checkpoint (name, last_id, changed, updated_at) '
+        'VALUES (:name, :last_id, :changed, :now) '
+        'ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id, changed = excluded.changed, '
+        'updated_at = excluded.updated_at'
+    ), {'name': name, 'last_id': last_id, 'changed': changed, 'now': datetime.utcnow()})
+
+
+def _next_bound(conn, table, lo, chunk_size):
+    """Maior id do próximo lote de ``chunk_size`` linhas após ``lo`` (ou o último id)."""
+    hi = conn.execute(text(f'SELECT id FROM {table} WHERE id > :lo ORDER BY id LIMIT 1 OFFSET :skip'),
+                      {'lo': lo, 'skip': chunk_size - 1}).scalar()
+    if hi is None:
+        hi = conn.execute(text(f'SELECT max(id) FROM {table} WHERE id > :lo'), {'lo': lo}).scalar()
+    return hi
+
+
+def run_fix(fix, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, restart=False, pause=0.0, progress=None):
+    """Roda uma correção em lotes, retomando do checkpoint se houver.
+
+    ``progress(result, last_id, max_id)`` é chamado depois de cada lote.
+    """
+    if isinstance(fix, str):
+        fix = FIXES_BY_NAME[fix]
+    started = time.perf_counter()
+    result = MaintenanceResult(fix, dry_run)
+    conn = db.session.connection()
+    _ensure_checkpoint_table(conn)
+    if restart:
+        conn.execute(text('DELETE FROM maintenance_checkpoint WHERE name = :name'), {'name': fix.name})
+    saved = checkpoints(conn).get(fix.name)
+    lo = result.resumed_from = saved[0] if saved else 0
+    if dry_run:
+        result.changed = fix.count(conn, lo)
+        db.session.commit()
+        return result
+    result.changed = saved[1] if saved else 0
+    max_id = conn.execute(text(f'SELECT max(id) FROM {fix.table}')).scalar() or 0
+    db.session.commit()
+
+    while lo < max_id:
+        try:
+            conn = db.session.connection()
+            hi = _next_bound(conn, fix.table, lo, chunk_size)
+            if hi is None:
+                break
+            hi = min(hi, max_id)
+            result.changed += fix.apply(conn, lo, hi)
+            _save_checkpoint(conn, fix.name, hi, result.changed)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        lo = hi
+        result.chunks += 1
+        if progress:
+            progress(result, lo, max_id)
+        if pause and lo < max_id:
+            time.sleep(pause)
+
+    db.session.execute(text('DELETE FROM maintenance_checkpoint WHERE name = :name'), {'name': fix.name})
+    db.session.commit()
+    result.elapsed = time.perf_counter() - started
+    return result
+
@@ -0,0 +1,239 @@
+"""Métricas no formato texto do Prometheus (``GET /metrics``).
+
+Dois tipos de série:
+
+- **contadores do processo**, atualizados no caminho quente: histograma de
+  latência por endpoint, requisições por status e logins com sucesso ou
+  falha. Cada atualização é um incremento em dicionário sob um único lock
+  (alguns microssegundos, sem I/O). Os valores são por processo; com vários
+  workers o Prometheus soma as instâncias;
+- **gauges de negócio**, calculados só na coleta e guardados por
+  ``METRICS_GAUGE_TTL`` segundos: animais por status e fila ``Aguard*``
+  por clínica (somas da tabela ``animal_counter``), agendamentos com token
+  ainda não validado (índice parcial ``ix_animal_unvalidated``), tamanho
+  da outbox de SMS (índice ``(status, next_attempt_at)``), uso do pool de
+  conexões e assinantes SSE.
+
+Com ``METRICS_TOKEN`` definido a coleta exige ``Authorization: Bearer
+<token>``; sem ele o endpoint é aberto (restrinja no proxy).
+"""
+import bisect
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import func, literal_column, select
+
+try:
+    from .extensions import db
+    from .models import Animal, AnimalCounter, SmsOutbox
+except Exception:
+    from extensions import db
+    from models import Animal, AnimalCounter, SmsOutbox
+
+PREFIX = 'app_vet'
+# limites (segundos) dos baldes do histograma, como os padrões do client_python
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_GAUGE_TTL = 10
+OUTBOX_STATUSES = ('pending', 'sending', 'failed')
+
+# mesmas condições do índice parcial ix_animal_unvalidated, em SQL literal:
+# com parâmetros (``?``) o SQLite não reconhece o índice parcial, e com
+# ``status = ...`` ele prefere o índice de status
+UNVALIDATED_CRITERIA = (
+    Animal.status.concat(literal_column("''")) == literal_column("'Agendado'"),
+    Animal.token_validated == literal_column('0'),
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Contadores e histogramas do processo, protegidos por um único lock."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        # (endpoint, método) -> [contagem por balde..., +Inf], soma
+        self._latency = {}
+        self._latency_sum = {}
+        # (endpoint, método, status) -> total
+        self._requests = {}
+        # resultado ('success' | 'failure') -> total
+        self._logins = {'success': 0, 'failure': 0}
+        self._gauges = None
+        self._gauges_at = 0.0
+        self._gauges_lock = threading.Lock()
+
+    def observe_request(self, endpoint, method, status, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        key = (endpoint, method)
+        with self._lock:
+            counts = self._latency.get(key)
+            if counts is None:
+                counts = self._latency[key] = [0] * (len(self.buckets) + 1)
+                self._latency_sum[key] = 0.0
+            counts[index] += 1
+            self._latency_sum[key] += seconds
+            rkey = (endpoint, method, status)
+            self._requests[rkey] = self._requests.get(rkey, 0) + 1
+
+    def count_login(self, success):
+        with self._lock:
+            self._logins['success' if success else 'failure'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return ({key: list(counts) for key, counts in self._latency.items()}, dict(self._latency_sum),
+                    dict(self._requests), dict(self._logins))
+
+    def gauges(self, ttl):
+        """Gauges de negócio, recalculados no máximo a cada ``ttl`` segundos."""
+        with self._gauges_lock:
+            if self._gauges is None or time.monotonic() - self._gauges_at >= ttl:
+                self._gauges = collect_gauges()
+                self._gauges_at = time.monotonic()
+            return self._gauges
+
+
+def collect_gauges():
+    """Consultas baratas (tabela de contadores e índices) para os gauges de negócio."""
+    by_status = db.session.execute(
+        select(AnimalCounter.status, func.sum(AnimalCounter.total))
+        .group_by(AnimalCounter.status)
+    ).all()
+    waiting = db.session.execute(
+        select(AnimalCounter.clinic_id, func.sum(AnimalCounter.total))
+        # mesma faixa da fila em backend/services.py ('Aguardando' e variantes)
+        .where(AnimalCounter.status >= 'Aguard', AnimalCounter.status < 'Aguare')
+        .group_by(AnimalCounter.clinic_id)
+    ).all()
+    unvalidated = db.session.execute(
+        select(Animal.clinic_id, func.count())
+        .where(*UNVALIDATED_CRITERIA)
+        .group_by(Animal.clinic_id)
+    ).all()
+    outbox = dict(db.session.execute(
+        select(SmsOutbox.status, func.count())
+        .where(SmsOutbox.status.in_(OUTBOX_STATUSES))
+        .group_by(SmsOutbox.status)
+    ).all())
+    db.session.commit()
+    return {
+        'animals': [(status, total) for status, total in by_status if total],
+        # clinic_id 0 no contador = animal ainda não reivindicado
+        'waiting': [(clinic_id or '', total) for clinic_id, total in waiting if total],
+        'unvalidated': [(clinic_id or '', total) for clinic_id, total in unvalidated],
+        'outbox': [(status, outbox.get(status, 0)) for status in OUTBOX_STATUSES],
+    }
+
+
+def _pool_stats():
+    pool = db.engine.pool
+    stats = {}
+    for name in ('size', 'checkedout', 'overflow', 'checkedin'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if 'overflow' in stats:
+        # QueuePool.overflow() começa em -size; só interessa o que passou do pool
+        stats['overflow'] = max(stats['overflow'], 0)
+    return stats
+
+
+def render(app):
+    """Texto de exposição do Prometheus com todas as séries."""
+    metrics = app.extensions['metrics']
+    latency, latency_sum, requests, logins = metrics.snapshot()
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+    def sample(name, value, **labels):
+        lines.append(f'{PREFIX}_{name}{_labels(**labels)} {_number(value)}')
+
+    family('http_request_duration_seconds', 'histogram', 'Latência das requisições por endpoint.')
+    for (endpoint, method), counts in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip((*metrics.buckets, float('inf')), counts):
+            cumulative += count
+            sample('http_request_duration_seconds_bucket', cumulative,
+                   endpoint=endpoint, method=method, le=_number(bound))
+        sample('http_request_duration_seconds_sum', latency_sum[(endpoint, method)], endpoint=endpoint, method=method)
+        sample('http_request_duration_seconds_count', cumulative, endpoint=endpoint, method=method)
+
+    family('http_requests_total', 'counter', 'Requisições por endpoint, método e status.')
+    for (endpoint, method, status), total in sorted(requests.items()):
+        sample('http_requests_total', total, endpoint=endpoint, method=method, status=status)
+
+    family('logins_total', 'counter', 'Tentativas de login por resultado.')
+    for result, total in sorted(logins.items()):
+        sample('logins_total', total, result=result)
+
+    family('db_pool_connections', 'gauge', 'Conexões do pool do SQLAlchemy por estado.')
+    for state, value in _pool_stats().items():
+        sample('db_pool_connections', value, state=state)
+
+    broker = app.extensions.get('events_broker')
+    if broker is not None and hasattr(broker, 'subscriber_count'):
+        family('sse_subscribers', 'gauge', 'Conexões SSE abertas neste processo.')
+        sample('sse_subscribers', broker.subscriber_count())
+
+    gauges = metrics.gauges(app.config.get('METRICS_GAUGE_TTL', DEFAULT_GAUGE_TTL))
+    family('animals', 'gauge', 'Animais na tabela ativa por status.')
+    for status, total in gauges['animals']:
+        sample('animals', total, status=status)
+    family('waiting_animals', 'gauge', 'Animais Aguardando por clínica (vazio = não reivindicado).')
+    for clinic_id, total in gauges['waiting']:
+        sample('waiting_animals', total, clinic_id=clinic_id)
+    family('unvalidated_appointments', 'gauge', 'Agendamentos com token ainda não validado por clínica.')
+    for clinic_id, total in gauges['unvalidated']:
+        sample('unvalidated_appointments', total, clinic_id=clinic_id)
+    family('sms_outbox', 'gauge', 'Mensagens na outbox de SMS por status.')
+    for status, total in gauges['outbox']:
+        sample('sms_outbox', total, status=status)
+
+    family('process_start_time_seconds', 'gauge', 'Início do processo (epoch).')
+    sample('process_start_time_seconds', metrics.started_at)
+    return '\n'.join(lines) + '\n'
+
+
+def get_metrics(app):
+    return app.extensions['metrics']
+
+
+def init_metrics(app):
+    """Registra o coletor da aplicação e os ganchos de latência por requisição."""
+    app.config.setdefault('METRICS_GAUGE_TTL', DEFAULT_GAUGE_TTL)
+    metrics = app.extensions['metrics'] = Metrics()
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started = g.pop('_metrics_t0', None)
+        if started is not None:
+            metrics.observe_request(request.endpoint or 'unmatched', request.method, response.status_code,
+                                    time.perf_counter() - started)
+        return response
+
+    return metrics
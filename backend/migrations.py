@@ -0,0 +1,374 @@
+"""Migrações de esquema versionadas para bancos já existentes.
+
+`db.create_all()` só cria tabelas que não existem: índices e colunas novas
+nunca chegam a um `instance/pets.db` antigo. Cada migração abaixo tem uma
+versão inteira crescente e é aplicada uma única vez; as versões aplicadas
+ficam registradas na tabela ``schema_migrations``.
+
+Para adicionar uma migração, acrescente uma função decorada com
+``@migration(<próxima versão>, '<descrição>')``. Ela recebe uma conexão
+SQLAlchemy já dentro de uma transação e deve ser idempotente (``IF NOT
+EXISTS``), pois bancos novos já saem do `create_all` no formato atual.
+
+O SQL de cada migração fica escrito no corpo dela, como era naquela versão:
+não chame ``install()``/``rebuild()`` dos módulos, que mudam depois e
+alterariam o que uma migração antiga faz. Mudou um trigger ou uma tabela?
+Escreva uma migração nova.
+"""
+import logging
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+
+@migration(1, 'índices das colunas de filtro de animal e clinic.user_id')
+def _add_hot_indexes(conn):
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_animal_dono_id_id ON animal (dono_id, id)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_animal_clinic_id_id ON animal (clinic_id, id)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_animal_status_clinic_id ON animal (status, clinic_id)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_clinic_user_id ON clinic (user_id)'))
+
+
+@migration(2, 'tabela sms_outbox (fila de SMS)')
+def _add_sms_outbox(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS sms_outbox ('
+        ' id INTEGER NOT NULL PRIMARY KEY,'
+        ' phone VARCHAR(100) NOT NULL,'
+        ' message TEXT NOT NULL,'
+        ' status VARCHAR(20) NOT NULL,'
+        ' attempts INTEGER NOT NULL,'
+        ' next_attempt_at DATETIME NOT NULL,'
+        ' last_error VARCHAR(255),'
+        ' created_at DATETIME NOT NULL,'
+        ' sent_at DATETIME)'
+    ))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_sms_outbox_status_next_attempt '
+                      'ON sms_outbox (status, next_attempt_at)'))
+
+
+@migration(3, 'tabela animal_counter (contadores materializados)')
+def _add_animal_counter(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS animal_counter ('
+        ' clinic_id INTEGER NOT NULL,'
+        ' status VARCHAR(50) NOT NULL,'
+        ' procedimento VARCHAR(200) NOT NULL,'
+        ' dia VARCHAR(10) NOT NULL,'
+        ' total INTEGER NOT NULL,'
+        ' PRIMARY KEY (clinic_id, status, procedimento, dia))'
+    ))
+    # baldes como em backend/counters.py nesta versão: 0/'' = vazio e
+    # procedimento em minúsculas, sem espaços e sem a grafia sem acento
+    rows = conn.execute(text(
+        "SELECT coalesce(clinic_id, 0), trim(coalesce(status, '')), procedimento,"
+        " coalesce(date(data_agendamento), ''), count(*)"
+        ' FROM animal GROUP BY clinic_id, status, procedimento, date(data_agendamento)'
+    ))
+    totals = Counter()
+    for clinic_id, status, procedimento, dia, total in rows:
+        procedimento = (procedimento or '').strip().lower()
+        procedimento = {'castracao': 'castração'}.get(procedimento, procedimento)
+        totals[clinic_id, status, procedimento, dia] += total
+    conn.execute(text('DELETE FROM animal_counter'))
+    if totals:
+        conn.execute(text(
+            'INSERT INTO animal_counter (clinic_id, status, procedimento, dia, total)'
+            ' VALUES (:clinic_id, :status, :procedimento, :dia, :total)'
+        ), [{'clinic_id': key[0], 'status': key[1], 'procedimento': key[2], 'dia': key[3], 'total': n}
+            for key, n in totals.items()])
+
+
+@migration(4, 'índices de busca textual FTS5 (animal_search, clinic_search) e triggers')
+def _add_search_index(conn):
+    animal_row = (
+        'INSERT INTO animal_search (rowid, nome, especie, raca, procedimento, tutor, tutor_contato,'
+        ' clinica, clinica_endereco)'
+        ' VALUES (new.id, new.nome, new.especie, new.raca, new.procedimento,'
+        ' (SELECT username FROM "user" WHERE id = new.dono_id),'
+        ' (SELECT contato FROM "user" WHERE id = new.dono_id),'
+        ' (SELECT nome FROM clinic WHERE id = new.clinic_id),'
+        ' (SELECT endereco FROM clinic WHERE id = new.clinic_id));'
+    )
+    clinic_row = ('INSERT INTO clinic_search (rowid, nome, endereco, telefone)'
+                  ' VALUES (new.id, new.nome, new.endereco, new.telefone);')
+    statements = [
+        'CREATE VIRTUAL TABLE IF NOT EXISTS animal_search USING fts5('
+        'nome, especie, raca, procedimento, tutor, tutor_contato, clinica, clinica_endereco,'
+        " tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        'CREATE VIRTUAL TABLE IF NOT EXISTS clinic_search USING fts5('
+        "nome, endereco, telefone, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+
+        f'CREATE TRIGGER IF NOT EXISTS animal_search_ai AFTER INSERT ON animal BEGIN {animal_row} END',
+        'CREATE TRIGGER IF NOT EXISTS animal_search_au'
+        ' AFTER UPDATE OF nome, especie, raca, procedimento, dono_id, clinic_id ON animal BEGIN'
+        f' DELETE FROM animal_search WHERE rowid = old.id; {animal_row} END',
+        'CREATE TRIGGER IF NOT EXISTS animal_search_ad AFTER DELETE ON animal BEGIN'
+        ' DELETE FROM animal_search WHERE rowid = old.id; END',
+        'CREATE TRIGGER IF NOT EXISTS animal_search_user_au AFTER UPDATE OF username, contato ON "user" BEGIN'
+        ' UPDATE animal_search SET tutor = new.username, tutor_contato = new.contato'
+        ' WHERE rowid IN (SELECT id FROM animal WHERE dono_id = new.id); END',
+        'CREATE TRIGGER IF NOT EXISTS animal_search_clinic_au AFTER UPDATE OF nome, endereco ON clinic BEGIN'
+        ' UPDATE animal_search SET clinica = new.nome, clinica_endereco = new.endereco'
+        ' WHERE rowid IN (SELECT id FROM animal WHERE clinic_id = new.id); END',
+        'CREATE TRIGGER IF NOT EXISTS animal_search_clinic_ad AFTER DELETE ON clinic BEGIN'
+        ' UPDATE animal_search SET clinica = NULL, clinica_endereco = NULL'
+        ' WHERE rowid IN (SELECT id FROM animal WHERE clinic_id = old.id); END',
+
+        f'CREATE TRIGGER IF NOT EXISTS clinic_search_ai AFTER INSERT ON clinic BEGIN {clinic_row} END',
+        'CREATE TRIGGER IF NOT EXISTS clinic_search_au AFTER UPDATE OF nome, endereco, telefone ON clinic BEGIN'
+        f' DELETE FROM clinic_search WHERE rowid = old.id; {clinic_row} END',
+        'CREATE TRIGGER IF NOT EXISTS clinic_search_ad AFTER DELETE ON clinic BEGIN'
+        ' DELETE FROM clinic_search WHERE rowid = old.id; END',
+    ]
+    try:
+        for statement in statements:
+            conn.execute(text(statement))
+    except OperationalError as exc:
+        if 'fts5' not in str(exc):
+            raise
+        # a busca cai para LIKE (backend/search.py)
+        logger.warning('SQLite sem FTS5; a busca usará LIKE (%s)', exc)
+        return
+
+    # indexa o conteúdo atual
+    conn.execute(text('DELETE FROM animal_search'))
+    conn.execute(text(
+        'INSERT INTO animal_search (rowid, nome, especie, raca, procedimento, tutor, tutor_contato,'
+        ' clinica, clinica_endereco)'
+        ' SELECT a.id, a.nome, a.especie, a.raca, a.procedimento, u.username, u.contato, c.nome, c.endereco'
+        ' FROM animal a LEFT JOIN "user" u ON u.id = a.dono_id LEFT JOIN clinic c ON c.id = a.clinic_id'
+    ))
+    conn.execute(text('DELETE FROM clinic_search'))
+    conn.execute(text('INSERT INTO clinic_search (rowid, nome, endereco, telefone)'
+                      ' SELECT id, nome, endereco, telefone FROM clinic'))
+    conn.execute(text("INSERT INTO animal_search (animal_search) VALUES ('optimize')"))
+    conn.execute(text("INSERT INTO clinic_search (clinic_search) VALUES ('optimize')"))
+
+
+@migration(5, 'tabela change_version e triggers (ETags da API)')
+def _add_change_versions(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS change_version ('
+        ' scope VARCHAR(40) NOT NULL PRIMARY KEY,'
+        ' version INTEGER NOT NULL)'
+    ))
+    bump = ' ON CONFLICT (scope) DO UPDATE SET version = version + 1;'
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS change_version_animal_ai AFTER INSERT ON animal BEGIN'
+        " INSERT INTO change_version (scope, version) VALUES ('all', 1),"
+        " ('clinic:' || coalesce(new.clinic_id, 0), 1), ('user:' || new.dono_id, 1)" + bump + ' END'
+    ))
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS change_version_animal_au AFTER UPDATE ON animal BEGIN'
+        " INSERT INTO change_version (scope, version) VALUES ('all', 1),"
+        " ('clinic:' || coalesce(old.clinic_id, 0), 1), ('user:' || old.dono_id, 1)" + bump +
+        " INSERT INTO change_version (scope, version) VALUES"
+        " ('clinic:' || coalesce(new.clinic_id, 0), 1), ('user:' || new.dono_id, 1)" + bump + ' END'
+    ))
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS change_version_animal_ad AFTER DELETE ON animal BEGIN'
+        " INSERT INTO change_version (scope, version) VALUES ('all', 1),"
+        " ('clinic:' || coalesce(old.clinic_id, 0), 1), ('user:' || old.dono_id, 1)" + bump + ' END'
+    ))
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS change_version_clinic_ai AFTER INSERT ON clinic BEGIN'
+        " INSERT INTO change_version (scope, version) VALUES ('clinics', 1)" + bump + ' END'
+    ))
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS change_version_clinic_au AFTER UPDATE ON clinic BEGIN'
+        " INSERT INTO change_version (scope, version) VALUES ('clinics', 1), ('clinic:' || new.id, 1)"
+        + bump + ' END'
+    ))
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS change_version_clinic_ad AFTER DELETE ON clinic BEGIN'
+        " INSERT INTO change_version (scope, version) VALUES ('clinics', 1), ('clinic:' || old.id, 1)"
+        + bump + ' END'
+    ))
+
+
+@migration(6, 'tabela clinic_hours e índice de agendamentos por clínica')
+def _add_clinic_hours(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS clinic_hours ('
+        ' clinic_id INTEGER NOT NULL REFERENCES clinic (id),'
+        ' weekday INTEGER NOT NULL,'
+        ' abertura VARCHAR(5) NOT NULL,'
+        ' fechamento VARCHAR(5) NOT NULL,'
+        ' slot_minutos INTEGER NOT NULL,'
+        ' PRIMARY KEY (clinic_id, weekday))'
+    ))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_animal_clinic_id_agendamento '
+                      'ON animal (clinic_id, data_agendamento)'))
+
+
+@migration(7, 'tabela appointment_reminder e índice de animal.data_agendamento')
+def _add_appointment_reminders(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS appointment_reminder ('
+        ' animal_id INTEGER NOT NULL,'
+        ' data_agendamento DATETIME NOT NULL,'
+        ' sent_at DATETIME NOT NULL,'
+        ' PRIMARY KEY (animal_id, data_agendamento))'
+    ))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_animal_data_agendamento ON animal (data_agendamento)'))
+
+
+@migration(8, 'tabela animal_history (atendimentos concluídos arquivados)')
+def _add_animal_history(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS animal_history ('
+        ' id INTEGER NOT NULL PRIMARY KEY,'
+        ' nome VARCHAR(150) NOT NULL,'
+        ' especie VARCHAR(100) NOT NULL,'
+        ' raca VARCHAR(100),'
+        ' idade INTEGER,'
+        ' contato VARCHAR(100),'
+        ' procedimento VARCHAR(200),'
+        ' dono_id INTEGER NOT NULL REFERENCES user (id),'
+        ' clinic_id INTEGER REFERENCES clinic (id),'
+        ' data_agendamento DATETIME,'
+        ' status VARCHAR(50) NOT NULL,'
+        ' token_validated BOOLEAN NOT NULL,'
+        ' data_conclusao DATETIME,'
+        ' archived_at DATETIME NOT NULL)'
+    ))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_animal_history_dono_id_id ON animal_history (dono_id, id)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_animal_history_clinic_id_id ON animal_history (clinic_id, id)'))
+
+
+@migration(9, 'índice parcial de agendamentos com token não validado')
+def _add_unvalidated_index(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_animal_unvalidated ON animal (clinic_id, status, token_validated) "
+        "WHERE status || '' = 'Agendado' AND token_validated = 0"
+    ))
+
+
+@migration(10, 'versões por animal (cache de fragmentos de HTML)')
+def _add_animal_row_versions(conn):
+    for name, event, row in (('ai', 'INSERT', 'new'), ('au', 'UPDATE', 'old'), ('ad', 'DELETE', 'old')):
+        conn.execute(text(
+            f'CREATE TRIGGER IF NOT EXISTS change_version_animal_row_{name} AFTER {event} ON animal BEGIN'
+            f" INSERT INTO change_version (scope, version) VALUES ('animal:' || {row}.id, 1)"
+            ' ON CONFLICT (scope) DO UPDATE SET version = version + 1; END'
+        ))
+
+
+@migration(11, 'id próprio em animal_history (id original em animal_id)')
+def _add_history_surrogate_id(conn):
+    columns = {row[1] for row in conn.execute(text('PRAGMA table_info(animal_history)'))}
+    if 'animal_id' in columns:
+        return
+    # SQLite não troca a chave primária no lugar: recria a tabela e copia as linhas
+    conn.execute(text(
+        'CREATE TABLE animal_history_new ('
+        ' id INTEGER NOT NULL PRIMARY KEY,'
+        ' animal_id INTEGER NOT NULL,'
+        ' nome VARCHAR(150) NOT NULL,'
+        ' especie VARCHAR(100) NOT NULL,'
+        ' raca VARCHAR(100),'
+        ' idade INTEGER,'
+        ' contato VARCHAR(100),'
+        ' procedimento VARCHAR(200),'
+        ' dono_id INTEGER NOT NULL REFERENCES user (id),'
+        ' clinic_id INTEGER REFERENCES clinic (id),'
+        ' data_agendamento DATETIME,'
+        ' status VARCHAR(50) NOT NULL,'
+        ' token_validated BOOLEAN NOT NULL,'
+        ' data_conclusao DATETIME,'
+        ' archived_at DATETIME NOT NULL)'
+    ))
+    copied = ('nome, especie, raca, idade, contato, procedimento, dono_id, clinic_id, data_agendamento, '
+              'status, token_validated, data_conclusao, archived_at')
+    # mantém a ordem de arquivamento (a paginação do histórico é por id)
+    conn.execute(text(
+        f'INSERT INTO animal_history_new (animal_id, {copied}) '
+        f'SELECT id, {copied} FROM animal_history ORDER BY archived_at, id'
+    ))
+    conn.execute(text('DROP TABLE animal_history'))
+    conn.execute(text('ALTER TABLE animal_history_new RENAME TO animal_history'))
+    conn.execute(text('CREATE INDEX ix_animal_history_dono_id_id ON animal_history (dono_id, id)'))
+    conn.execute(text('CREATE INDEX ix_animal_history_clinic_id_id ON animal_history (clinic_id, id)'))
+
+
+@migration(12, 'versão de nomes de usuário (cache de fragmentos de HTML)')
+def _add_user_versions(conn):
+    conn.execute(text(
+        'CREATE TRIGGER IF NOT EXISTS change_version_user_au AFTER UPDATE OF username ON "user" BEGIN'
+        " INSERT INTO change_version (scope, version) VALUES ('users', 1)"
+        ' ON CONFLICT (scope) DO UPDATE SET version = version + 1; END'
+    ))
+
+
+@migration(13, 'índice de user.email sem diferenciar maiúsculas')
+def _add_user_email_lower_index(conn):
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_user_email_lower ON user (lower(email))'))
+
+
+@migration(14, 'clinic.deleting_since (remoção em lotes em andamento)')
+def _add_clinic_deleting_since(conn):
+    columns = {row[1] for row in conn.execute(text('PRAGMA table_info(clinic)'))}
+    if 'deleting_since' not in columns:
+        conn.execute(text('ALTER TABLE clinic ADD COLUMN deleting_since DATETIME'))
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        ' version INTEGER PRIMARY KEY,'
+        ' description VARCHAR(255) NOT NULL,'
+        ' applied_at DATETIME NOT NULL)'
+    ))
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def current_version(engine):
+    return max(applied_versions(engine), default=0)
+
+
+def pending_migrations(engine):
+    applied = applied_versions(engine)
+    return [item for item in MIGRATIONS if item[0] not in applied]
+
+
+def upgrade(engine, target=None):
+    """Aplica as migrações pendentes (até ``target``, se informado).
+
+    Cada migração roda na sua própria transação junto com o registro da
+    versão, então uma falha não deixa o banco marcado como migrado.
+    Retorna a lista de versões aplicadas.
+    """
+    applied = []
+    for version, description, func in pending_migrations(engine):
+        if target is not None and version > target:
+            break
+        logger.info('Aplicando migração %s: %s', version, description)
+        with engine.begin() as conn:
+            func(conn)
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+            )
+        applied.append(version)
+    return applied
@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from .extensions import db
+from .passwords import hash_password, verify_password, needs_rehash
 
 
 class User(db.Model, UserMixin):
@@ -16,10 +16,17 @@ class User(db.Model, UserMixin):
     animais = db.relationship('Animal', backref='dono', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method="pbkdf2:sha256")
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
+
+
+# busca de tutores por email sem diferenciar maiúsculas (importação em lote)
+db.Index('ix_user_email_lower', db.func.lower(User.email))
 
 
 class Clinic(db.Model):
@@ -29,14 +36,36 @@ class Clinic(db.Model):
     telefone = db.Column(db.String(100), nullable=True)
 
     # usuário responsável (conta de clínica)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
     user = db.relationship('User', backref=db.backref('clinic', uselist=False))
 
-    # relação com animais atendidos
-    animais = db.relationship('Animal', backref='clinic', lazy=True)
+    # relação com animais atendidos; a remoção da clínica não os carrega
+    # (comandos em lote de backend/clinic_deletion.py)
+    animais = db.relationship('Animal', backref='clinic', lazy=True, passive_deletes=True)
+
+    # horários de atendimento por dia da semana (removidos junto com a clínica)
+    horarios = db.relationship('ClinicHours', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+
+    # remoção em lotes em andamento desde (renovado a cada lote); NULL se nenhuma
+    deleting_since = db.Column(db.DateTime, nullable=True)
 
 
 class Animal(db.Model):
+    # índices das consultas quentes (listagens por tutor/clínica em ordem de id
+    # e relatórios por status); mantenha em sincronia com backend/migrations.py
+    __table_args__ = (
+        db.Index('ix_animal_dono_id_id', 'dono_id', 'id'),
+        db.Index('ix_animal_clinic_id_id', 'clinic_id', 'id'),
+        db.Index('ix_animal_status_clinic_id', 'status', 'clinic_id'),
+        db.Index('ix_animal_clinic_id_agendamento', 'clinic_id', 'data_agendamento'),
+        db.Index('ix_animal_data_agendamento', 'data_agendamento'),
+        # parcial: só os agendamentos com token pendente (gauge de /metrics);
+        # ``status || ''`` como em backend/metrics.py, para o planejador não
+        # trocar este índice pelo de status
+        db.Index('ix_animal_unvalidated', 'clinic_id', 'status', 'token_validated',
+                 sqlite_where=db.text("status || '' = 'Agendado' AND token_validated = 0")),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(150), nullable=False)
     especie = db.Column(db.String(100), nullable=False)
@@ -57,3 +86,104 @@ class Animal(db.Model):
     @property
     def agendamento(self):
         return self.data_agendamento.strftime('%d/%m/%Y %H:%M') if self.data_agendamento else ''
+
+
+class AnimalHistory(db.Model):
+    """Atendimentos concluídos arquivados fora de ``animal`` (backend/archive.py).
+
+    Mesmas colunas de ``Animal`` (sem o token de verificação) mais a data do
+    arquivamento. O ``id`` é próprio do histórico; o do animal original fica
+    em ``animal_id``, pois o SQLite pode reutilizar ids removidos de ``animal``.
+    """
+    __tablename__ = 'animal_history'
+    __table_args__ = (
+        db.Index('ix_animal_history_dono_id_id', 'dono_id', 'id'),
+        db.Index('ix_animal_history_clinic_id_id', 'clinic_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    animal_id = db.Column(db.Integer, nullable=False)
+    nome = db.Column(db.String(150), nullable=False)
+    especie = db.Column(db.String(100), nullable=False)
+    raca = db.Column(db.String(100), nullable=True)
+    idade = db.Column(db.Integer, nullable=True)
+    contato = db.Column(db.String(100), nullable=True)
+    procedimento = db.Column(db.String(200), nullable=True)
+
+    dono_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    clinic_id = db.Column(db.Integer, db.ForeignKey('clinic.id'), nullable=True)
+
+    data_agendamento = db.Column(db.DateTime, nullable=True)
+    status = db.Column(db.String(50), nullable=False)
+    token_validated = db.Column(db.Boolean, nullable=False, default=False)
+    data_conclusao = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    dono = db.relationship('User', viewonly=True)
+    clinic = db.relationship('Clinic', viewonly=True)
+
+    @property
+    def agendamento(self):
+        return self.data_agendamento.strftime('%d/%m/%Y %H:%M') if self.data_agendamento else ''
+
+
+class ClinicHours(db.Model):
+    """Horário de atendimento de uma clínica em um dia da semana (0 = segunda).
+
+    Dias sem linha não têm atendimento; clínicas sem nenhuma linha usam os
+    padrões ``SCHEDULE_*`` da configuração (ver backend/scheduling.py).
+    """
+    __tablename__ = 'clinic_hours'
+
+    clinic_id = db.Column(db.Integer, db.ForeignKey('clinic.id'), primary_key=True)
+    weekday = db.Column(db.Integer, primary_key=True)
+    abertura = db.Column(db.String(5), nullable=False)
+    fechamento = db.Column(db.String(5), nullable=False)
+    slot_minutos = db.Column(db.Integer, nullable=False, default=30)
+
+
+class AppointmentReminder(db.Model):
+    """Marca de lembrete já enfileirado para um agendamento (animal + horário).
+
+    Remarcar o animal gera outro horário e, portanto, um novo lembrete.
+    """
+    __tablename__ = 'appointment_reminder'
+
+    animal_id = db.Column(db.Integer, primary_key=True)
+    data_agendamento = db.Column(db.DateTime, primary_key=True)
+    sent_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class AnimalCounter(db.Model):
+    """Total de animais por (clínica, status, procedimento, dia do agendamento).
+
+    Mantido incrementalmente por backend/counters.py; ``clinic_id`` 0 e
+    strings vazias representam "sem clínica"/"sem valor" para caberem na
+    chave primária.
+    """
+    __tablename__ = 'animal_counter'
+
+    clinic_id = db.Column(db.Integer, primary_key=True, default=0)
+    status = db.Column(db.String(50), primary_key=True)
+    procedimento = db.Column(db.String(200), primary_key=True, default='')
+    dia = db.Column(db.String(10), primary_key=True, default='')
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SmsOutbox(db.Model):
+    """Fila persistente de SMS; drenada em lotes por backend.sms.OutboxWorker."""
+    __tablename__ = 'sms_outbox'
+    __table_args__ = (
+        db.Index('ix_sms_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    # pending -> sending -> sent | pending (nova tentativa) | failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
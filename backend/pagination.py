@@ -0,0 +1,95 @@
+"""Paginação por cursor (keyset) para as listagens de animais.
+
+Em vez de ``OFFSET``, cada página é buscada com ``WHERE id < :cursor ORDER BY
+id DESC LIMIT n``, então o custo de uma página não cresce com o tamanho da
+tabela. Os cursores são os próprios ids, passados em ``?after=`` (próxima
+página, registros mais antigos) e ``?before=`` (página anterior).
+"""
+from flask import current_app, request
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 200
+
+
+class KeysetPage:
+    """Uma página de resultados com os cursores de navegação."""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _int_arg(name):
+    value = request.args.get(name, type=int)
+    return value if value and value > 0 else None
+
+
+def get_per_page():
+    """Tamanho da página: ``?per_page=`` limitado por ``MAX_PER_PAGE``."""
+    default = current_app.config.get('ANIMALS_PER_PAGE', DEFAULT_PER_PAGE)
+    limit = current_app.config.get('ANIMALS_MAX_PER_PAGE', MAX_PER_PAGE)
+    per_page = request.args.get('per_page', type=int) or default
+    return max(1, min(per_page, limit))
+
+
+def keyset_paginate(query, column, after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """Pagina ``query`` em ordem decrescente de ``column`` (uma chave única).
+
+    ``after`` devolve os registros com chave menor que o cursor; ``before``
+    os imediatamente maiores (página anterior). Busca ``per_page + 1`` linhas
+    para saber se existe mais uma página sem precisar de ``COUNT``.
+    """
+    if before is not None:
+        rows = query.filter(column > before).order_by(column.asc()).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        if not items:
+            return KeysetPage(items, per_page)
+        return KeysetPage(
+            items, per_page,
+            next_cursor=_key(items[-1], column),
+            prev_cursor=_key(items[0], column) if has_more else None,
+        )
+
+    if after is not None:
+        query = query.filter(column < after)
+    rows = query.order_by(column.desc()).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    if not items:
+        return KeysetPage(items, per_page)
+    return KeysetPage(
+        items, per_page,
+        next_cursor=_key(items[-1], column) if has_more else None,
+        prev_cursor=_key(items[0], column) if after is not None else None,
+    )
+
+
+def paginate_request(query, column):
+    """Aplica :func:`keyset_paginate` usando ``after``/``before``/``per_page`` da requisição."""
+    return keyset_paginate(
+        query, column,
+        after=_int_arg('after'),
+        before=_int_arg('before'),
+        per_page=get_per_page(),
+    )
+
+
+def _key(item, column):
+    return getattr(item, column.key)
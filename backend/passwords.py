@@ -0,0 +1,107 @@
+"""Hash de senhas (pbkdf2:sha256) fora da thread da requisição.
+
+O pbkdf2 é propositalmente caro; rodando na thread do worker web, uma
+rajada de logins ocupa todos os workers e atrasa páginas baratas. Aqui o
+cálculo vai para um ``ProcessPoolExecutor`` limitado:
+
+- ``PASSWORD_POOL_SIZE``: processos do pool (0 = calcula na própria thread);
+- ``PASSWORD_POOL_MAX_PENDING``: máximo de hashes aguardando/executando; acima
+  disso :class:`PasswordPoolBusy` é levantada em vez de enfileirar sem limite;
+- ``PASSWORD_POOL_TIMEOUT``: segundos de espera por uma vaga/resultado;
+- ``PASSWORD_HASH_ITERATIONS``: custo do pbkdf2. Hashes gravados com outro
+  custo são refeitos no próximo login bem-sucedido (:func:`needs_rehash`).
+"""
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_ITERATIONS = 600000
+DEFAULT_POOL_SIZE = os.cpu_count() or 2
+DEFAULT_TIMEOUT = 10
+
+
+class PasswordPoolBusy(RuntimeError):
+    """O pool de hash está saturado; a requisição deve ser recusada/repetida."""
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_executor_pid = None
+
+
+def _config(key, default):
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+
+def hash_iterations():
+    return int(_config('PASSWORD_HASH_ITERATIONS', DEFAULT_ITERATIONS))
+
+
+def hash_method(iterations=None):
+    return f"pbkdf2:sha256:{iterations or hash_iterations()}"
+
+
+def _get_executor():
+    """Pool do processo atual (recriado após fork, ex.: workers do gunicorn)."""
+    global _executor, _slots, _executor_pid
+    size = int(_config('PASSWORD_POOL_SIZE', DEFAULT_POOL_SIZE))
+    if size <= 0:
+        return None, None
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            # importado só aqui: multiprocessing não entra na inicialização
+            from concurrent.futures import ProcessPoolExecutor
+            max_pending = int(_config('PASSWORD_POOL_MAX_PENDING', size * 4))
+            _executor = ProcessPoolExecutor(max_workers=size)
+            _slots = threading.BoundedSemaphore(max_pending)
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+
+def _run(func, *args):
+    executor, slots = _get_executor()
+    if executor is None:
+        return func(*args)
+    timeout = float(_config('PASSWORD_POOL_TIMEOUT', DEFAULT_TIMEOUT))
+    if not slots.acquire(timeout=timeout):
+        raise PasswordPoolBusy('pool de hash de senha saturado')
+    try:
+        future = executor.submit(func, *args)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            # ainda na fila: não ocupa um processo depois que a requisição desistiu
+            future.cancel()
+            raise PasswordPoolBusy('pool de hash de senha não respondeu a tempo')
+    finally:
+        slots.release()
+
+
+def hash_password(password, iterations=None):
+    return _run(generate_password_hash, password, hash_method(iterations))
+
+
+def verify_password(pwhash, password):
+    if not pwhash or password is None:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash, iterations=None):
+    """True se o hash não usa pbkdf2:sha256 com o custo configurado."""
+    method = (pwhash or '').split('$', 1)[0]
+    return method != hash_method(iterations)
+
+
+def shutdown():
+    global _executor, _slots
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = _slots = None
@@ -0,0 +1,268 @@
+"""Instrumentação opcional das requisições (``PROFILING=1``).
+
+Para cada requisição registra o tempo total, quantos comandos SQL foram
+executados e quanto tempo levaram, as linhas lidas e o tempo de
+renderização dos templates. As medições vêm de:
+
+- eventos ``before_cursor_execute``/``after_cursor_execute`` do engine
+  (contagem e tempo de cada comando; o SQL mais repetido denuncia N+1, como
+  um ``animal.dono`` sem ``joinedload`` dentro de um laço do template);
+- evento ``load`` dos modelos (objetos materializados pelo ORM) somado ao
+  ``rowcount`` de INSERT/UPDATE/DELETE. Linhas de consultas Core (``select``
+  de colunas) não passam pelo ORM e não entram na conta;
+- sinais do Flask ``request_started``/``request_finished`` e
+  ``before_render_template``/``template_rendered``.
+
+Os registros ficam num buffer circular (``PROFILING_BUFFER`` mais recentes)
+exibido em ``/admin/profiling``, só para administradores. Com
+``PROFILING_SAMPLE`` > 0 essa fração das requisições também roda sob
+``cProfile`` e o resultado vai para ``PROFILING_DIR`` (``.prof``, abra com
+``python -m pstats`` ou snakeviz).
+
+Desligado (padrão) nada é registrado e os eventos nem são instalados.
+Respostas em streaming (SSE, exportações) são medidas até a resposta sair
+da view, não até o fim do envio.
+"""
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import before_render_template, g, has_request_context, request, request_finished, request_started, \
+    template_rendered
+from sqlalchemy import event
+
+try:
+    from .extensions import db
+except Exception:
+    from extensions import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER = 500
+# quantos caracteres do SQL mais repetido guardar no registro
+STATEMENT_PREVIEW = 200
+
+_whitespace = re.compile(r'\s+')
+
+
+class RequestProfile:
+    """Medições de uma requisição; ``as_dict`` é o formato do endpoint JSON."""
+
+    __slots__ = ('method', 'path', 'endpoint', 'status', 'started_at', 'wall_ms', 'sql_count', 'sql_ms',
+                 'rows', 'template_ms', 'templates', 'statements', 'profile_file', '_t0', '_sql_t0',
+                 '_template_t0', '_profiler')
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.endpoint = None
+        self.status = None
+        self.started_at = datetime.now()
+        self.wall_ms = 0.0
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.rows = 0
+        self.template_ms = 0.0
+        self.templates = []
+        self.statements = Counter()
+        self.profile_file = None
+        self._t0 = time.perf_counter()
+        self._sql_t0 = []
+        self._template_t0 = []
+        self._profiler = None
+
+    @property
+    def most_repeated(self):
+        """``(sql, vezes)`` do comando mais repetido, ou ``None``."""
+        if not self.statements:
+            return None
+        return self.statements.most_common(1)[0]
+
+    def as_dict(self):
+        repeated = self.most_repeated
+        return {
+            'method': self.method,
+            'path': self.path,
+            'endpoint': self.endpoint,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_ms': round(self.wall_ms, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_ms, 2),
+            'rows': self.rows,
+            'template_ms': round(self.template_ms, 2),
+            'templates': self.templates,
+            'most_repeated_sql': repeated[0][:STATEMENT_PREVIEW] if repeated else None,
+            'most_repeated_count': repeated[1] if repeated else 0,
+            'profile_file': self.profile_file,
+        }
+
+
+class ProfileBuffer:
+    """Buffer circular thread-safe com os últimos registros."""
+
+    def __init__(self, size=DEFAULT_BUFFER):
+        self._items = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        with self._lock:
+            self._items.append(record)
+
+    def recent(self, limit=None):
+        """Registros do mais recente para o mais antigo."""
+        with self._lock:
+            items = list(self._items)
+        items.reverse()
+        return items[:limit] if limit else items
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def by_endpoint(self):
+        """Agregado por endpoint: contagem, p50/p95/máx do tempo total e média/máx de SQL."""
+        groups = {}
+        for record in self.recent():
+            groups.setdefault(record.endpoint or record.path, []).append(record)
+        summary = []
+        for endpoint, records in groups.items():
+            walls = sorted(r.wall_ms for r in records)
+            counts = [r.sql_count for r in records]
+            summary.append({
+                'endpoint': endpoint,
+                'requests': len(records),
+                'wall_p50_ms': round(_percentile(walls, 50), 2),
+                'wall_p95_ms': round(_percentile(walls, 95), 2),
+                'wall_max_ms': round(walls[-1], 2),
+                'sql_avg': round(sum(counts) / len(counts), 1),
+                'sql_max': max(counts),
+                'sql_ms_avg': round(sum(r.sql_ms for r in records) / len(records), 2),
+                'template_ms_avg': round(sum(r.template_ms for r in records) / len(records), 2),
+            })
+        summary.sort(key=lambda item: item['wall_p95_ms'], reverse=True)
+        return summary
+
+
+def _percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def _current():
+    if not has_request_context():
+        return None
+    return g.get('_profile')
+
+
+# --- SQLAlchemy ---------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record = _current()
+    if record is not None:
+        record._sql_t0.append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record = _current()
+    if record is None or not record._sql_t0:
+        return
+    record.sql_ms += (time.perf_counter() - record._sql_t0.pop()) * 1000
+    record.sql_count += 1
+    record.statements[_whitespace.sub(' ', statement).strip()] += 1
+    if cursor.rowcount and cursor.rowcount > 0:
+        # SELECT no sqlite3 tem rowcount -1; aqui entram só as escritas
+        record.rows += cursor.rowcount
+
+
+def _on_load(target, context):
+    record = _current()
+    if record is not None:
+        record.rows += 1
+
+
+# --- Flask --------------------------------------------------------------------
+
+def _request_started(app, **extra):
+    record = RequestProfile(request.method, request.path)
+    rate = app.config.get('PROFILING_SAMPLE', 0)
+    if rate and random.random() < rate:
+        import cProfile
+        record._profiler = cProfile.Profile()
+        try:
+            record._profiler.enable()
+        except ValueError:
+            # outro profiler já ativo nesta thread
+            record._profiler = None
+    g._profile = record
+
+
+def _request_finished(app, response, **extra):
+    record = g.pop('_profile', None)
+    if record is None:
+        return
+    # antes do dump: o tempo de gravar o perfil não entra no da requisição
+    record.wall_ms = (time.perf_counter() - record._t0) * 1000
+    if record._profiler is not None:
+        record._profiler.disable()
+        record.profile_file = _dump(app, record)
+    record.endpoint = request.endpoint
+    record.status = response.status_code
+    app.extensions['profiling'].append(record)
+
+
+def _before_render(app, template, context, **extra):
+    record = _current()
+    if record is not None:
+        record._template_t0.append(time.perf_counter())
+
+
+def _rendered(app, template, context, **extra):
+    record = _current()
+    if record is None or not record._template_t0:
+        return
+    record.template_ms += (time.perf_counter() - record._template_t0.pop()) * 1000
+    record.templates.append(template.name)
+
+
+def _dump(app, record):
+    directory = app.config.get('PROFILING_DIR') or os.path.join(app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    name = f"{record.started_at:%Y%m%d-%H%M%S-%f}-{request.endpoint or 'unknown'}-{os.getpid()}.prof"
+    path = os.path.join(directory, name)
+    try:
+        record._profiler.dump_stats(path)
+    except OSError:
+        logger.exception('Falha ao gravar o perfil %s', path)
+        return None
+    finally:
+        record._profiler = None
+    return name
+
+
+def get_buffer(app):
+    """Buffer da aplicação, ou ``None`` com a instrumentação desligada."""
+    return app.extensions.get('profiling')
+
+
+def init_profiling(app):
+    """Instala os eventos quando ``PROFILING`` está ligado; retorna o buffer."""
+    if not app.config.get('PROFILING'):
+        return None
+    buffer = ProfileBuffer(app.config.get('PROFILING_BUFFER', DEFAULT_BUFFER))
+    app.extensions['profiling'] = buffer
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+    if not event.contains(db.Model, 'load', _on_load):
+        event.listen(db.Model, 'load', _on_load, propagate=True)
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    logger.info('Instrumentação de requisições ligada (buffer de %d registros)', buffer._items.maxlen)
+    return buffer
@@ -0,0 +1,219 @@
+"""Lembretes por SMS dos agendamentos das próximas horas.
+
+Um job periódico (``python run.py reminders`` no cron, ou a thread
+``REMINDER_WORKER=thread``) procura os animais ``Agendado`` com horário nas
+próximas ``REMINDER_HOURS`` horas. A busca é uma faixa no índice de
+``data_agendamento``. Os resultados são agrupados por tutor e telefone, e
+cada tutor recebe um SMS cobrindo todos os seus animais. As mensagens
+entram na outbox em lote pelo mesmo caminho de ``send_sms``.
+
+A marca de enviado é a tabela ``appointment_reminder`` (animal + horário).
+Cada lote grava as marcas e os SMS na mesma transação, então um job
+interrompido não deixa lembrete pela metade: a próxima execução refaz só o
+que não foi gravado. As marcas são inseridas com ``ON CONFLICT DO NOTHING
+RETURNING``, e só vira SMS o que este job marcou. Assim, dois jobs
+simultâneos não enviam o mesmo lembrete.
+"""
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, and_, exists, func, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+try:
+    from .extensions import db
+    from .models import Animal, AppointmentReminder, Clinic, User
+    from .services import send_sms_batch
+except Exception:
+    from extensions import db
+    from models import Animal, AppointmentReminder, Clinic, User
+    from services import send_sms_batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOURS = 24
+DEFAULT_BATCH_SIZE = 2000
+# ids por INSERT ... SELECT ... RETURNING das marcas (abaixo do limite de
+# variáveis do SQLite)
+MARK_CHUNK = 5000
+
+
+class ReminderResult:
+    """Resumo de uma execução: agendamentos, SMS enfileirados e vazão."""
+
+    def __init__(self):
+        self.appointments = 0
+        self.messages = 0
+        self.without_phone = 0
+        self.skipped = 0
+        self.batches = 0
+        self.elapsed = 0.0
+
+    def summary(self):
+        return (f"{self.appointments} agendamentos lembrados em {self.messages} SMS, "
+                f"{self.without_phone} sem telefone, {self.skipped} já lembrados por outro job, "
+                f"{self.batches} lotes em {self.elapsed:.2f}s")
+
+
+def due_criteria(start, end):
+    """Agendamentos em ``[start, end)`` ainda sem lembrete para o horário atual."""
+    reminded = exists().where(
+        AppointmentReminder.animal_id == Animal.id,
+        AppointmentReminder.data_agendamento == Animal.data_agendamento,
+    )
+    return and_(
+        Animal.data_agendamento >= start,
+        Animal.data_agendamento < end,
+        # ``status || ''`` tira o índice de status da disputa: sem estatísticas o
+        # SQLite prefere a igualdade em status (quase todos 'Agendado') à faixa
+        # de horários, que é o que limita a busca
+        Animal.status.concat('') == 'Agendado',
+        ~reminded,
+    )
+
+
+def due_appointments(start, end):
+    """Linhas ``(id, dono_id, nome, data_agendamento, phone, clinica)`` ordenadas por tutor."""
+    phone = func.coalesce(func.nullif(Animal.contato, ''), User.contato)
+    return db.session.execute(
+        select(Animal.id, Animal.dono_id, Animal.nome, Animal.data_agendamento,
+               phone.label('phone'), Clinic.nome.label('clinica'))
+        .join(User, User.id == Animal.dono_id)
+        .outerjoin(Clinic, Clinic.id == Animal.clinic_id)
+        .where(due_criteria(start, end))
+        .order_by(Animal.dono_id, Animal.data_agendamento, Animal.id)
+    ).all()
+
+
+def _describe(row):
+    return f"{row.nome} em {row.data_agendamento:%d/%m às %H:%M}" + (f" ({row.clinica})" if row.clinica else "")
+
+
+def format_message(rows):
+    """Um SMS para todos os animais do mesmo tutor/telefone."""
+    if len(rows) == 1:
+        return f"Lembrete: {_describe(rows[0])}. Leve o token recebido no agendamento."
+    return f"Lembrete dos agendamentos: {'; '.join(_describe(row) for row in rows)}. Leve os tokens recebidos."
+
+
+def _mark(rows, now):
+    """Grava as marcas e devolve os ids marcados agora (os já marcados ficam de fora).
+
+    O horário é copiado de ``animal`` pelo próprio banco (INSERT ... SELECT),
+    no mesmo formato em que está gravado, para a comparação de
+    :func:`due_criteria` bater exatamente.
+    """
+    table = AppointmentReminder.__table__
+    marked = set()
+    for start in range(0, len(rows), MARK_CHUNK):
+        ids = [row.id for row in rows[start:start + MARK_CHUNK]]
+        stmt = sqlite_insert(table).from_select(
+            ['animal_id', 'data_agendamento', 'sent_at'],
+            select(Animal.id, Animal.data_agendamento, literal(now, DateTime))
+            .where(Animal.id.in_(ids), Animal.data_agendamento.is_not(None)),
+        ).on_conflict_do_nothing().returning(table.c.animal_id)
+        marked.update(db.session.scalars(stmt))
+    return marked
+
+
+def _send_batch(rows, now, result):
+    marked = _mark(rows, now)
+    result.skipped += len(rows) - len(marked)
+    messages = []
+    for _, group in itertools.groupby((row for row in rows if row.id in marked), key=lambda row: row.dono_id):
+        by_phone = {}
+        for row in group:
+            by_phone.setdefault(row.phone, []).append(row)
+        for phone, pets in by_phone.items():
+            if phone:
+                messages.append((phone, format_message(pets)))
+            else:
+                result.without_phone += len(pets)
+    result.appointments += len(marked)
+    result.messages += send_sms_batch(messages)
+    db.session.commit()
+    result.batches += 1
+
+
+def send_reminders(hours=DEFAULT_HOURS, now=None, batch_size=DEFAULT_BATCH_SIZE, max_batches=None):
+    """Enfileira os lembretes dos agendamentos das próximas ``hours`` horas.
+
+    Cada lote tem cerca de ``batch_size`` agendamentos e nunca divide os
+    animais de um tutor entre dois lotes. ``max_batches`` limita a execução;
+    o restante fica para a próxima.
+    """
+    started = time.perf_counter()
+    result = ReminderResult()
+    now = now or datetime.now()
+    rows = due_appointments(now, now + timedelta(hours=hours))
+    # ``due_appointments`` é só leitura; os lotes abrem as próprias transações
+    db.session.commit()
+
+    batch = []
+    for _, group in itertools.groupby(rows, key=lambda row: row.dono_id):
+        batch.extend(group)
+        if len(batch) >= batch_size:
+            _send_batch(batch, datetime.utcnow(), result)
+            batch = []
+            if max_batches is not None and result.batches >= max_batches:
+                break
+    else:
+        if batch:
+            _send_batch(batch, datetime.utcnow(), result)
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+class ReminderWorker:
+    """Roda :func:`send_reminders` periodicamente em uma thread daemon."""
+
+    def __init__(self, app, interval=None, hours=None):
+        self.app = app
+        self.interval = interval or app.config.get('REMINDER_INTERVAL', 300)
+        self.hours = hours or app.config.get('REMINDER_HOURS', DEFAULT_HOURS)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                result = send_reminders(self.hours)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+        if result.appointments:
+            logger.info('Lembretes: %s', result.summary())
+        return result
+
+    def run_forever(self):
+        # como o worker de SMS, espera um intervalo antes da primeira execução
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('Falha ao enviar lembretes de agendamento')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name='appointment-reminders', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def init_reminders(app):
+    """Inicia o job em thread quando ``REMINDER_WORKER == 'thread'``."""
+    if app.config.get('REMINDER_WORKER') != 'thread':
+        return None
+    worker = ReminderWorker(app).start()
+    app.extensions['reminder_worker'] = worker
+    return worker
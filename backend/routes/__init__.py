@@ -3,10 +3,20 @@ from .auth import auth_bp
 from .dashboard import dashboard_bp
 from .animals import animals_bp
 from .clinics import clinics_bp
+from .exports import exports_bp
+from .api import api_bp
+from .events import events_bp
+from .admin import admin_bp
+from .metrics import metrics_bp
 
 def register_blueprints(app):
     """Registra todos os blueprints da aplicação"""
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(animals_bp)
-    app.register_blueprint(clinics_bp)
\ No newline at end of file
+    app.register_blueprint(clinics_bp)
+    app.register_blueprint(exports_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(metrics_bp)
\ No newline at end of file
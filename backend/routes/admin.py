@@ -0,0 +1,45 @@
+from flask import Blueprint, current_app, jsonify, request, session
+from backend.identity import current_identity
+from backend.profiling import get_buffer
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+def _deny():
+    """Resposta de erro se o usuário não for admin (``None`` se for)."""
+    if "user_id" not in session:
+        return jsonify({"error": "não autenticado"}), 401
+    user = current_identity()
+    if not user or not user.is_admin:
+        return jsonify({"error": "acesso negado"}), 403
+    return None
+
+
+@admin_bp.route("/profiling")
+def profiling():
+    """Requisições recentes e agregado por endpoint (instrumentação ``PROFILING``)."""
+    denied = _deny()
+    if denied:
+        return denied
+    buffer = get_buffer(current_app)
+    if buffer is None:
+        return jsonify({"error": "instrumentação desligada (PROFILING=1)"}), 404
+    limit = request.args.get("limit", 100, type=int)
+    endpoint = request.args.get("endpoint")
+    recent = [record for record in buffer.recent() if not endpoint or record.endpoint == endpoint]
+    return jsonify({
+        "endpoints": buffer.by_endpoint(),
+        "requests": [record.as_dict() for record in recent[:max(limit, 0)]],
+    })
+
+
+@admin_bp.route("/profiling/clear", methods=["POST"])
+def clear_profiling():
+    denied = _deny()
+    if denied:
+        return denied
+    buffer = get_buffer(current_app)
+    if buffer is None:
+        return jsonify({"error": "instrumentação desligada (PROFILING=1)"}), 404
+    buffer.clear()
+    return jsonify({"ok": True})
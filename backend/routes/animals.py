@@ -1,7 +1,17 @@
+import io
+from datetime import date, datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
 from backend.extensions import db
-from backend.models import Animal, User, Clinic
+from backend.models import Animal
 from sqlalchemy.orm import joinedload
+from backend.events import emit
+from backend.identity import current_identity
+from backend.imports import import_records
+from backend.pagination import get_per_page, paginate_request
+from backend.scheduling import SchedulingError, next_free_slots
+from backend.search import search_animals
+from backend.services import auto_schedule_day, claim_animal_for_clinic, claim_next_animals, schedule_animal
+from backend.templating import invalidate
 
 animals_bp = Blueprint('animals', __name__)
 
@@ -10,27 +20,58 @@ def list_animals():
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
     
-    user = db.session.get(User, session["user_id"])
-    if user.role == 'admin':
-        animals = Animal.query.options(
-            joinedload(Animal.dono),
-            joinedload(Animal.clinic)
-        ).all()
-    elif user.role == 'clinic':
-        clinic = Clinic.query.filter_by(user_id=user.id).first()
-        # Se a clínica não existir, não retornar nada
-        if not clinic:
-            animals = []
-        else:
-            animals = Animal.query.filter_by(clinic_id=clinic.id)\
-                .options(joinedload(Animal.dono), joinedload(Animal.clinic))\
-                .all()
+    user = current_identity()
+    if not user:
+        return redirect(url_for("auth.logout"))
+
+    q = request.args.get("q", "").strip()
+    if q:
+        page = search_animals(q, user.animal_criteria(), narrow_scope=user.role == 'user',
+                              page=request.args.get("page", 1, type=int), per_page=get_per_page())
+        return render_template("animals/list.html", animals=page.items, page=page, q=q)
+
+    # escopo por papel em Identity.animal_criteria (o mesmo usado pela busca)
+    query = Animal.query.filter(*user.animal_criteria())
+    if user.role in ('admin', 'clinic'):
+        query = query.options(joinedload(Animal.dono), joinedload(Animal.clinic))
     else:
-        animals = Animal.query.filter_by(dono_id=user.id)\
-            .options(joinedload(Animal.clinic))\
-            .all()
+        query = query.options(joinedload(Animal.clinic))
     
-    return render_template("animals/list.html", animals=animals)
+    page = paginate_request(query, Animal.id)
+    return render_template("animals/list.html", animals=page.items, page=page, q="")
+
+@animals_bp.route("/animals/search")
+def search():
+    """Busca textual (JSON) nos animais visíveis ao usuário, mais relevantes primeiro."""
+    if "user_id" not in session:
+        return jsonify({"error": "não autenticado"}), 401
+    user = current_identity()
+    if not user:
+        return jsonify({"error": "não autenticado"}), 401
+
+    q = request.args.get("q", "").strip()
+    page = search_animals(q, user.animal_criteria(), narrow_scope=user.role == 'user',
+                          page=request.args.get("page", 1, type=int), per_page=get_per_page())
+    return jsonify({
+        "q": q,
+        "page": page.page,
+        "per_page": page.per_page,
+        "next_page": page.next_page,
+        "results": [
+            {
+                "id": animal.id,
+                "nome": animal.nome,
+                "especie": animal.especie,
+                "raca": animal.raca,
+                "procedimento": animal.procedimento,
+                "status": animal.status,
+                "tutor": animal.dono.username if animal.dono else None,
+                "clinica": animal.clinic.nome if animal.clinic else None,
+                "score": score,
+            }
+            for animal, score in zip(page.items, page.scores)
+        ],
+    })
 
 @animals_bp.route("/animals/add", methods=["GET", "POST"])
 def add_animal():
@@ -51,12 +92,34 @@ def add_animal():
             dono_id=session["user_id"]
         )
         db.session.add(animal)
+        db.session.flush()
+        emit("animal.waiting", queue_changed=True, animal_id=animal.id, nome=animal.nome)
         db.session.commit()
         flash("Animal adicionado com sucesso!")
         return redirect(url_for("animals.list_animals"))
     
     return render_template("animals/add.html")
 
+@animals_bp.route("/animals/import", methods=["GET", "POST"])
+def import_animals():
+    if "user_id" not in session or session.get("role") != "admin":
+        flash("Acesso negado", "error")
+        return redirect(url_for("animals.list_animals"))
+    
+    result = None
+    if request.method == "POST":
+        arquivo = request.files.get("arquivo")
+        if not arquivo or not arquivo.filename:
+            flash("Selecione um arquivo para importar.", "error")
+            return render_template("animals/import.html")
+        fmt = "jsonl" if arquivo.filename.lower().endswith((".jsonl", ".json")) else "csv"
+        # leitura em streaming do upload, sem carregar o arquivo inteiro
+        stream = io.TextIOWrapper(arquivo.stream, encoding="utf-8-sig", newline="")
+        result = import_records(stream, fmt, dry_run=bool(request.form.get("simular")))
+        flash(result.summary(), "error" if result.errors else "success")
+    
+    return render_template("animals/import.html", result=result)
+
 @animals_bp.route("/animals/<int:id>/edit", methods=["GET", "POST"])
 def edit_animal(id):
     animal = Animal.query.get_or_404(id)
@@ -69,15 +132,8 @@ def edit_animal(id):
         flash("Acesso negado", "error")
         return redirect(url_for("auth.login"))
 
-    allowed = False
-    if session.get("role") == "admin":
-        allowed = True
-    elif animal.dono_id == session.get("user_id"):
-        allowed = True
-    elif session.get("role") == "clinic" and animal.clinic and animal.clinic.user_id == session.get("user_id"):
-        allowed = True
-
-    if not allowed:
+    user = current_identity()
+    if not user or not user.can_manage(animal):
         flash("Acesso negado", "error")
         return redirect(url_for("animals.list_animals"))
     
@@ -94,12 +150,16 @@ def edit_animal(id):
             flash("Idade inválida, salvo como vazio.", "warning")
         
         # se o usuário for admin ou clinic, permitir atualizar apenas o status
-        if session.get("role") in ("admin", "clinic"):
+        if user.role in ("admin", "clinic"):
             status = request.form.get("status")
             if status:
                 animal.status = status.capitalize() if isinstance(status, str) else status
         
+        if db.inspect(animal).attrs.status.history.has_changes():
+            emit("animal.updated", animal.clinic_id, queue_changed=animal.clinic_id is None,
+                 animal_id=animal.id, status=animal.status)
         db.session.commit()
+        invalidate("animal", animal.id)
         flash("Animal atualizado com sucesso!")
         return redirect(url_for("animals.list_animals"))
     
@@ -113,20 +173,121 @@ def delete_animal(id):
         flash("Acesso negado", "error")
         return redirect(url_for("auth.login"))
 
-    allowed = False
-    if session.get("role") == "admin":
-        allowed = True
-    elif animal.dono_id == session.get("user_id"):
-        allowed = True
-    elif session.get("role") == "clinic" and animal.clinic and animal.clinic.user_id == session.get("user_id"):
-        # permitir que a clínica responsável remova um animal (se faz sentido para o fluxo)
-        allowed = True
-
-    if not allowed:
+    # admin, tutor ou a clínica responsável (se faz sentido para o fluxo)
+    user = current_identity()
+    if not user or not user.can_manage(animal):
         flash("Acesso negado", "error")
         return redirect(url_for("animals.list_animals"))
     
+    emit("animal.deleted", animal.clinic_id, queue_changed=animal.clinic_id is None, animal_id=animal.id)
     db.session.delete(animal)
     db.session.commit()
+    invalidate("animal", id)
     flash("Animal removido com sucesso!")
-    return redirect(url_for("animals.list_animals"))
\ No newline at end of file
+    return redirect(url_for("animals.list_animals"))
+
+def _current_clinic_id():
+    """Id da clínica da conta logada (apenas para usuários com papel 'clinic')."""
+    user = current_identity()
+    if not user or not user.is_clinic:
+        return None
+    return user.clinic_id
+
+@animals_bp.route("/animals/<int:id>/claim", methods=["POST"])
+def claim_animal(id):
+    clinic_id = _current_clinic_id()
+    if not clinic_id:
+        flash("Acesso negado", "error")
+        return redirect(url_for("dashboard.index"))
+    
+    if claim_animal_for_clinic(id, clinic_id):
+        invalidate("animal", id)
+        flash("Animal reivindicado com sucesso!")
+    else:
+        flash("Animal já foi reivindicado ou não está aguardando atendimento.", "error")
+    return redirect(url_for("dashboard.index"))
+
+@animals_bp.route("/animals/claim-next", methods=["POST"])
+def claim_next():
+    clinic_id = _current_clinic_id()
+    if not clinic_id:
+        flash("Acesso negado", "error")
+        return redirect(url_for("dashboard.index"))
+    
+    quantidade = request.form.get("quantidade", type=int) or 1
+    quantidade = max(1, min(quantidade, 50))
+    claimed = claim_next_animals(clinic_id, quantidade)
+    for animal_id in claimed:
+        invalidate("animal", animal_id)
+    if claimed:
+        flash(f"{len(claimed)} animal(is) reivindicado(s) para a clínica.")
+    else:
+        flash("Nenhum animal aguardando na fila.", "warning")
+    return redirect(url_for("dashboard.index"))
+
+@animals_bp.route("/animals/<int:id>/schedule", methods=["GET", "POST"])
+def schedule(id):
+    """Agenda (ou remarca) o animal numa vaga livre da clínica responsável."""
+    animal = Animal.query.get_or_404(id)
+    
+    user = current_identity() if "user_id" in session else None
+    if not user or not (user.is_admin or (user.is_clinic and user.clinic_id and animal.clinic_id == user.clinic_id)):
+        flash("Acesso negado", "error")
+        return redirect(url_for("dashboard.index"))
+    if not animal.clinic_id:
+        flash("O animal precisa ser reivindicado por uma clínica antes do agendamento.", "error")
+        return redirect(url_for("dashboard.index"))
+    
+    if request.method == "POST":
+        # vaga sugerida ou horário livre digitado (datetime-local: AAAA-MM-DDTHH:MM)
+        valor = request.form.get("horario") or request.form.get("outro_horario") or ""
+        try:
+            dt = datetime.strptime(valor, "%Y-%m-%dT%H:%M")
+        except ValueError:
+            flash("Informe um horário válido.", "error")
+        else:
+            try:
+                schedule_animal(animal.id, dt)
+            except SchedulingError as e:
+                flash(str(e), "error")
+            else:
+                invalidate("animal", animal.id)
+                flash(f"{animal.nome} agendado para {dt:%d/%m/%Y %H:%M}.")
+                return redirect(url_for("dashboard.index"))
+    
+    vagas = max(1, min(request.args.get("vagas", 12, type=int), 50))
+    slots = next_free_slots(animal.clinic_id, n=vagas)
+    return render_template("animals/schedule.html", animal=animal, slots=slots)
+
+@animals_bp.route("/animals/auto-schedule", methods=["POST"])
+def auto_schedule():
+    """Agenda de uma vez os animais reivindicados pela clínica nas vagas livres de um dia."""
+    clinic_id = _current_clinic_id()
+    if not clinic_id:
+        flash("Acesso negado", "error")
+        return redirect(url_for("dashboard.index"))
+    
+    try:
+        dia = date.fromisoformat(request.form.get("dia", ""))
+    except ValueError:
+        flash("Informe o dia do mutirão.", "error")
+        return redirect(url_for("dashboard.index"))
+    
+    try:
+        scheduled, remaining = auto_schedule_day(clinic_id, dia)
+    except SchedulingError as e:
+        flash(str(e), "error")
+        return redirect(url_for("dashboard.index"))
+    
+    for animal_id, _ in scheduled:
+        invalidate("animal", animal_id)
+    if scheduled:
+        message = f"{len(scheduled)} animal(is) agendado(s) para {dia:%d/%m/%Y}."
+        if remaining:
+            message += f" {remaining} ficaram sem vaga nesse dia."
+        flash(message)
+    elif remaining:
+        flash(f"Sem vagas livres em {dia:%d/%m/%Y} para os {remaining} animal(is) aguardando.", "warning")
+    else:
+        flash("Nenhum animal reivindicado aguardando agendamento.", "warning")
+    return redirect(url_for("dashboard.index"))
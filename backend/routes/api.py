@@ -0,0 +1,188 @@
+from datetime import date, datetime
+
+from flask import Blueprint, Response, jsonify, request
+from backend.extensions import db
+from backend.identity import current_identity
+from backend.models import Animal, Clinic
+from backend.pagination import get_per_page, keyset_paginate
+from backend import scheduling, stats, versions
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# campos expostos (verification_token nunca sai pela API)
+ANIMAL_FIELDS = ('id', 'nome', 'especie', 'raca', 'idade', 'contato', 'procedimento', 'dono_id',
+                 'clinic_id', 'data_agendamento', 'status', 'token_validated', 'data_conclusao')
+CLINIC_FIELDS = ('id', 'nome', 'endereco', 'telefone', 'user_id')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api_bp.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({"error": error.message}), error.status
+
+
+def _require_identity():
+    user = current_identity()
+    if not user:
+        raise ApiError("não autenticado", 401)
+    return user
+
+
+def _fields(allowed):
+    """Campos pedidos em ``?fields=a,b`` (todos se ausente); o id sempre vem."""
+    raw = request.args.get("fields")
+    if not raw:
+        return allowed
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ApiError(f"campos inválidos: {', '.join(unknown)}")
+    return ("id", *(name for name in fields if name != "id"))
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _row(row, fields):
+    return {name: _json_value(getattr(row, name)) for name in fields}
+
+
+def _conditional(scopes, build):
+    """Responde 304 se ``If-None-Match`` bate com o ETag atual; senão chama ``build()``.
+
+    O ETag (fraco) vem das versões de ``scopes`` (uma consulta pela chave
+    primária em ``change_version``) mais os parâmetros da requisição e o
+    usuário, então uma consulta repetida sem alterações não toca em ``animal``.
+    """
+    user = current_identity()
+    tag = versions.etag(scopes, user.id, request.path, sorted(request.args.items(multi=True)))
+    if tag and request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    if tag:
+        response.set_etag(tag, weak=True)
+    # o cliente pode guardar, mas deve revalidar a cada uso
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _animal_scopes(user, clinic_id=None):
+    if user.is_admin:
+        return [versions.clinic_scope(clinic_id)] if clinic_id else ["all"]
+    if user.is_clinic:
+        return [versions.clinic_scope(user.clinic_id)]
+    return [versions.user_scope(user.id)]
+
+
+@api_bp.route("/animals")
+def list_animals():
+    """Animais visíveis ao usuário; ``?fields=``, ``?status=``, ``?clinic_id=`` (admin) e cursores."""
+    user = _require_identity()
+    fields = _fields(ANIMAL_FIELDS)
+    criteria = user.animal_criteria()
+    clinic_id = request.args.get("clinic_id", type=int) if user.is_admin else None
+    if clinic_id:
+        criteria.append(Animal.clinic_id == clinic_id)
+    status = request.args.get("status")
+    if status:
+        criteria.append(Animal.status == status)
+
+    def build():
+        query = db.session.query(*(getattr(Animal, name) for name in fields)).filter(*criteria)
+        page = keyset_paginate(
+            query, Animal.id,
+            after=request.args.get("after", type=int),
+            before=request.args.get("before", type=int),
+            per_page=get_per_page(),
+        )
+        return {
+            "items": [_row(row, fields) for row in page.items],
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        }
+
+    return _conditional(_animal_scopes(user, clinic_id), build)
+
+
+@api_bp.route("/animals/<int:id>")
+def get_animal(id):
+    user = _require_identity()
+    fields = _fields(ANIMAL_FIELDS)
+
+    def build():
+        row = db.session.query(*(getattr(Animal, name) for name in fields))\
+            .filter(Animal.id == id, *user.animal_criteria()).first()
+        if row is None:
+            raise ApiError("animal não encontrado", 404)
+        return _row(row, fields)
+
+    return _conditional(_animal_scopes(user), build)
+
+
+@api_bp.route("/clinics")
+def list_clinics():
+    _require_identity()
+    fields = _fields(CLINIC_FIELDS)
+
+    def build():
+        rows = db.session.query(*(getattr(Clinic, name) for name in fields)).order_by(Clinic.id).all()
+        return {"items": [_row(row, fields) for row in rows]}
+
+    return _conditional(["clinics"], build)
+
+
+@api_bp.route("/clinics/<int:id>/slots")
+def clinic_slots(id):
+    """Próximas vagas livres da clínica; ``?n=`` (até 100) e ``?after=`` (ISO, padrão: agora)."""
+    _require_identity()
+    if db.session.get(Clinic, id) is None:
+        raise ApiError("clínica não encontrada", 404)
+    n = max(1, min(request.args.get("n", 10, type=int), 100))
+    after = request.args.get("after")
+    try:
+        after = datetime.fromisoformat(after) if after else None
+    except ValueError:
+        raise ApiError("after inválido (use AAAA-MM-DDTHH:MM)")
+    slots = scheduling.next_free_slots(id, n=n, after=after)
+    # depende do relógio (``after`` padrão) e do expediente: sem ETag
+    response = jsonify({"clinic_id": id, "slots": [slot.isoformat(timespec="minutes") for slot in slots]})
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@api_bp.route("/stats")
+def get_stats():
+    """Totais da dashboard: gerais (admin), da clínica e da fila (clínica) ou do tutor."""
+    user = _require_identity()
+    if user.is_admin:
+        def build():
+            summary = stats.dashboard_summary()
+            summary["clinic_counts"] = [
+                {"clinic_id": clinic_id, **values} for clinic_id, values in summary["clinic_counts"].items()
+            ]
+            return summary
+        return _conditional(["all", "clinics"], build)
+
+    if user.is_clinic:
+        def build():
+            return {
+                "clinic_id": user.clinic_id,
+                "total": stats.clinic_animal_count(user.clinic_id) if user.clinic_id else 0,
+                "waiting": stats.waiting_animal_count(),
+            }
+        return _conditional([versions.clinic_scope(user.clinic_id), versions.clinic_scope(None)], build)
+
+    def build():
+        by_status = stats.status_counts(Animal.dono_id == user.id)
+        return {"total": sum(by_status.values()), "status_counts": by_status}
+    return _conditional([versions.user_scope(user.id)], build)
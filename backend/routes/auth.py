@@ -1,13 +1,16 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash, request
+from flask import Blueprint, current_app, render_template, redirect, url_for, session, flash, request
 from backend.extensions import db, login_manager
 from backend.models import User
-from werkzeug.security import check_password_hash, generate_password_hash
+from backend.identity import get_identity
+from backend.metrics import get_metrics
+from backend.passwords import PasswordPoolBusy
 
 auth_bp = Blueprint('auth', __name__)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    # identidade em cache (sem consulta extra quando já resolvida na requisição)
+    return get_identity(int(user_id))
 
 @auth_bp.route("/register", methods=["GET", "POST"])
 def register():
@@ -46,7 +49,11 @@ def register():
             contato=contato,
             role='user'  # papel padrão para dono de pet
         )
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except PasswordPoolBusy:
+            flash("Servidor ocupado, tente novamente em instantes.", "error")
+            return render_template("auth/register.html"), 503
         
         try:
             db.session.add(user)
@@ -70,7 +77,18 @@ def login():
         password = request.form.get("password")
         
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            valid = bool(user) and user.check_password(password)
+            # hash gravado com custo antigo: refazer com o custo atual
+            if valid and user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+        except PasswordPoolBusy:
+            flash("Servidor ocupado, tente novamente em instantes.", "error")
+            return render_template("auth/login.html"), 503
+        
+        get_metrics(current_app).count_login(valid)
+        if valid:
             session["user_id"] = user.id
             session["role"] = user.role
             return redirect(url_for("dashboard.index"))
@@ -1,6 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, session, jsonify
+from sqlalchemy.orm import joinedload
+from backend.clinic_deletion import DeletionError, start_deletion
 from backend.extensions import db
+from backend.identity import current_identity
 from backend.models import Clinic, User
+from backend.pagination import get_per_page
+from backend.passwords import PasswordPoolBusy
+from backend.scheduling import WEEKDAY_NAMES, SchedulingError, clinic_hours, set_clinic_hours
+from backend.search import search_clinics
+from backend.templating import invalidate
 
 clinics_bp = Blueprint('clinics', __name__)
 
@@ -9,8 +17,34 @@ def list_clinics():
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
     
-    clinics = Clinic.query.all()
-    return render_template("clinics/list.html", clinics=clinics)
+    q = request.args.get("q", "").strip()
+    if q:
+        page = search_clinics(q, page=request.args.get("page", 1, type=int), per_page=get_per_page())
+        return render_template("clinics/list.html", clinics=page.items, page=page, q=q)
+
+    # o template mostra o usuário de cada clínica
+    clinics = Clinic.query.options(joinedload(Clinic.user)).all()
+    return render_template("clinics/list.html", clinics=clinics, page=None, q="")
+
+@clinics_bp.route("/clinics/search")
+def search():
+    """Busca textual (JSON) de clínicas por nome, endereço ou telefone."""
+    if "user_id" not in session:
+        return jsonify({"error": "não autenticado"}), 401
+
+    q = request.args.get("q", "").strip()
+    page = search_clinics(q, page=request.args.get("page", 1, type=int), per_page=get_per_page())
+    return jsonify({
+        "q": q,
+        "page": page.page,
+        "per_page": page.per_page,
+        "next_page": page.next_page,
+        "results": [
+            {"id": clinic.id, "nome": clinic.nome, "endereco": clinic.endereco,
+             "telefone": clinic.telefone, "score": score}
+            for clinic, score in zip(page.items, page.scores)
+        ],
+    })
 
 @clinics_bp.route("/clinics/add", methods=["GET", "POST"])
 def add_clinic():
@@ -24,7 +58,11 @@ def add_clinic():
             username=request.form["username"],
             role="clinic"
         )
-        user.set_password(request.form["password"])
+        try:
+            user.set_password(request.form["password"])
+        except PasswordPoolBusy:
+            flash("Servidor ocupado, tente novamente em instantes.", "error")
+            return render_template("clinics/add.html"), 503
         db.session.add(user)
         db.session.flush()  # Para obter o ID do usuário
         
@@ -57,10 +95,44 @@ def edit_clinic(id):
         clinic.telefone = request.form["telefone"]
         
         db.session.commit()
+        invalidate("clinic", clinic.id)
         flash("Clínica atualizada com sucesso!")
         return redirect(url_for("clinics.list_clinics"))
     
-    return render_template("clinics/edit.html", clinic=clinic)
+    others = Clinic.query.filter(Clinic.id != clinic.id).order_by(Clinic.nome).all()
+    return render_template("clinics/edit.html", clinic=clinic, others=others)
+
+@clinics_bp.route("/clinics/<int:id>/hours", methods=["GET", "POST"])
+def clinic_hours_view(id):
+    """Expediente por dia da semana (admin ou a própria clínica)."""
+    user = current_identity() if "user_id" in session else None
+    if not user or not (user.is_admin or (user.is_clinic and user.clinic_id == id)):
+        flash("Acesso negado", "error")
+        return redirect(url_for("dashboard.index"))
+    
+    clinic = Clinic.query.get_or_404(id)
+    
+    if request.method == "POST":
+        hours = {}
+        for weekday in range(len(WEEKDAY_NAMES)):
+            if request.form.get(f"atende_{weekday}"):
+                hours[weekday] = (
+                    request.form.get(f"abertura_{weekday}", ""),
+                    request.form.get(f"fechamento_{weekday}", ""),
+                    request.form.get(f"slot_{weekday}", type=int),
+                )
+        try:
+            set_clinic_hours(clinic.id, hours)
+        except SchedulingError as e:
+            db.session.rollback()
+            flash(str(e), "error")
+        else:
+            db.session.commit()
+            flash("Horários atualizados com sucesso!")
+            return redirect(url_for("clinics.clinic_hours_view", id=clinic.id))
+    
+    return render_template("clinics/hours.html", clinic=clinic, hours=clinic_hours(clinic.id),
+                           weekdays=list(enumerate(WEEKDAY_NAMES)))
 
 @clinics_bp.route("/clinics/<int:id>/delete", methods=["POST"])
 def delete_clinic(id):
@@ -68,13 +140,19 @@ def delete_clinic(id):
         flash("Acesso negado", "error")
         return redirect(url_for("clinics.list_clinics"))
     
-    clinic = Clinic.query.get_or_404(id)
-    
-    # Remover o usuário associado à clínica
-    if clinic.user:
-        db.session.delete(clinic.user)
+    Clinic.query.get_or_404(id)
     
-    db.session.delete(clinic)
-    db.session.commit()
-    flash("Clínica removida com sucesso!")
-    return redirect(url_for("clinics.list_clinics"))
\ No newline at end of file
+    # animais e histórico vão para outra clínica ou de volta para a fila
+    # (ver backend/clinic_deletion.py); clínicas grandes saem em segundo plano
+    reassign_to = request.form.get("reassign_to", type=int)
+    try:
+        result = start_deletion(current_app._get_current_object(), id, reassign_to)
+    except DeletionError as e:
+        flash(str(e), "error")
+        return redirect(url_for("clinics.edit_clinic", id=id))
+    invalidate("clinic", id)
+    if result.background:
+        flash("A clínica foi desativada e está sendo removida em segundo plano.")
+    else:
+        flash("Clínica removida com sucesso!")
+    return redirect(url_for("clinics.list_clinics"))
@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, session, redirect, url_for
+from flask import Blueprint, render_template, request, session, redirect, url_for
 from sqlalchemy.orm import joinedload
-from backend.extensions import db
-from backend.models import User, Animal, Clinic
+from backend.archive import history_summary
+from backend.identity import current_identity
+from backend.models import Animal, AnimalHistory
+from backend.pagination import paginate_request
+from backend.stats import (clinic_animal_count, count_animals, dashboard_summary, merge_summaries,
+                           waiting_animal_count)
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -10,62 +14,85 @@ def index():
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
     
-    user = db.session.get(User, session["user_id"])
+    user = current_identity()
     if not user:
         session.pop('user_id', None)
         session.pop("role", None)
         return redirect(url_for('auth.login'))
 
+    # atendimentos arquivados (animal_history) só com ?historico=1: a lista
+    # passa a ser o histórico e os totais passam a incluí-lo
+    historico = request.args.get("historico") == "1"
+
     # === VISÃO DO ADMIN ===
     if user.role == 'admin':
-        all_animals = Animal.query.options(
-            joinedload(Animal.dono), 
-            joinedload(Animal.clinic)
-        ).order_by(Animal.id.desc()).all()
-        
-        # Dados para os gráficos
-        procedimentos = [animal.procedimento.lower() for animal in all_animals if animal.procedimento]
-        procedimento_counts = {
-            'castração': procedimentos.count('castração'),
-            'consulta': procedimentos.count('consulta'),
-            'vacina': procedimentos.count('vacina'),
-            'cirurgia': procedimentos.count('cirurgia')
-        }
+        # Contagens agregadas no banco; apenas os animais recentes são carregados
+        summary = dashboard_summary()
+        if historico:
+            summary = merge_summaries(summary, history_summary())
+            page = paginate_request(AnimalHistory.query.options(
+                joinedload(AnimalHistory.dono),
+                joinedload(AnimalHistory.clinic)
+            ), AnimalHistory.id)
+        else:
+            page = paginate_request(Animal.query.options(
+                joinedload(Animal.dono), 
+                joinedload(Animal.clinic)
+            ), Animal.id)
         
         return render_template(
             "dashboard/admin.html",
             user=user,
-            animals=all_animals,
-            procedimento_counts=procedimento_counts
+            animals=page.items,
+            page=page,
+            historico=historico,
+            total_animals=summary['total'],
+            status_counts=summary['status_counts'],
+            clinic_counts=summary['clinic_counts'],
+            procedimento_counts=summary['procedimento_counts']
         )
 
     # === VISÃO DA CLÍNICA ===
     elif user.role == 'clinic':
-        clinic = Clinic.query.filter_by(user_id=user.id).first()
-        if not clinic:
+        if not user.clinic_id:
             return render_template("error.html", message="Clínica não encontrada")
         
-        clinic_animals = Animal.query.filter_by(clinic_id=clinic.id)\
-            .options(joinedload(Animal.dono))\
-            .order_by(Animal.id.desc())\
-            .all()
+        total_animals = clinic_animal_count(user.clinic_id)
+        if historico:
+            total_animals += count_animals(AnimalHistory.clinic_id == user.clinic_id, model=AnimalHistory)
+            page = paginate_request(
+                AnimalHistory.query.filter_by(clinic_id=user.clinic_id).options(joinedload(AnimalHistory.dono)),
+                AnimalHistory.id
+            )
+        else:
+            page = paginate_request(
+                Animal.query.filter_by(clinic_id=user.clinic_id).options(joinedload(Animal.dono)),
+                Animal.id
+            )
             
         return render_template(
             "dashboard/clinic.html",
             user=user,
-            clinic=clinic,
-            animals=clinic_animals
+            clinic_nome=user.clinic_nome,
+            animals=page.items,
+            page=page,
+            historico=historico,
+            total_animals=total_animals,
+            waiting_animals=waiting_animal_count()
         )
 
     # === VISÃO DO DONO DE PET ===
     else:
-        user_animals = Animal.query.filter_by(dono_id=user.id)\
-            .options(joinedload(Animal.clinic))\
-            .order_by(Animal.id.desc())\
-            .all()
+        model = AnimalHistory if historico else Animal
+        page = paginate_request(
+            model.query.filter_by(dono_id=user.id).options(joinedload(model.clinic)),
+            model.id
+        )
             
         return render_template(
             "dashboard/user.html",
             user=user,
-            animals=user_animals
+            animals=page.items,
+            page=page,
+            historico=historico
         )
\ No newline at end of file
@@ -0,0 +1,58 @@
+import json
+
+from flask import Blueprint, Response, current_app, jsonify, session
+from backend.events import get_broker
+from backend.identity import current_identity
+
+events_bp = Blueprint('events', __name__)
+
+# comentário enviado em conexões ociosas (mantém proxies abertos e detecta
+# clientes que saíram sem precisar consultar nada)
+KEEPALIVE_SECONDS = 15
+
+
+def _format(message):
+    # sem "event:": o tipo vai no JSON e o cliente trata tudo em onmessage
+    data = json.dumps(message, ensure_ascii=False)
+    return f"id: {message.get('id', '')}\ndata: {data}\n\n"
+
+
+def _stream(channels):
+    broker = get_broker(current_app)
+    keepalive = current_app.config.get('EVENTS_KEEPALIVE', KEEPALIVE_SECONDS)
+    subscription = broker.subscribe(channels)
+
+    # sem stream_with_context: o gerador não segura contexto nem sessão do banco
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                message = subscription.get(timeout=keepalive)
+                yield ": keepalive\n\n" if message is None else _format(message)
+        finally:
+            subscription.close()
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@events_bp.route("/events/clinic")
+def clinic_events():
+    """Eventos da clínica logada e da fila de espera (SSE)."""
+    if "user_id" not in session:
+        return jsonify({"error": "não autenticado"}), 401
+    user = current_identity()
+    if not user or not user.is_clinic or not user.clinic_id:
+        return jsonify({"error": "acesso negado"}), 403
+    return _stream([f"clinic:{user.clinic_id}", "queue"])
+
+
+@events_bp.route("/events/admin")
+def admin_events():
+    """Todos os eventos (SSE), apenas para administradores."""
+    if "user_id" not in session:
+        return jsonify({"error": "não autenticado"}), 401
+    user = current_identity()
+    if not user or not user.is_admin:
+        return jsonify({"error": "acesso negado"}), 403
+    return _stream(["admin"])
@@ -0,0 +1,56 @@
+from flask import Blueprint, Response, request, redirect, url_for, flash, session, stream_with_context
+from backend.exports import FORMATS, generate_export, export_filename
+from backend.identity import current_identity
+
+exports_bp = Blueprint('exports', __name__)
+
+MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _export_response(kind, fmt, appointments_only):
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
+
+    # admins exportam tudo; clínicas apenas os próprios animais
+    user = current_identity()
+    if not user or user.role not in ("admin", "clinic") or (user.is_clinic and not user.clinic_id):
+        flash("Acesso negado", "error")
+        return redirect(url_for("dashboard.index"))
+    if fmt not in FORMATS:
+        return Response(f"Formato inválido: {fmt}", status=400)
+
+    clinic_id = user.clinic_id if user.is_clinic else request.args.get("clinic_id", type=int)
+    compress = request.args.get("gzip") in ("1", "true", "sim")
+    try:
+        body = generate_export(
+            fmt,
+            compress=compress,
+            clinic_id=clinic_id,
+            status=request.args.get("status") or None,
+            date_from=request.args.get("de") or None,
+            date_to=request.args.get("ate") or None,
+            date_field=request.args.get("campo_data", "agendamento"),
+            appointments_only=appointments_only,
+        )
+    except (ValueError, KeyError):
+        return Response("Filtro inválido (datas no formato AAAA-MM-DD)", status=400)
+
+    filename = export_filename(kind, fmt, compress)
+    return Response(
+        stream_with_context(body),
+        mimetype='application/gzip' if compress else MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@exports_bp.route("/exports/animals.<fmt>")
+def export_animals(fmt):
+    return _export_response("animais", fmt, appointments_only=False)
+
+
+@exports_bp.route("/exports/appointments.<fmt>")
+def export_appointments(fmt):
+    return _export_response("agendamentos", fmt, appointments_only=True)
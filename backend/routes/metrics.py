@@ -0,0 +1,18 @@
+import hmac
+
+from flask import Blueprint, Response, current_app, request
+from backend.metrics import render
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route("/metrics")
+def metrics():
+    """Métricas no formato texto do Prometheus."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        # em bytes: compare_digest levanta TypeError para str com caracteres não ASCII
+        if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            return Response('não autorizado\n', status=401, mimetype='text/plain')
+    return Response(render(current_app), content_type='text/plain; version=0.0.4; charset=utf-8')
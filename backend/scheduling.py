@@ -0,0 +1,268 @@
+"""Agenda das clínicas: expediente, vagas livres e conflitos de horário.
+
+Cada clínica tem um expediente por dia da semana (tabela ``clinic_hours``:
+abertura, fechamento e duração da vaga). Clínicas sem horários cadastrados
+usam os padrões da configuração (``SCHEDULE_HOURS``, ``SCHEDULE_WEEKDAYS``
+e ``SCHEDULE_SLOT_MINUTES``).
+
+Um agendamento ocupa ``[data_agendamento, data_agendamento + vaga)``. A
+ocupação de um dia vem de uma busca por faixa no índice ``(clinic_id,
+data_agendamento)``, que lê só os agendamentos daquele dia e não varre a
+tabela. O resultado fica numa :class:`DayOccupancy` (inícios ordenados), e
+conferir um conflito ou achar a próxima vaga é uma busca binária nela.
+"""
+import bisect
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, select
+
+try:
+    from .extensions import db
+    from .models import Animal, ClinicHours
+except Exception:
+    from extensions import db
+    from models import Animal, ClinicHours
+
+DEFAULT_HOURS = '08:00-18:00'
+DEFAULT_WEEKDAYS = '0,1,2,3,4'
+DEFAULT_SLOT_MINUTES = 30
+# até onde procurar vagas livres a partir de hoje
+MAX_SEARCH_DAYS = 90
+# dias lidos por consulta na busca de vagas livres
+SEARCH_WINDOW_DAYS = 14
+
+WEEKDAY_NAMES = ('segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'domingo')
+
+
+class SchedulingError(Exception):
+    """Horário inválido ou ocupado; a mensagem é exibida ao usuário."""
+
+
+WorkingDay = namedtuple('WorkingDay', 'abertura fechamento slot')
+
+
+def parse_time(value):
+    """``'08:30'`` -> ``time(8, 30)``; ``ValueError`` se inválido."""
+    return datetime.strptime(value.strip(), '%H:%M').time()
+
+
+def parse_hours(value):
+    """``'08:00-18:00'`` -> ``(time(8), time(18))``."""
+    abertura, _, fechamento = value.partition('-')
+    return parse_time(abertura), parse_time(fechamento)
+
+
+def default_hours():
+    """Expediente padrão (``{dia da semana: WorkingDay}``) da configuração."""
+    config = current_app.config if has_app_context() else {}
+    abertura, fechamento = parse_hours(config.get('SCHEDULE_HOURS', DEFAULT_HOURS))
+    slot = timedelta(minutes=int(config.get('SCHEDULE_SLOT_MINUTES', DEFAULT_SLOT_MINUTES)))
+    weekdays = str(config.get('SCHEDULE_WEEKDAYS', DEFAULT_WEEKDAYS))
+    return {int(day): WorkingDay(abertura, fechamento, slot) for day in weekdays.split(',') if day.strip()}
+
+
+def clinic_hours(clinic_id):
+    """Expediente da clínica por dia da semana (0 = segunda); dias ausentes não têm atendimento."""
+    rows = db.session.execute(
+        select(ClinicHours.weekday, ClinicHours.abertura, ClinicHours.fechamento, ClinicHours.slot_minutos)
+        .where(ClinicHours.clinic_id == clinic_id)
+    ).all()
+    if not rows:
+        return default_hours()
+    return {
+        row.weekday: WorkingDay(parse_time(row.abertura), parse_time(row.fechamento),
+                                timedelta(minutes=row.slot_minutos))
+        for row in rows
+    }
+
+
+def set_clinic_hours(clinic_id, hours):
+    """Substitui o expediente da clínica (sem commit).
+
+    ``hours`` é ``{dia da semana: (abertura, fechamento, minutos da vaga)}``
+    com horários ``'HH:MM'``; levanta ``SchedulingError`` se algum dia for
+    inválido.
+    """
+    if not hours:
+        # sem linhas a clínica voltaria ao expediente padrão
+        raise SchedulingError('Marque ao menos um dia de atendimento.')
+    rows = []
+    for weekday, (abertura, fechamento, slot_minutos) in sorted(hours.items()):
+        nome = WEEKDAY_NAMES[weekday]
+        try:
+            inicio, fim = parse_time(abertura), parse_time(fechamento)
+        except ValueError:
+            raise SchedulingError(f'Horário inválido na {nome} (use HH:MM).')
+        if fim <= inicio:
+            raise SchedulingError(f'Na {nome} o fechamento deve ser depois da abertura.')
+        if not slot_minutos or slot_minutos < 5:
+            raise SchedulingError(f'Na {nome} a vaga deve ter pelo menos 5 minutos.')
+        rows.append(ClinicHours(clinic_id=clinic_id, weekday=weekday, abertura=inicio.strftime('%H:%M'),
+                                fechamento=fim.strftime('%H:%M'), slot_minutos=slot_minutos))
+    db.session.execute(delete(ClinicHours).where(ClinicHours.clinic_id == clinic_id))
+    db.session.add_all(rows)
+    return rows
+
+
+class DayOccupancy:
+    """Inícios dos agendamentos de uma clínica em um dia, em ordem.
+
+    Conflitos e vagas livres são buscas binárias (``bisect``) na lista, em
+    O(log k) para os k agendamentos do dia.
+    """
+
+    def __init__(self, day, working_day, starts=()):
+        self.day = day
+        self.working_day = working_day
+        self.starts = sorted(starts)
+
+    @property
+    def slot(self):
+        return self.working_day.slot
+
+    @property
+    def opens_at(self):
+        return datetime.combine(self.day, self.working_day.abertura)
+
+    @property
+    def closes_at(self):
+        return datetime.combine(self.day, self.working_day.fechamento)
+
+    def within_hours(self, start):
+        return self.opens_at <= start and start + self.slot <= self.closes_at
+
+    def conflicts(self, start):
+        """``True`` se ``[start, start + vaga)`` sobrepõe algum agendamento."""
+        i = bisect.bisect_left(self.starts, start)
+        if i < len(self.starts) and self.starts[i] < start + self.slot:
+            return True
+        return i > 0 and self.starts[i - 1] + self.slot > start
+
+    def overlaps(self, start):
+        """``True`` se o agendamento em ``start`` (já presente na lista) sobrepõe um vizinho.
+
+        Só compara com o início anterior e o seguinte: sobreposições antigas
+        entre outros agendamentos do dia não contam.
+        """
+        i = bisect.bisect_left(self.starts, start)
+        if i == len(self.starts) or self.starts[i] != start:
+            return self.conflicts(start)
+        if i > 0 and self.starts[i - 1] + self.slot > start:
+            return True
+        return i + 1 < len(self.starts) and self.starts[i + 1] < start + self.slot
+
+    def add(self, start):
+        bisect.insort(self.starts, start)
+
+    def free_slots(self, after=None):
+        """Inícios de vaga livres no expediente (na grade a partir da abertura), em ordem."""
+        start = self.opens_at
+        if after is not None and after > start:
+            # primeira vaga da grade que começa em ``after`` ou depois
+            start += -(-(after - start) // self.slot) * self.slot
+        while start + self.slot <= self.closes_at:
+            if not self.conflicts(start):
+                yield start
+            start += self.slot
+
+
+def day_bounds(day):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def load_day(clinic_id, day, hours=None, exclude_id=None):
+    """Ocupação da clínica em ``day`` (``None`` se ela não atende nesse dia da semana).
+
+    ``exclude_id`` ignora o agendamento atual de um animal (remarcação).
+    """
+    hours = clinic_hours(clinic_id) if hours is None else hours
+    working_day = hours.get(day.weekday())
+    if working_day is None:
+        return None
+    start, end = day_bounds(day)
+    query = select(Animal.data_agendamento).where(
+        Animal.clinic_id == clinic_id,
+        Animal.data_agendamento >= start,
+        Animal.data_agendamento < end,
+    )
+    if exclude_id is not None:
+        query = query.where(Animal.id != exclude_id)
+    return DayOccupancy(day, working_day, db.session.scalars(query.order_by(Animal.data_agendamento)))
+
+
+def load_days(clinic_id, first_day, count, hours):
+    """Ocupação de ``count`` dias a partir de ``first_day`` numa única busca por faixa.
+
+    Dias sem atendimento ficam de fora.
+    """
+    start = day_bounds(first_day)[0]
+    by_day = {}
+    for booked in db.session.scalars(
+        select(Animal.data_agendamento).where(
+            Animal.clinic_id == clinic_id,
+            Animal.data_agendamento >= start,
+            Animal.data_agendamento < start + timedelta(days=count),
+        ).order_by(Animal.data_agendamento)
+    ):
+        by_day.setdefault(booked.date(), []).append(booked)
+    days = (first_day + timedelta(days=offset) for offset in range(count))
+    return [DayOccupancy(day, hours[day.weekday()], by_day.get(day, ()))
+            for day in days if day.weekday() in hours]
+
+
+def next_free_slots(clinic_id, n=10, after=None, days=MAX_SEARCH_DAYS):
+    """Próximas ``n`` vagas livres da clínica a partir de ``after`` (padrão: agora).
+
+    Lê a ocupação em janelas de ``SEARCH_WINDOW_DAYS`` dias (uma consulta por
+    janela) e para assim que encontra ``n`` vagas.
+    """
+    after = after or datetime.now()
+    hours = clinic_hours(clinic_id)
+    found = []
+    if not hours or n <= 0:
+        return found
+    for offset in range(0, days, SEARCH_WINDOW_DAYS):
+        window = min(SEARCH_WINDOW_DAYS, days - offset)
+        for occupancy in load_days(clinic_id, after.date() + timedelta(days=offset), window, hours):
+            for start in occupancy.free_slots(after):
+                found.append(start)
+                if len(found) >= n:
+                    return found
+    return found
+
+
+def check_slot(clinic_id, start, exclude_id=None):
+    """Confere se ``start`` é futuro e cabe no expediente sem conflito; retorna a ocupação do dia."""
+    if not clinic_id:
+        raise SchedulingError('O animal precisa ser reivindicado por uma clínica antes do agendamento.')
+    if start < datetime.now():
+        raise SchedulingError('O horário escolhido já passou.')
+    occupancy = load_day(clinic_id, start.date(), exclude_id=exclude_id)
+    if occupancy is None:
+        raise SchedulingError(f'A clínica não atende nesse dia da semana ({WEEKDAY_NAMES[start.weekday()]}).')
+    if not occupancy.within_hours(start):
+        raise SchedulingError(
+            f'Horário fora do expediente ({occupancy.working_day.abertura:%H:%M} às '
+            f'{occupancy.working_day.fechamento:%H:%M}, vagas de '
+            f'{int(occupancy.slot.total_seconds() // 60)} min).'
+        )
+    if occupancy.conflicts(start):
+        raise SchedulingError('Horário já ocupado por outro agendamento.')
+    return occupancy
+
+
+def assert_no_overlap(clinic_id, day, starts):
+    """Confere os horários recém-gravados depois do flush, com a escrita já em andamento na transação.
+
+    Em SQLite só uma transação escreve por vez. Se outra requisição ocupou a
+    mesma vaga entre a leitura e a escrita, a sobreposição aparece aqui. Só
+    os ``starts`` agendados agora são conferidos: sobreposições antigas do
+    dia (linhas legadas, mudança na duração da vaga) não bloqueiam novos
+    agendamentos.
+    """
+    occupancy = load_day(clinic_id, day)
+    if occupancy is not None and any(occupancy.overlaps(start) for start in starts):
+        raise SchedulingError('O horário acabou de ser ocupado por outro agendamento; escolha outro.')
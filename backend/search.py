@@ -0,0 +1,237 @@
+"""Busca textual de animais (com tutor e clínica) e de clínicas via SQLite FTS5.
+
+Dois índices FTS5 guardam o texto já "desnormalizado":
+
+- ``animal_search`` (rowid = ``animal.id``): nome, espécie, raça e
+  procedimento do animal, usuário e contato do tutor, nome e endereço da
+  clínica;
+- ``clinic_search`` (rowid = ``clinic.id``): nome, endereço e telefone.
+
+Os triggers criados pela migração 4 (backend/migrations.py) mantêm os
+índices em sincronia com ``animal``, ``user`` e ``clinic`` em qualquer
+escrita (ORM, comandos em lote ou SQL direto). Os resultados são ordenados por ``bm25`` (pesos em
+``ANIMAL_WEIGHTS``) e paginados por número de página; latências medidas com
+``scripts/bench_search.py``. Nos animais, só os ``SEARCH_RANK_WINDOW``
+resultados mais recentes são pontuados; os demais vêm depois deles, dos
+mais novos para os mais antigos e sem pontuação.
+
+Se o SQLite não tiver FTS5 (ou a migração ainda não rodou) a busca cai para
+``LIKE`` sobre as mesmas colunas (mais lenta, sem ranking e sensível a acentos).
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from sqlalchemy.orm import joinedload
+
+try:
+    from .extensions import db
+    from .models import Animal, Clinic, User
+except Exception:
+    from extensions import db
+    from models import Animal, Clinic, User
+
+ANIMAL_COLUMNS = ('nome', 'especie', 'raca', 'procedimento', 'tutor', 'tutor_contato',
+                  'clinica', 'clinica_endereco')
+# pesos do bm25 na ordem de ANIMAL_COLUMNS: o nome do animal pesa mais
+ANIMAL_WEIGHTS = (10.0, 2.0, 2.0, 3.0, 5.0, 1.0, 3.0, 1.0)
+
+# quantos resultados (os mais recentes) entram no ranking bm25
+RANK_WINDOW = 1000
+
+CLINIC_COLUMNS = ('nome', 'endereco', 'telefone')
+CLINIC_WEIGHTS = (10.0, 2.0, 1.0)
+
+animal_search = table('animal_search', column('rowid'), *(column(name) for name in ANIMAL_COLUMNS))
+clinic_search = table('clinic_search', column('rowid'), *(column(name) for name in CLINIC_COLUMNS))
+
+# engine url -> FTS5 instalado?
+_available = {}
+
+
+def rebuild(conn):
+    """Reindexa tudo a partir das tabelas de origem."""
+    conn.execute(text('DELETE FROM animal_search'))
+    conn.execute(text(
+        'INSERT INTO animal_search (rowid, nome, especie, raca, procedimento, tutor, tutor_contato,'
+        ' clinica, clinica_endereco)'
+        ' SELECT a.id, a.nome, a.especie, a.raca, a.procedimento, u.username, u.contato, c.nome, c.endereco'
+        ' FROM animal a LEFT JOIN "user" u ON u.id = a.dono_id LEFT JOIN clinic c ON c.id = a.clinic_id'
+    ))
+    conn.execute(text('DELETE FROM clinic_search'))
+    conn.execute(text(
+        'INSERT INTO clinic_search (rowid, nome, endereco, telefone)'
+        ' SELECT id, nome, endereco, telefone FROM clinic'
+    ))
+    optimize(conn)
+
+
+def optimize(conn):
+    """Funde os segmentos dos índices (mais rápido após cargas grandes)."""
+    conn.execute(text("INSERT INTO animal_search (animal_search) VALUES ('optimize')"))
+    conn.execute(text("INSERT INTO clinic_search (clinic_search) VALUES ('optimize')"))
+
+
+def fts_available():
+    url = str(db.engine.url)
+    if not _available.get(url):
+        _available[url] = db.session.scalar(text(
+            "SELECT count(*) FROM sqlite_master WHERE name IN ('animal_search', 'clinic_search')"
+        )) == 2
+    return _available[url]
+
+
+def terms(query):
+    """Palavras da busca (letras e dígitos; o resto é ignorado)."""
+    return re.findall(r'\w+', query or '')
+
+
+def fts_query(query):
+    """Converte o texto digitado numa expressão FTS5 segura: todas as palavras, por prefixo.
+
+    Cada palavra vira ``("rex" OR "rex"*)``: casa por prefixo e a palavra
+    exata soma pontos nas duas frases, ficando à frente no bm25.
+    """
+    words = terms(query)
+    if not words:
+        return None
+    return ' AND '.join('("{0}" OR "{0}"*)'.format(word) for word in words)
+
+
+class SearchPage:
+    """Uma página de resultados ranqueados; ``page`` começa em 1."""
+
+    def __init__(self, items, page, per_page, has_next, scores=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+        self.scores = scores or [None] * len(items)
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def next_page(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def prev_page(self):
+        return self.page - 1 if self.has_prev else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _page(rows, page, per_page, ranked):
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    if ranked:
+        return SearchPage([row[0] for row in rows], page, per_page, has_next,
+                          scores=[None if row[1] is None else -row[1] for row in rows])
+    return SearchPage(list(rows), page, per_page, has_next)
+
+
+def _like_animals(words):
+    stmt = select(Animal)\
+        .outerjoin(User, User.id == Animal.dono_id)\
+        .outerjoin(Clinic, Clinic.id == Animal.clinic_id)
+    fields = (Animal.nome, Animal.especie, Animal.raca, Animal.procedimento,
+              User.username, User.contato, Clinic.nome, Clinic.endereco)
+    for word in words:
+        stmt = stmt.where(or_(*(field.ilike(f'%{word}%') for field in fields)))
+    return stmt
+
+
+def search_animals(query, criteria=(), page=1, per_page=25, use_fts=None, narrow_scope=False):
+    """Animais que contêm todas as palavras de ``query`` (por prefixo), mais relevantes primeiro.
+
+    ``criteria`` restringe o resultado (escopo do usuário, ver
+    ``Identity.animal_criteria``). ``narrow_scope`` indica um escopo pequeno
+    (animais de um tutor): os ids do escopo são buscados primeiro e só eles
+    consultados no índice; nos escopos amplos cada resultado do índice é
+    conferido contra ``animal``. Com ``use_fts=False`` força o ``LIKE``.
+
+    O bm25 é calculado só para os ``SEARCH_RANK_WINDOW`` resultados mais
+    recentes: termos muito comuns não obrigam a pontuar a tabela inteira.
+    Passada a janela, as páginas seguem com os resultados mais antigos em
+    ordem de id (``score`` ``None``).
+    """
+    page = max(1, page)
+    match = fts_query(query)
+    if not match:
+        return SearchPage([], page, per_page, False)
+    if use_fts is None:
+        use_fts = fts_available()
+    options = (joinedload(Animal.dono), joinedload(Animal.clinic))
+    offset = (page - 1) * per_page
+
+    if not use_fts:
+        stmt = _like_animals(terms(query)).where(*criteria).order_by(Animal.id.desc())
+        stmt = stmt.options(*options).limit(per_page + 1).offset(offset)
+        return _page(db.session.execute(stmt).scalars().all(), page, per_page, ranked=False)
+
+    window = current_app.config.get('SEARCH_RANK_WINDOW', RANK_WINDOW)
+    matches = select(animal_search.c.rowid.label('id'))\
+        .where(literal_column('animal_search').op('MATCH')(match))
+    if criteria and narrow_scope:
+        matches = matches.where(animal_search.c.rowid.in_(select(Animal.id).where(*criteria)))
+    elif criteria:
+        matches = matches.where(
+            select(Animal.id).where(Animal.id == animal_search.c.rowid, *criteria).exists())
+
+    rows = []
+    if offset < window:
+        score = func.bm25(literal_column('animal_search'), *ANIMAL_WEIGHTS).label('score')
+        candidates = matches.add_columns(score)\
+            .order_by(animal_search.c.rowid.desc()).limit(window).subquery()
+        stmt = select(Animal, candidates.c.score)\
+            .join(candidates, candidates.c.id == Animal.id)\
+            .order_by(candidates.c.score, Animal.id.desc())\
+            .options(*options).limit(min(per_page + 1, window - offset)).offset(offset)
+        rows = db.session.execute(stmt).all()
+        if len(rows) < window - offset:
+            # a janela não encheu: não há resultados fora dela
+            return _page(rows, page, per_page, ranked=True)
+
+    # resultados mais antigos que a janela: depois dela, por id decrescente
+    oldest_ranked = db.session.scalar(
+        matches.order_by(animal_search.c.rowid.desc()).limit(1).offset(window - 1))
+    if oldest_ranked is not None and len(rows) <= per_page:
+        older = matches.where(animal_search.c.rowid < oldest_ranked).subquery()
+        stmt = select(Animal, literal_column('NULL').label('score'))\
+            .join(older, older.c.id == Animal.id)\
+            .order_by(Animal.id.desc())\
+            .options(*options).limit(per_page + 1 - len(rows)).offset(max(0, offset - window))
+        rows += db.session.execute(stmt).all()
+    return _page(rows, page, per_page, ranked=True)
+
+
+def search_clinics(query, page=1, per_page=25, use_fts=None):
+    """Clínicas por nome, endereço ou telefone, mais relevantes primeiro."""
+    page = max(1, page)
+    match = fts_query(query)
+    if not match:
+        return SearchPage([], page, per_page, False)
+    if use_fts is None:
+        use_fts = fts_available()
+
+    if use_fts:
+        rank = func.bm25(literal_column('clinic_search'), *CLINIC_WEIGHTS).label('rank')
+        stmt = select(Clinic, rank)\
+            .join(clinic_search, clinic_search.c.rowid == Clinic.id)\
+            .where(literal_column('clinic_search').op('MATCH')(match))\
+            .order_by(rank, Clinic.id)
+    else:
+        stmt = select(Clinic).order_by(Clinic.id)
+        for word in terms(query):
+            stmt = stmt.where(or_(Clinic.nome.ilike(f'%{word}%'), Clinic.endereco.ilike(f'%{word}%'),
+                                  Clinic.telefone.ilike(f'%{word}%')))
+    stmt = stmt.options(joinedload(Clinic.user)).limit(per_page + 1).offset((page - 1) * per_page)
+    result = db.session.execute(stmt)
+    rows = result.all() if use_fts else result.scalars().all()
+    return _page(rows, page, per_page, ranked=use_fts)
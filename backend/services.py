@@ -1,11 +1,22 @@
 try:
     from .extensions import db
     from .models import User, Animal, Clinic
+    from .sms import enqueue_sms, enqueue_sms_many
+    from .counters import record_claimed
+    from .events import emit
+    from .scheduling import SchedulingError, assert_no_overlap, check_slot, load_day
 except Exception:
     from extensions import db
     from models import User, Animal, Clinic
+    from sms import enqueue_sms, enqueue_sms_many
+    from counters import record_claimed
+    from events import emit
+    from scheduling import SchedulingError, assert_no_overlap, check_slot, load_day
 
 import random
+from datetime import datetime
+
+from sqlalchemy import and_, select, update
 
 def generate_token():
     """Gera um token numérico de 6 dígitos para verificação."""
@@ -56,22 +67,39 @@ def assign_clinic_to_animal(animal_id, clinic_id):
     return animal
 
 
+def waiting_for_clinic_criteria():
+    """Filtro de animais livres para reivindicação.
+
+    Equivale a ``clinic_id IS NULL AND status LIKE 'Aguard%'`` (cobre
+    'Aguardando' e variantes), escrito como faixa ``>= 'Aguard' AND <
+    'Aguare'`` para ser sensível a maiúsculas como o antigo
+    ``startswith`` e poder usar o índice de ``status``.
+    """
+    return and_(
+        Animal.clinic_id.is_(None),
+        Animal.status >= 'Aguard',
+        Animal.status < 'Aguare',
+    )
+
+
 def claim_animal_for_clinic(animal_id, clinic_id):
     """Try to claim (assign) an animal to a clinic in a safe way.
 
     Returns the animal if the claim succeeded, or None if the animal was
     already claimed or not in 'Aguardando' status.
     """
-    # SQLite doesn't support SELECT ... FOR UPDATE; we'll perform a short
-    # transaction: reload the object, check status, assign and commit.
+    # Um único UPDATE condicional: o banco garante que apenas uma clínica
+    # altera a linha, sem leitura prévia (e sem corrida entre ler e gravar).
+    stmt = update(Animal)\
+        .where(Animal.id == animal_id, waiting_for_clinic_criteria())\
+        .values(clinic_id=clinic_id)\
+        .returning(Animal)\
+        .execution_options(synchronize_session=False)
     try:
-        animal = Animal.query.get(animal_id)
-        if not animal:
-            return None
-        # Only allow claiming when status starts with 'Aguard' (covers 'Aguardando' and variants)
-        if not (str(animal.status).startswith('Aguard')) or animal.clinic_id:
-            return None
-        animal.clinic_id = clinic_id
+        animal = db.session.scalars(stmt).first()
+        if animal:
+            record_claimed([animal], clinic_id)
+            emit('animal.claimed', clinic_id, queue_changed=True, animal_id=animal.id, status=animal.status)
         db.session.commit()
         return animal
     except Exception:
@@ -79,54 +107,140 @@ def claim_animal_for_clinic(animal_id, clinic_id):
         return None
 
 
-def schedule_animal(animal_id, dt):
-    animal = Animal.query.get(animal_id)
-    if not animal:
-        return None
+def claim_next_animals(clinic_id, limit=10):
+    """Reivindica de uma vez os próximos ``limit`` animais aguardando (mais antigos primeiro).
+
+    Retorna os ids dos animais efetivamente atribuídos à clínica (pode ter
+    menos que ``limit`` se a fila estiver menor ou outra clínica levar parte).
+    """
+    if limit <= 0:
+        return []
+    next_ids = select(Animal.id)\
+        .where(waiting_for_clinic_criteria())\
+        .order_by(Animal.id)\
+        .limit(limit)\
+        .scalar_subquery()
+    stmt = update(Animal)\
+        .where(Animal.id.in_(next_ids), waiting_for_clinic_criteria())\
+        .values(clinic_id=clinic_id)\
+        .returning(Animal.id, Animal.status, Animal.procedimento, Animal.data_agendamento)\
+        .execution_options(synchronize_session=False)
+    try:
+        claimed = db.session.execute(stmt).all()
+        record_claimed(claimed, clinic_id)
+        if claimed:
+            emit('animals.claimed', clinic_id, queue_changed=True, animal_ids=sorted(row.id for row in claimed))
+        db.session.commit()
+        return sorted(row.id for row in claimed)
+    except Exception:
+        db.session.rollback()
+        return []
+
+
+def claimed_waiting_criteria(clinic_id):
+    """Animais já reivindicados pela clínica e ainda aguardando agendamento."""
+    return and_(
+        Animal.clinic_id == clinic_id,
+        Animal.status >= 'Aguard',
+        Animal.status < 'Aguare',
+    )
+
+
+def _book(animal, dt, phone):
+    """Marca o animal como agendado em ``dt`` e enfileira o token para o tutor."""
     animal.data_agendamento = dt
     animal.status = 'Agendado'
     # gerar token numérico de 6 dígitos para verificação pelo tutor
-    import random
-    token = f"{random.randint(0, 999999):06d}"
+    token = generate_token()
     animal.verification_token = token
     animal.token_validated = False
-    db.session.commit()
 
-    # send token via SMS (simulated) to the tutor's contact if available
-    tutor = None
+    # token enviado por SMS ao contato do animal ou do tutor; a mensagem entra
+    # na outbox na mesma transação e é entregue pelo worker (backend/sms.py)
+    if phone:
+        send_sms(phone, f"Seu agendamento para {animal.nome} foi confirmado. Token: {token}")
+
+
+def _commit_schedule(clinic_id, day, starts):
+    """Grava os agendamentos ``starts`` do dia, desfazendo tudo se outra transação ocupou as mesmas vagas."""
     try:
-        tutor = User.query.get(animal.dono_id)
-    except Exception:
-        tutor = None
+        db.session.flush()
+        assert_no_overlap(clinic_id, day, starts)
+    except SchedulingError:
+        db.session.rollback()
+        raise
+    db.session.commit()
+
+
+def schedule_animal(animal_id, dt):
+    """Agenda o animal em ``dt`` na clínica que o reivindicou.
+
+    Levanta ``SchedulingError`` se ``dt`` estiver fora do expediente da
+    clínica ou sobrepuser outro agendamento (a remarcação ignora o horário
+    atual do próprio animal).
+    """
+    animal = Animal.query.get(animal_id)
+    if not animal:
+        return None
+    check_slot(animal.clinic_id, dt, exclude_id=animal.id)
 
-    if tutor and getattr(tutor, 'contact', None):
-        try:
-            send_sms(tutor.contact, f"Seu agendamento para {animal.nome} foi confirmado. Token: {token}")
-        except Exception:
-            # ignore SMS failures in this simulated environment
-            pass
+    phone = animal.contato or db.session.scalar(select(User.contato).where(User.id == animal.dono_id))
+    _book(animal, dt, phone)
 
+    emit('animal.scheduled', animal.clinic_id, animal_id=animal.id, status=animal.status,
+         data_agendamento=dt.isoformat() if dt else None)
+    _commit_schedule(animal.clinic_id, dt.date(), [dt])
     return animal
 
 
+def auto_schedule_day(clinic_id, day):
+    """Agenda nas vagas livres de ``day`` os animais que a clínica reivindicou e ainda aguardam.
+
+    Numa só passada: lê a ocupação do dia uma vez, distribui as vagas em
+    ordem aos animais mais antigos e grava tudo num único commit. Retorna
+    ``(agendados, restantes)``, em que ``agendados`` é a lista de
+    ``(animal_id, horário)`` e ``restantes`` é quantos ficaram sem vaga.
+    """
+    occupancy = load_day(clinic_id, day)
+    if occupancy is None:
+        raise SchedulingError(f'A clínica não atende em {day:%d/%m/%Y}.')
+    now = datetime.now()
+    slots = list(occupancy.free_slots(now if day == now.date() else None))
+    waiting = Animal.query.filter(claimed_waiting_criteria(clinic_id))
+    animals = waiting.order_by(Animal.id).limit(len(slots)).all() if slots else []
+    if not animals:
+        return [], waiting.count()
+
+    # contatos dos tutores em uma consulta (sem uma ida ao banco por animal)
+    owner_ids = {animal.dono_id for animal in animals if not animal.contato}
+    phones = dict(db.session.execute(
+        select(User.id, User.contato).where(User.id.in_(owner_ids))
+    ).all()) if owner_ids else {}
+
+    scheduled = []
+    for animal, slot in zip(animals, slots):
+        _book(animal, slot, animal.contato or phones.get(animal.dono_id))
+        scheduled.append((animal.id, slot))
+
+    emit('animals.scheduled', clinic_id, animal_ids=[animal_id for animal_id, _ in scheduled],
+         dia=day.isoformat())
+    _commit_schedule(clinic_id, day, [slot for _, slot in scheduled])
+    return scheduled, waiting.count()
+
+
 def send_sms(phone_number, message):
-    """Simula o envio de um SMS escrevendo em instance/sms.log.
+    """Enfileira um SMS na outbox (instance/sms.log com o provedor padrão).
 
-    Em produção, substitua esta função por integração com um provedor (Twilio,
-    MessageBird, etc.).
+    Não faz I/O: a mensagem é gravada junto com o próximo commit da sessão e
+    entregue em lote pelo OutboxWorker. Provedores reais (Twilio, MessageBird,
+    etc.) são configurados em SMS_PROVIDER.
     """
-    import os
-    basedir = os.path.abspath(os.path.dirname(__file__))
-    instance_dir = os.path.join(basedir, 'instance')
-    os.makedirs(instance_dir, exist_ok=True)
-    sms_log = os.path.join(instance_dir, 'sms.log')
-    from datetime import datetime
-    line = f"{datetime.utcnow().isoformat()} SMS to {phone_number}: {message}\n"
-    with open(sms_log, 'a', encoding='utf-8') as f:
-        f.write(line)
-    # also print to stdout for debug
-    print('[SMS]', line.strip())
-    return True
+    return enqueue_sms(phone_number, message)
+
+
+def send_sms_batch(messages):
+    """Enfileira vários SMS (``[(telefone, mensagem), ...]``) de uma vez; ver :func:`send_sms`."""
+    return enqueue_sms_many(messages)
 
 
 def validate_token(animal_id, token):
@@ -135,6 +249,7 @@ def validate_token(animal_id, token):
         return False
     if animal.verification_token and str(animal.verification_token) == str(token):
         animal.token_validated = True
+        emit('animal.token_validated', animal.clinic_id, animal_id=animal.id)
         db.session.commit()
         return True
     return False
@@ -147,5 +262,6 @@ def mark_animal_complete(animal_id):
     from datetime import datetime
     animal.status = 'Concluído'
     animal.data_conclusao = datetime.utcnow()
+    emit('animal.completed', animal.clinic_id, animal_id=animal.id, status=animal.status)
     db.session.commit()
     return animal
@@ -0,0 +1,235 @@
+"""Envio assíncrono de SMS via tabela de saída (outbox).
+
+As requisições apenas gravam a mensagem em ``sms_outbox`` na mesma transação
+da alteração que a originou (:func:`enqueue_sms`). Um :class:`OutboxWorker`
+(thread dentro do processo ou ``python run.py sms-worker`` em processo
+separado) reivindica as mensagens pendentes em lotes, entrega pelo provedor
+configurado e reagenda falhas com backoff exponencial.
+
+Provedores implementam :class:`SmsProvider`; ``SMS_PROVIDER`` aceita um nome
+registrado em ``PROVIDERS`` ou um caminho ``"modulo:Classe"``.
+"""
+import importlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, insert, select, update
+
+try:
+    from .extensions import db
+    from .models import SmsOutbox
+except Exception:
+    from extensions import db
+    from models import SmsOutbox
+
+logger = logging.getLogger(__name__)
+
+# tempo que um lote fica reservado para um worker; se ele morrer no meio, as
+# mensagens voltam a ficar disponíveis depois disso
+LEASE_SECONDS = 60
+
+
+class SmsProvider:
+    """Interface de provedor de SMS (Twilio, MessageBird, ...)."""
+
+    def send(self, phone, message):
+        raise NotImplementedError
+
+    def send_batch(self, messages):
+        """Entrega ``[(id, phone, message), ...]``; retorna ``{id: erro ou None}``."""
+        results = {}
+        for message_id, phone, message in messages:
+            try:
+                self.send(phone, message)
+                results[message_id] = None
+            except Exception as exc:
+                results[message_id] = str(exc)[:255] or exc.__class__.__name__
+        return results
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileSmsProvider(SmsProvider):
+    """Simula o envio escrevendo em ``instance/sms.log``.
+
+    O arquivo fica aberto com buffer e é descarregado uma vez por lote, em vez
+    de ser reaberto a cada mensagem.
+    """
+
+    def __init__(self, path, buffer_size=64 * 1024):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8', buffering=buffer_size)
+
+    def send(self, phone, message):
+        self._file.write(f"{datetime.utcnow().isoformat()} SMS to {phone}: {message}\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+PROVIDERS = {
+    'file': lambda app: FileSmsProvider(os.path.join(app.instance_path, 'sms.log')),
+}
+
+
+def create_provider(app):
+    name = app.config.get('SMS_PROVIDER', 'file')
+    if name in PROVIDERS:
+        return PROVIDERS[name](app)
+    module_name, _, attr = name.partition(':')
+    provider_cls = getattr(importlib.import_module(module_name), attr)
+    return provider_cls(app)
+
+
+def enqueue_sms(phone_number, message):
+    """Adiciona um SMS à fila na sessão atual; o commit fica com o chamador."""
+    entry = SmsOutbox(phone=phone_number, message=message, status='pending',
+                      attempts=0, next_attempt_at=datetime.utcnow())
+    db.session.add(entry)
+    return entry
+
+
+def enqueue_sms_many(messages):
+    """Enfileira vários SMS (``[(telefone, mensagem), ...]``) num único INSERT em lote.
+
+    Como :func:`enqueue_sms`, grava na transação atual e não devolve os
+    objetos (sem ids), o que permite o ``executemany``.
+    """
+    now = datetime.utcnow()
+    rows = [{'phone': phone, 'message': message, 'status': 'pending', 'attempts': 0,
+             'next_attempt_at': now, 'created_at': now} for phone, message in messages]
+    if rows:
+        db.session.execute(insert(SmsOutbox), rows)
+    return len(rows)
+
+
+def pending_count():
+    return db.session.query(SmsOutbox.id).filter(SmsOutbox.status.in_(('pending', 'sending'))).count()
+
+
+def _claim_batch(batch_size, now):
+    """Reserva até ``batch_size`` mensagens vencidas com um UPDATE condicional.
+
+    Vários workers (threads ou processos) podem drenar a mesma fila: cada
+    linha só muda para 'sending' uma vez por lease.
+    """
+    # 'sending' vencido = lease de um worker que não terminou o lote
+    due = and_(SmsOutbox.status.in_(('pending', 'sending')), SmsOutbox.next_attempt_at <= now)
+    ids = select(SmsOutbox.id).where(due).order_by(SmsOutbox.id).limit(batch_size).scalar_subquery()
+    stmt = update(SmsOutbox)\
+        .where(SmsOutbox.id.in_(ids), due)\
+        .values(status='sending', next_attempt_at=now + timedelta(seconds=LEASE_SECONDS))\
+        .returning(SmsOutbox.id, SmsOutbox.phone, SmsOutbox.message, SmsOutbox.attempts)\
+        .execution_options(synchronize_session=False)
+    rows = db.session.execute(stmt).all()
+    db.session.commit()
+    return rows
+
+
+def drain_once(provider, batch_size=100, max_attempts=5, backoff_seconds=30):
+    """Entrega um lote de mensagens; retorna ``(enviadas, falhas)``."""
+    now = datetime.utcnow()
+    rows = _claim_batch(batch_size, now)
+    if not rows:
+        return 0, 0
+
+    results = provider.send_batch([(row.id, row.phone, row.message) for row in rows])
+    provider.flush()
+
+    sent_ids = [message_id for message_id, error in results.items() if error is None]
+    if sent_ids:
+        db.session.execute(
+            update(SmsOutbox).where(SmsOutbox.id.in_(sent_ids))
+            .values(status='sent', sent_at=now, last_error=None,
+                    attempts=SmsOutbox.attempts + 1)
+            .execution_options(synchronize_session=False))
+
+    failures = 0
+    for row in rows:
+        error = results.get(row.id, 'sem resposta do provedor')
+        if error is None:
+            continue
+        failures += 1
+        attempts = row.attempts + 1
+        values = {'attempts': attempts, 'last_error': error}
+        if attempts >= max_attempts:
+            values['status'] = 'failed'
+        else:
+            values['status'] = 'pending'
+            values['next_attempt_at'] = now + timedelta(seconds=backoff_seconds * 2 ** (attempts - 1))
+        db.session.execute(
+            update(SmsOutbox).where(SmsOutbox.id == row.id).values(**values)
+            .execution_options(synchronize_session=False))
+    db.session.commit()
+    if failures:
+        logger.warning('SMS: %s mensagem(ns) falharam neste lote', failures)
+    return len(sent_ids), failures
+
+
+class OutboxWorker:
+    """Drena a outbox periodicamente em uma thread daemon."""
+
+    def __init__(self, app, provider=None, batch_size=None, interval=None,
+                 max_attempts=None, backoff_seconds=None):
+        self.app = app
+        self.provider = provider or create_provider(app)
+        self.batch_size = batch_size or app.config.get('SMS_BATCH_SIZE', 100)
+        self.interval = interval or app.config.get('SMS_WORKER_INTERVAL', 1.0)
+        self.max_attempts = max_attempts or app.config.get('SMS_MAX_ATTEMPTS', 5)
+        self.backoff_seconds = backoff_seconds or app.config.get('SMS_BACKOFF_SECONDS', 30)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def drain(self):
+        """Drena até a fila não ter mais mensagens vencidas; retorna o total enviado."""
+        total = 0
+        with self.app.app_context():
+            try:
+                while True:
+                    sent, failed = drain_once(self.provider, self.batch_size,
+                                              self.max_attempts, self.backoff_seconds)
+                    total += sent
+                    if sent + failed < self.batch_size:
+                        break
+            finally:
+                db.session.remove()
+        return total
+
+    def run_forever(self):
+        # espera um intervalo antes do primeiro lote: na inicialização o
+        # esquema ainda pode estar sendo criado/migrado
+        while not self._stop.wait(self.interval):
+            try:
+                self.drain()
+            except Exception:
+                logger.exception('Falha ao drenar a fila de SMS')
+        self.provider.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name='sms-outbox', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def init_sms(app):
+    """Inicia o worker em thread quando ``SMS_WORKER == 'thread'``."""
+    if app.config.get('SMS_WORKER') != 'thread':
+        return None
+    worker = OutboxWorker(app).start()
+    app.extensions['sms_worker'] = worker
+    return worker
@@ -0,0 +1,138 @@
+"""Agregações de contagem de animais feitas no banco (GROUP BY).
+
+As dashboards precisam apenas de totais por procedimento, status e clínica;
+carregar todos os `Animal` para contar em Python não escala. As funções
+abaixo devolvem dicionários simples e nunca materializam objetos do ORM.
+"""
+from flask import current_app
+from sqlalchemy import func
+
+try:
+    from .extensions import db
+    from .models import Animal, Clinic
+except Exception:
+    from extensions import db
+    from models import Animal, Clinic
+
+
+# procedimentos exibidos no gráfico do admin, na ordem das cores do template
+PROCEDIMENTOS = ('castração', 'consulta', 'vacina', 'cirurgia')
+
+# grafias sem acento que chegam do formulário de cadastro (animals/add.html)
+PROCEDIMENTO_ALIASES = {
+    'castracao': 'castração',
+}
+
+
+def normalize_procedimento(value):
+    """Normaliza o nome de um procedimento (minúsculas, sem espaços, aliases)."""
+    if not value:
+        return None
+    key = value.strip().lower()
+    return PROCEDIMENTO_ALIASES.get(key, key)
+
+
+def _grouped(column, *criteria, model=Animal):
+    query = db.session.query(column, func.count(model.id))
+    if criteria:
+        query = query.filter(*criteria)
+    return query.group_by(column).all()
+
+
+def count_animals(*criteria, model=Animal):
+    """``SELECT count(*)`` de animais com os filtros informados."""
+    query = db.session.query(func.count(model.id))
+    if criteria:
+        query = query.filter(*criteria)
+    return query.scalar()
+
+
+def procedimento_counts(*criteria, model=Animal):
+    """Contagem por procedimento normalizado.
+
+    O SQL agrupa por ``lower(trim(procedimento))``; como o ``lower`` do SQLite
+    só trata ASCII, os grupos restantes (poucos) são combinados em Python.
+    """
+    counts = dict.fromkeys(PROCEDIMENTOS, 0)
+    normalized = func.lower(func.trim(model.procedimento))
+    for value, total in _grouped(normalized, model.procedimento.isnot(None), *criteria, model=model):
+        key = normalize_procedimento(value)
+        if key:
+            counts[key] = counts.get(key, 0) + total
+    return counts
+
+
+def status_counts(*criteria, model=Animal):
+    """Contagem por status (``{'Aguardando': 10, 'Concluído': 3, ...}``)."""
+    counts = {}
+    for value, total in _grouped(func.trim(model.status), *criteria, model=model):
+        counts[value] = counts.get(value, 0) + total
+    return counts
+
+
+def clinic_counts(*criteria, model=Animal):
+    """Contagem por clínica, com o nome da clínica (``None`` = sem clínica)."""
+    rows = db.session.query(model.clinic_id, Clinic.nome, func.count(model.id))\
+        .outerjoin(Clinic, Clinic.id == model.clinic_id)
+    if criteria:
+        rows = rows.filter(*criteria)
+    rows = rows.group_by(model.clinic_id, Clinic.nome).all()
+    return {clinic_id: {'nome': nome, 'total': total} for clinic_id, nome, total in rows}
+
+
+def use_counters():
+    """Leituras sem filtro vêm de ``animal_counter`` (backend/counters.py) se ``STATS_USE_COUNTERS``."""
+    return current_app.config.get('STATS_USE_COUNTERS', True)
+
+
+def clinic_animal_count(clinic_id):
+    if use_counters():
+        from .counters import count
+        return count(clinic_id=clinic_id)
+    return count_animals(Animal.clinic_id == clinic_id)
+
+
+def waiting_animal_count():
+    """Animais sem clínica com status 'Aguard...' (ver ``services.waiting_for_clinic_criteria``)."""
+    if use_counters():
+        from .counters import count
+        return count(unassigned=True, status_range=('Aguard', 'Aguare'))
+    from .services import waiting_for_clinic_criteria
+    return count_animals(waiting_for_clinic_criteria())
+
+
+def dashboard_summary(*criteria):
+    """Dados agregados usados pelos cartões e gráficos da dashboard.
+
+    Sem filtros, soma os contadores materializados em vez de varrer ``animal``.
+    """
+    if not criteria and use_counters():
+        from .counters import summary
+        return summary()
+    return grouped_summary(*criteria)
+
+
+def grouped_summary(*criteria, model=Animal):
+    """Mesmo formato de :func:`dashboard_summary`, sempre por GROUP BY em ``model``."""
+    by_status = status_counts(*criteria, model=model)
+    return {
+        'total': sum(by_status.values()),
+        'status_counts': by_status,
+        'procedimento_counts': procedimento_counts(*criteria, model=model),
+        'clinic_counts': clinic_counts(*criteria, model=model),
+    }
+
+
+def merge_summaries(*summaries):
+    """Soma resumos no formato de :func:`dashboard_summary` (ex.: ativos + histórico)."""
+    merged = {'total': 0, 'status_counts': {}, 'procedimento_counts': dict.fromkeys(PROCEDIMENTOS, 0),
+              'clinic_counts': {}}
+    for summary in summaries:
+        merged['total'] += summary['total']
+        for key in ('status_counts', 'procedimento_counts'):
+            for name, total in summary[key].items():
+                merged[key][name] = merged[key].get(name, 0) + total
+        for clinic_id, item in summary['clinic_counts'].items():
+            entry = merged['clinic_counts'].setdefault(clinic_id, {'nome': item['nome'], 'total': 0})
+            entry['total'] += item['total']
+    return merged
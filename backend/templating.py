@@ -0,0 +1,207 @@
+"""Cache de templates: bytecode do Jinja em disco e fragmentos de HTML em memória.
+
+**Bytecode** (``JINJA_BYTECODE_CACHE``, padrão ``instance/jinja_cache``; vazio
+desliga): o código compilado de cada template é gravado em disco e
+reaproveitado pelos workers novos, que deixam de compilar os templates na
+primeira requisição. A chave inclui o checksum do fonte; editar um template
+invalida a entrada.
+
+**Fragmentos** (``FRAGMENT_CACHE_BYTES``, padrão 32 MiB; 0 desliga): as
+linhas das tabelas das listagens (``dashboard/admin.html``,
+``animals/list.html``, ``clinics/list.html``) são renderizadas por
+:func:`cached_rows` a partir de uma macro do template. Cada linha fica em
+cache pela chave ``(listagem, variante, id, versão)`` e a tabela inteira
+pelos ids das linhas e pela versão da tabela; numa página já vista nenhuma
+linha é renderizada de novo. As versões vêm de ``change_version``:
+
+- animal: escopo ``animal:<id>`` (triggers, então qualquer escrita conta:
+  ORM, UPDATE em lote, importação, arquivamento, outro worker) mais
+  ``clinics`` e ``users``, pois a linha mostra o nome da clínica e o do tutor;
+- clínica: escopos ``clinics`` e ``users`` (usuário da clínica);
+- tabela: ``all`` (qualquer animal) ou ``clinics``, mais ``users``, numa
+  consulta de poucas linhas; as versões por linha só são lidas quando ela mudou.
+
+O cache é por processo, LRU e limitado em bytes. As rotas de escrita de
+``animals`` e ``clinics`` chamam :func:`invalidate` para liberar na hora as
+linhas alteradas; a versão na chave garante que nunca se sirva uma linha
+velha mesmo sem isso. Sem as triggers de versão (migração pendente) nada
+entra no cache.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+try:
+    from . import versions
+except Exception:
+    import versions
+
+DEFAULT_FRAGMENT_BYTES = 32 * 1024 * 1024
+# custo aproximado da chave e do nó do OrderedDict por entrada
+ENTRY_OVERHEAD = 200
+
+
+class FragmentCache:
+    """LRU de fragmentos de HTML limitado pelo tamanho total, thread-safe."""
+
+    def __init__(self, max_bytes=DEFAULT_FRAGMENT_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # (tipo, id) -> chaves das linhas desse registro (para invalidate)
+        self._by_row = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, row=None):
+        cost = sys.getsizeof(value) + ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._forget(key, old)
+            self._entries[key] = (value, cost, row)
+            self.size += cost
+            if row is not None:
+                self._by_row.setdefault(row, set()).add(key)
+            while self.size > self.max_bytes:
+                evicted, entry = self._entries.popitem(last=False)
+                self._forget(evicted, entry)
+
+    def _forget(self, key, entry):
+        self.size -= entry[1]
+        row = entry[2]
+        if row is not None:
+            keys = self._by_row.get(row)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_row[row]
+
+    def invalidate(self, kind, row_id):
+        """Remove as linhas em cache do registro ``(kind, row_id)``."""
+        with self._lock:
+            for key in self._by_row.pop((kind, row_id), ()):
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.size -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_row.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+# escopos que mudam com qualquer alteração das linhas de cada tipo (chave da
+# tabela inteira) e escopos compartilhados por todas as linhas
+TABLE_SCOPES = {'animal': ('all', 'clinics', 'users'), 'clinic': ('clinics', 'users')}
+SHARED_SCOPES = {'animal': ('clinics', 'users'), 'clinic': ('clinics', 'users')}
+
+
+def _row_versions(kind, ids):
+    """Versão de cada linha (na ordem dos ids), em uma consulta."""
+    shared = list(SHARED_SCOPES[kind])
+    if kind == 'animal':
+        scopes = [versions.animal_scope(row_id) for row_id in ids]
+        current = versions.current(scopes + shared)
+        common = tuple(current[scope] for scope in shared)
+        return [(current[scope],) + common for scope in scopes]
+    current = versions.current(shared)
+    return [tuple(current[scope] for scope in shared)] * len(ids)
+
+
+def cached_rows(name, items, macro, variant=(), per_item=None):
+    """Renderiza ``macro(item)`` para cada item, com cache por linha e da tabela.
+
+    ``name`` identifica a listagem; ``variant`` tudo que muda o HTML para o
+    mesmo registro (papel do usuário, colunas visíveis...). ``per_item`` é
+    uma função opcional do item com a parte da variante que depende da
+    linha (ex.: ``identity.can_manage``). Itens de outros modelos são sempre
+    renderizados.
+
+    A tabela inteira é procurada primeiro pelos ids e pelas versões
+    ``TABLE_SCOPES`` (uma consulta de poucas linhas); só se alguma linha
+    mudou desde então as versões por linha são lidas e as linhas que não
+    mudaram vêm do cache uma a uma.
+    """
+    items = list(items)
+    cache = current_app.extensions.get('fragments')
+    kind = getattr(items[0], '__tablename__', None) if items else None
+    if cache is None or kind not in TABLE_SCOPES or not versions.available():
+        return Markup('').join(macro(item) for item in items)
+
+    variant = tuple(variant)
+    ids = [item.id for item in items]
+    extra = [per_item(item) for item in items] if per_item else [None] * len(items)
+    table_scopes = TABLE_SCOPES[kind]
+    table_versions = versions.current(table_scopes)
+    table_key = ('table', name, variant, tuple(ids), tuple(extra),
+                 tuple(table_versions[scope] for scope in table_scopes))
+    html = cache.get(table_key)
+    if html is not None:
+        return html
+
+    parts = []
+    for item, row_id, version, item_extra in zip(items, ids, _row_versions(kind, ids), extra):
+        key = (name, variant, row_id, version, item_extra)
+        row = cache.get(key)
+        if row is None:
+            row = Markup(macro(item))
+            cache.set(key, row, row=(kind, row_id))
+        parts.append(row)
+    html = Markup('').join(parts)
+    cache.set(table_key, html)
+    return html
+
+
+def get_fragment_cache(app):
+    return app.extensions.get('fragments')
+
+
+def invalidate(kind, row_id):
+    """Libera os fragmentos do registro alterado (chamado pelas rotas de escrita)."""
+    cache = current_app.extensions.get('fragments')
+    if cache is not None:
+        cache.invalidate(kind, row_id)
+
+
+def init_templating(app):
+    """Liga o cache de bytecode do Jinja e o cache de fragmentos conforme a configuração.
+
+    Deve rodar antes do primeiro uso de ``app.jinja_env``.
+    """
+    directory = app.config.get('JINJA_BYTECODE_CACHE')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(directory)}
+    max_bytes = app.config.get('FRAGMENT_CACHE_BYTES', DEFAULT_FRAGMENT_BYTES)
+    if max_bytes:
+        app.extensions['fragments'] = FragmentCache(max_bytes)
+    app.add_template_global(cached_rows)
+    return app.extensions.get('fragments')
@@ -0,0 +1,90 @@
+"""Versões de alteração por escopo, usadas nos ETags da API (``/api/v1``).
+
+A tabela ``change_version`` guarda um contador por escopo:
+
+- ``all``: qualquer alteração em ``animal``;
+- ``clinic:<id>``: animais da clínica ``<id>`` (``clinic:0`` = fila sem clínica);
+- ``user:<id>``: animais do tutor ``<id>``;
+- ``clinics``: cadastro de clínicas;
+- ``users``: nome de usuário de qualquer conta (mostrado nas linhas das
+  listagens de animais e de clínicas);
+- ``animal:<id>``: o próprio animal ``<id>`` (chave dos fragmentos de HTML
+  em cache, ver :mod:`backend.templating`). O escopo não é apagado com o
+  animal: um id reaproveitado continua com versão nova.
+
+Triggers no banco incrementam os escopos afetados em qualquer escrita (ORM,
+UPDATE em lote da reivindicação, importação ou SQL direto); uma troca de
+clínica/tutor incrementa o escopo antigo e o novo. Conferir se uma coleção
+mudou custa uma consulta pela chave primária, sem tocar em ``animal``.
+"""
+import hashlib
+import json
+
+from sqlalchemy import text
+
+try:
+    from .extensions import db
+except Exception:
+    from extensions import db
+
+# triggers que incrementam os escopos, criados pelas migrações 5, 10 e 12
+# (backend/migrations.py); um trigger novo ou alterado precisa de outra migração
+TRIGGERS = (
+    'change_version_animal_ai', 'change_version_animal_au', 'change_version_animal_ad',
+    'change_version_animal_row_ai', 'change_version_animal_row_au', 'change_version_animal_row_ad',
+    'change_version_clinic_ai', 'change_version_clinic_au', 'change_version_clinic_ad',
+    'change_version_user_au',
+)
+
+# engine url -> tabela e triggers instalados?
+_available = {}
+
+
+def available():
+    """``False`` enquanto a migração não rodou: sem triggers, sem ETag (nunca um 304 velho)."""
+    url = str(db.engine.url)
+    if not _available.get(url):
+        _available[url] = db.session.scalar(text(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'change_version_%'"
+        )) == len(TRIGGERS)
+    return _available[url]
+
+
+def clinic_scope(clinic_id):
+    return f'clinic:{clinic_id or 0}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def animal_scope(animal_id):
+    return f'animal:{animal_id}'
+
+
+def current(scopes):
+    """``{escopo: versão}`` (0 para escopos ainda sem alterações), em uma consulta.
+
+    Os escopos vão como um único parâmetro JSON (``json_each``): o custo não
+    cresce com parâmetros ligados um a um, e não há limite de variáveis do
+    SQLite para páginas grandes.
+    """
+    scopes = list(scopes)
+    versions = dict.fromkeys(scopes, 0)
+    versions.update(db.session.execute(
+        text('SELECT scope, version FROM change_version WHERE scope IN (SELECT value FROM json_each(:scopes))'),
+        {'scopes': json.dumps(scopes)},
+    ).all())
+    return versions
+
+
+def etag(scopes, *extra):
+    """ETag (sem aspas) das versões de ``scopes`` mais ``extra`` (parâmetros da consulta, usuário...).
+
+    Retorna ``None`` se as versões não estiverem disponíveis.
+    """
+    if not available():
+        return None
+    versions = current(scopes)
+    digest = hashlib.blake2b(repr((sorted(versions.items()), extra)).encode(), digest_size=8)
+    return digest.hexdigest()
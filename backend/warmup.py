@@ -0,0 +1,113 @@
+"""Aquecimento opcional na inicialização (``WARMUP=1``).
+
+Sem aquecimento a primeira requisição de cada worker paga custos que só
+acontecem uma vez por processo: compilar os templates Jinja que ela usa,
+configurar os mappers do ORM, abrir a conexão SQLite (com os PRAGMAs do
+perfil) e as consultas a ``sqlite_master`` que detectam a busca FTS5 e os
+triggers de versão. :func:`warm_up` faz tudo isso dentro de ``create_app``,
+antes da primeira requisição:
+
+- compila todos os templates de ``frontend/templates`` para o cache do
+  ambiente Jinja;
+- configura os mappers;
+- abre ``WARMUP_CONNECTIONS`` conexões do pool (padrão 1), que voltam ao
+  pool já prontas;
+- preenche os caches de :func:`backend.search.fts_available` e
+  :func:`backend.versions.available`.
+
+Com ``gunicorn --preload`` o aquecimento roda no processo mestre; as
+conexões herdadas pelos workers são descartadas no fork (o SQLite não
+pode compartilhar conexões entre processos) e cada worker abre as suas.
+"""
+import logging
+import os
+import time
+import weakref
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+try:
+    from .extensions import db
+    from . import search, versions
+except Exception:
+    from extensions import db
+    import search
+    import versions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECTIONS = 1
+
+# engines aquecidos neste processo (fracos: apps descartadas não ficam presas aqui)
+_warmed_engines = weakref.WeakSet()
+
+
+def _dispose_after_fork():
+    # filhos de um fork (gunicorn --preload) não reaproveitam as conexões do pai
+    for engine in list(_warmed_engines):
+        engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    # registrado uma única vez por processo, por mais apps que sejam criadas
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+class WarmupResult:
+    def __init__(self):
+        self.templates = 0
+        self.connections = 0
+        self.elapsed = 0.0
+
+    def summary(self):
+        return (f'{self.templates} templates compilados, {self.connections} conexões abertas '
+                f'em {self.elapsed * 1000:.1f}ms')
+
+
+def compile_templates(app):
+    """Carrega (compila) todos os templates no cache do ambiente Jinja."""
+    env = app.jinja_env
+    names = env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def open_connections(app, count):
+    """Abre ``count`` conexões ao mesmo tempo e as devolve ao pool."""
+    connections = []
+    try:
+        for _ in range(count):
+            conn = db.engine.connect()
+            connections.append(conn)
+            conn.execute(text('SELECT 1'))
+    finally:
+        for conn in connections:
+            conn.close()
+    return len(connections)
+
+
+def warm_up(app):
+    result = WarmupResult()
+    started = time.perf_counter()
+    result.templates = compile_templates(app)
+    configure_mappers()
+    with app.app_context():
+        result.connections = open_connections(app, app.config.get('WARMUP_CONNECTIONS', DEFAULT_CONNECTIONS))
+        if db.engine.dialect.name == 'sqlite':
+            search.fts_available()
+            versions.available()
+        db.session.remove()
+        _warmed_engines.add(db.engine)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def init_warmup(app):
+    """Aquece a aplicação se ``WARMUP`` estiver ligado; retorna o :class:`WarmupResult`."""
+    if not app.config.get('WARMUP'):
+        return None
+    result = warm_up(app)
+    logger.info('Aquecimento: %s', result.summary())
+    return result
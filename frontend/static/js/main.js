@@ -2,4 +2,24 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Código JavaScript aqui
     console.log('App Vet carregado com sucesso!');
-});
\ No newline at end of file
+});
+
+// Atualizações ao vivo (SSE): chama onEvent(evento) e mostra o aviso
+// #live-notice para recarregar a página
+function watchLiveEvents(url, onEvent) {
+    if (!window.EventSource) {
+        return null;
+    }
+    const source = new EventSource(url);
+    source.onmessage = function(message) {
+        const event = JSON.parse(message.data);
+        const notice = document.getElementById('live-notice');
+        if (notice) {
+            notice.hidden = false;
+        }
+        if (onEvent) {
+            onEvent(event);
+        }
+    };
+    return source;
+}
@@ -1,6 +1,17 @@
 from flask import Flask
 from backend.extensions import db, login_manager
 from backend.routes import register_blueprints
+from backend.cli import register_commands
+from backend.database import engine_options, install_profile
+from backend.sms import init_sms
+from backend.identity import init_identity
+from backend.events import init_events
+from backend.reminders import init_reminders
+from backend.profiling import init_profiling
+from backend.metrics import init_metrics
+from backend.warmup import init_warmup
+from backend.templating import init_templating
+from backend.assets import init_assets
 import os
 import logging
 
@@ -8,7 +19,7 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_app():
+def create_app(config=None):
     # Obter o diretório base do projeto
     basedir = os.path.abspath(os.path.dirname(__file__))
     
@@ -20,15 +31,102 @@ def create_app():
     
     # Configuração da aplicação
     app.config['SECRET_KEY'] = 'uma-chave-secreta-bem-dificill'
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(app.instance_path, 'pets.db')}"
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL', f"sqlite:///{os.path.join(app.instance_path, 'pets.db')}")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'tuned')
+    app.config['ANIMALS_PER_PAGE'] = int(os.environ.get('ANIMALS_PER_PAGE', 25))
+    # Cache da identidade (usuário/clínica) por processo, em segundos (0 desativa).
+    # Não é invalidado por SQL direto nem por outros workers: ver backend/identity.py
+    app.config['IDENTITY_CACHE_TTL'] = int(os.environ.get('IDENTITY_CACHE_TTL', 0))
+    # Fila de SMS: 'off' (padrão) deixa para `python run.py sms-worker`
+    # (processo separado); 'thread' drena a outbox neste processo, o que só o
+    # servidor de desenvolvimento liga por padrão
+    app.config['SMS_WORKER'] = os.environ.get('SMS_WORKER', 'off')
+    app.config['SMS_PROVIDER'] = os.environ.get('SMS_PROVIDER', 'file')
+    # Hash de senhas em pool de processos (0 = na própria thread)
+    app.config['PASSWORD_HASH_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))
+    app.config['PASSWORD_POOL_SIZE'] = int(os.environ.get('PASSWORD_POOL_SIZE', os.cpu_count() or 2))
+    # Dashboards leem a tabela animal_counter em vez de contar em animal
+    app.config['STATS_USE_COUNTERS'] = os.environ.get('STATS_USE_COUNTERS', '1') != '0'
+    # Busca FTS5: quantos resultados mais recentes entram no ranking bm25 (os demais vêm depois, por id)
+    app.config['SEARCH_RANK_WINDOW'] = int(os.environ.get('SEARCH_RANK_WINDOW', 1000))
+    # Eventos em tempo real (SSE): 'local' (um processo) ou 'socket' (vários
+    # workers compartilhando `python run.py event-broker`)
+    app.config['EVENTS_BROKER'] = os.environ.get('EVENTS_BROKER', 'local')
+    # Expediente padrão das clínicas sem horários cadastrados (dias: 0 = segunda)
+    app.config['SCHEDULE_HOURS'] = os.environ.get('SCHEDULE_HOURS', '08:00-18:00')
+    app.config['SCHEDULE_WEEKDAYS'] = os.environ.get('SCHEDULE_WEEKDAYS', '0,1,2,3,4')
+    app.config['SCHEDULE_SLOT_MINUTES'] = int(os.environ.get('SCHEDULE_SLOT_MINUTES', 30))
+    # Lembretes por SMS dos agendamentos das próximas REMINDER_HOURS horas:
+    # 'thread' roda a cada REMINDER_INTERVAL segundos neste processo; 'off'
+    # deixa para `python run.py reminders` (cron)
+    app.config['REMINDER_WORKER'] = os.environ.get('REMINDER_WORKER', 'off')
+    app.config['REMINDER_HOURS'] = int(os.environ.get('REMINDER_HOURS', 24))
+    app.config['REMINDER_INTERVAL'] = int(os.environ.get('REMINDER_INTERVAL', 300))
+    # Atendimentos concluídos há mais de N dias vão para animal_history
+    # (`python run.py archive`)
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+    # Instrumentação por requisição (SQL, templates, tempo) em /admin/profiling;
+    # PROFILING_SAMPLE = fração das requisições gravadas com cProfile
+    app.config['PROFILING'] = os.environ.get('PROFILING', '0') == '1'
+    app.config['PROFILING_BUFFER'] = int(os.environ.get('PROFILING_BUFFER', 500))
+    app.config['PROFILING_SAMPLE'] = float(os.environ.get('PROFILING_SAMPLE', 0))
+    app.config['PROFILING_DIR'] = os.environ.get('PROFILING_DIR', os.path.join(app.instance_path, 'profiles'))
+    # /metrics (Prometheus): gauges de negócio recalculados a cada N segundos;
+    # com METRICS_TOKEN a coleta exige "Authorization: Bearer <token>"
+    app.config['METRICS_GAUGE_TTL'] = int(os.environ.get('METRICS_GAUGE_TTL', 10))
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    # Bytecode dos templates em disco (vazio desliga) e cache LRU de linhas
+    # renderizadas das listagens, limitado em bytes (0 desliga)
+    app.config['JINJA_BYTECODE_CACHE'] = os.environ.get('JINJA_BYTECODE_CACHE',
+                                                        os.path.join(app.instance_path, 'jinja_cache'))
+    app.config['FRAGMENT_CACHE_BYTES'] = int(os.environ.get('FRAGMENT_CACHE_BYTES', 32 * 1024 * 1024))
+    # Remoção de clínicas: acima de CLINIC_DELETE_SYNC_LIMIT animais+histórico
+    # a remoção roda em segundo plano, em lotes de CLINIC_DELETE_CHUNK_SIZE; uma
+    # remoção sem lote concluído há CLINIC_DELETE_STALE_AFTER segundos pode ser retomada
+    app.config['CLINIC_DELETE_SYNC_LIMIT'] = int(os.environ.get('CLINIC_DELETE_SYNC_LIMIT', 20000))
+    app.config['CLINIC_DELETE_CHUNK_SIZE'] = int(os.environ.get('CLINIC_DELETE_CHUNK_SIZE', 5000))
+    app.config['CLINIC_DELETE_STALE_AFTER'] = int(os.environ.get('CLINIC_DELETE_STALE_AFTER', 60))
+    # Estáticos com hash e pré-comprimidos (`python run.py assets build`),
+    # servidos em ASSETS_URL_PATH com cache de um ano
+    app.config['ASSETS_DIR'] = os.environ.get('ASSETS_DIR', os.path.join(basedir, 'frontend', 'dist'))
+    app.config['ASSETS_URL_PATH'] = os.environ.get('ASSETS_URL_PATH', '/assets')
+    # Aquecimento na inicialização: compila os templates e abre o pool antes
+    # da primeira requisição (WARMUP_CONNECTIONS conexões)
+    app.config['WARMUP'] = os.environ.get('WARMUP', '0') == '1'
+    app.config['WARMUP_CONNECTIONS'] = int(os.environ.get('WARMUP_CONNECTIONS', 1))
+    
+    # Sobrescritas (testes, benchmarks, scripts)
+    if config:
+        app.config.update(config)
+    
+    # Perfil do engine SQLite (pool + PRAGMAs por conexão)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app)
+    
+    # Cache de templates (antes de qualquer uso do ambiente Jinja)
+    init_templating(app)
+    init_assets(app)
     
     # Inicializar extensões
     db.init_app(app)
+    with app.app_context():
+        install_profile(app, db.engine)
     login_manager.init_app(app)
     
+    # Identidade da requisição (usuário/clínica resolvidos uma vez)
+    init_identity(app)
+    init_profiling(app)
+    init_metrics(app)
+    
     # Registrar blueprints
     register_blueprints(app)
+    register_commands(app)
+    
+    # Worker da fila de SMS
+    init_sms(app)
+    init_events(app)
+    init_reminders(app)
     
     # Configurar handler de erros
     @app.errorhandler(Exception)
@@ -48,23 +146,34 @@ def create_app():
         
         return '<h1>Erro interno</h1><p>Ocorreu um erro no servidor.</p>', 500
     
+    # Aquecimento opcional (templates, mappers, pool)
+    init_warmup(app)
+    
     return app
 
-def init_db():
-    """Inicializa o banco de dados e cria o usuário admin se necessário"""
-    app = create_app()
+def init_db(app):
+    """Inicializa o banco de dados da aplicação e cria o usuário admin se necessário.
+
+    Em produção use `python run.py init-db` no deploy; o servidor WSGI
+    (`wsgi:app`) não mexe no esquema ao subir.
+    """
+    from backend.cli import init_database
     with app.app_context():
-        db.create_all()
-        
-        # Adicionar dados iniciais (admin) se não existirem
-        from backend.models import User
-        if not User.query.filter_by(username='admin').first():
-            admin_user = User(username='admin', role='admin')
-            admin_user.set_password('admin')
-            db.session.add(admin_user)
-            db.session.commit()
+        init_database()
 
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # comandos de manutenção: python run.py migrate, python run.py --help ...
+        # (sem workers de SMS e de lembretes em segundo plano durante os comandos)
+        os.environ.setdefault('SMS_WORKER', 'off')
+        os.environ.setdefault('REMINDER_WORKER', 'off')
+        from flask.cli import FlaskGroup
+        FlaskGroup(create_app=create_app)()
+    
+    # servidor de desenvolvimento: uma única aplicação, que também prepara o
+    # banco e drena a outbox de SMS numa thread
+    os.environ.setdefault('SMS_WORKER', 'thread')
     app = create_app()
-    init_db()
+    init_db(app)
     app.run(debug=True, host='0.0.0.0', use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""Benchmark do arquivamento de atendimentos concluídos.
+
+Gera um banco com ``--rows`` animais, ``--archivable`` (fração) deles
+concluídos há mais de 90 dias, aplica as migrações (contadores, FTS5,
+versões) e roda ``archive_completed``. Mostra quantas linhas foram movidas,
+a vazão por ``--chunk-size`` e o tempo de algumas leituras da dashboard
+antes e depois. No fim confere os contadores (``counters.drift``) e o
+índice de busca.
+
+Uso:
+    python scripts/bench_archive.py --rows 500000 --chunk-size 5000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.migrations import upgrade  # noqa: E402
+from backend.models import Animal  # noqa: E402
+from backend import archive, counters, stats  # noqa: E402
+
+
+def build_database(path, rows, archivable, clinics=50):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    rnd = random.Random(3)
+    tutors = max(1, rows // 3)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany("INSERT INTO user (id, username, password_hash, role) VALUES (?, ?, 'x', 'user')",
+                     ((i, f'tutor{i}') for i in range(1, tutors + 1)))
+    conn.executemany('INSERT INTO clinic (id, nome) VALUES (?, ?)', ((i, f'Clínica {i}') for i in range(1, clinics + 1)))
+
+    def animals():
+        for i in range(1, rows + 1):
+            clinic_id = rnd.randint(1, clinics)
+            if rnd.random() < archivable:
+                done = now - timedelta(days=rnd.randint(91, 900))
+                status, agendamento = 'Concluído', done - timedelta(hours=2)
+            else:
+                done, agendamento = None, now + timedelta(days=rnd.randint(0, 30))
+                status = rnd.choice(['Agendado', 'Aguardando', 'Em Atendimento'])
+            yield (i, f'pet{i}', 'cão', rnd.choice(['vacina', 'consulta', 'castração']), rnd.randint(1, tutors),
+                   clinic_id, str(agendamento), status, 0, str(done) if done else None)
+
+    conn.executemany(
+        'INSERT INTO animal (id, nome, especie, procedimento, dono_id, clinic_id, data_agendamento, status, '
+        'token_validated, data_conclusao) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', animals())
+    conn.commit()
+    conn.close()
+
+
+def timed(label, func, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+        db.session.rollback()
+    return f'{label} {sorted(samples)[len(samples) // 2]:.1f}ms'
+
+
+def reads():
+    clinic = Animal.clinic_id == 17
+    return ', '.join([
+        timed('status da clínica (GROUP BY)', lambda: stats.status_counts(clinic)),
+        timed('contagem total (GROUP BY)', lambda: stats.grouped_summary()),
+        timed('1ª página da clínica', lambda: Animal.query.filter(clinic).order_by(Animal.id.desc()).limit(25).all()),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--archivable', type=float, default=0.6)
+    parser.add_argument('--chunk-size', type=int, default=archive.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_archive_'), 'bench.db')
+    started = time.perf_counter()
+    build_database(path, args.rows, args.archivable)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        upgrade(db.engine)
+        print(f'banco gerado e migrado em {time.perf_counter() - started:.1f}s')
+        print(f'antes:  {reads()}')
+        result = archive.archive_completed(chunk_size=args.chunk_size)
+        print(result.summary())
+        print(f'depois: {reads()}')
+        hot = db.session.scalar(db.text('SELECT count(*) FROM animal'))
+        history = db.session.scalar(db.text('SELECT count(*) FROM animal_history'))
+        indexed = db.session.scalar(db.text('SELECT count(*) FROM animal_search'))
+        print(f'animal: {hot}, animal_history: {history}, animal_search: {indexed}, '
+              f'divergências nos contadores: {len(counters.drift())}')
+
+
+if __name__ == '__main__':
+    main()
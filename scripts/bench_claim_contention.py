@@ -0,0 +1,153 @@
+"""Benchmark de contenção na reivindicação de animais por clínicas.
+
+Cria um banco temporário com ``--animals`` animais aguardando e ``--clinics``
+clínicas, cada uma em uma thread tentando reivindicar animais ao mesmo
+tempo até a fila esvaziar. Modos:
+
+- ``single``: ``claim_animal_for_clinic`` em ids aleatórios (alta colisão);
+- ``bulk``: ``claim_next_animals`` em lotes de ``--batch``;
+- ``legacy``: o antigo ler-verificar-gravar pelo ORM, para comparação.
+
+Ao final confere no banco que nenhum animal foi reivindicado duas vezes
+(cada sucesso reportado corresponde a exatamente uma linha) e mostra
+reivindicações por segundo.
+
+Uso:
+    python scripts/bench_claim_contention.py --animals 5000 --clinics 8 --mode single bulk legacy
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text  # noqa: E402
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.models import Animal  # noqa: E402
+from backend.services import claim_animal_for_clinic, claim_next_animals  # noqa: E402
+
+
+def legacy_claim(animal_id, clinic_id):
+    """Implementação anterior (leitura + verificação em Python + commit)."""
+    try:
+        animal = db.session.get(Animal, animal_id)
+        if not animal:
+            return None
+        if not (str(animal.status).startswith('Aguard')) or animal.clinic_id:
+            return None
+        animal.clinic_id = clinic_id
+        db.session.commit()
+        return animal
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+def seed(app, animals, clinics):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text(
+            "INSERT INTO user (id, username, password_hash, role) VALUES (1, 'tutor', 'x', 'user')"))
+        db.session.execute(
+            text("INSERT INTO clinic (id, nome) VALUES (:id, :nome)"),
+            [{'id': i, 'nome': f'clinica{i}'} for i in range(1, clinics + 1)])
+        db.session.execute(
+            text("INSERT INTO animal (nome, especie, dono_id, status, token_validated) "
+                 "VALUES (:nome, 'cao', 1, 'Aguardando', 0)"),
+            [{'nome': f'animal{i}'} for i in range(animals)])
+        db.session.commit()
+
+
+def run_mode(mode, args):
+    tmpdir = tempfile.mkdtemp(prefix='bench_claim_')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        'SMS_WORKER': 'off',
+    })
+    seed(app, args.animals, args.clinics)
+
+    successes = []
+    attempts = Counter()
+    lock = threading.Lock()
+
+    def worker(clinic_id):
+        claimed = []
+        tries = 0
+        with app.app_context():
+            remaining = True
+            while remaining:
+                tries += 1
+                if mode == 'bulk':
+                    ids = claim_next_animals(clinic_id, args.batch)
+                    claimed.extend(ids)
+                    remaining = bool(ids)
+                    continue
+                animal_id = random.randint(1, args.animals)
+                claim = claim_animal_for_clinic if mode == 'single' else legacy_claim
+                if claim(animal_id, clinic_id):
+                    claimed.append(animal_id)
+                if tries % 200 == 0:
+                    remaining = db.session.execute(text(
+                        'SELECT 1 FROM animal WHERE clinic_id IS NULL LIMIT 1')).first() is not None
+                    db.session.commit()
+        with lock:
+            successes.extend((animal_id, clinic_id) for animal_id in claimed)
+            attempts[clinic_id] = tries
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in range(1, args.clinics + 1)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        rows = dict(db.session.execute(text('SELECT id, clinic_id FROM animal')).all())
+        db.engine.dispose()
+
+    per_animal = Counter(animal_id for animal_id, _ in successes)
+    double = sum(1 for n in per_animal.values() if n > 1)
+    mismatched = sum(1 for animal_id, clinic_id in successes if rows.get(animal_id) != clinic_id)
+    return {
+        'claims': len(successes),
+        'attempts': sum(attempts.values()),
+        'elapsed': elapsed,
+        'double': double,
+        'mismatched': mismatched,
+        'unclaimed': sum(1 for c in rows.values() if c is None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--animals', type=int, default=5000)
+    parser.add_argument('--clinics', type=int, default=8)
+    parser.add_argument('--batch', type=int, default=10)
+    parser.add_argument('--mode', nargs='+', default=['single', 'bulk', 'legacy'],
+                        choices=['single', 'bulk', 'legacy'])
+    args = parser.parse_args()
+
+    print(f'{args.animals} animais, {args.clinics} clínicas concorrentes')
+    print(f'{"modo":<8}{"sucessos":>10}{"tentativas":>12}{"claims/s":>10}{"duplos":>8}{"divergentes":>13}{"livres":>8}')
+    failed = False
+    for mode in args.mode:
+        r = run_mode(mode, args)
+        print(f'{mode:<8}{r["claims"]:>10}{r["attempts"]:>12}{r["claims"] / r["elapsed"]:>10.0f}'
+              f'{r["double"]:>8}{r["mismatched"]:>13}{r["unclaimed"]:>8}')
+        if mode != 'legacy' and (r['double'] or r['mismatched']):
+            failed = True
+    if failed:
+        print('ERRO: reivindicação dupla detectada')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark da remoção de uma clínica grande (``backend/clinic_deletion.py``).
+
+Gera um banco com uma clínica de ``--animals`` animais (mais uma segunda
+clínica vazia, destino da transferência) e, cada modo sobre uma cópia dele,
+mede:
+
+- ``orm`` (com ``--legacy``): o caminho antigo, em que ``db.session.delete``
+  da clínica carregava todos os animais e horários no ORM e anulava
+  ``clinic_id`` linha a linha;
+- ``fila``: devolve os animais para a fila numa única transação;
+- ``transferir``: move tudo para a outra clínica numa única transação;
+- ``lotes``: devolve para a fila em lotes de ``--chunk-size``. Mostra o
+  lote mais lento, que é quanto tempo o bloqueio de escrita fica preso.
+
+No fim de cada modo confere os contadores (``counters.drift``).
+
+Uso:
+    python scripts/bench_clinic_delete.py --animals 500000
+    python scripts/bench_clinic_delete.py --animals 100000 --legacy
+"""
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, text  # noqa: E402
+
+from run import create_app  # noqa: E402
+from backend import clinic_deletion, counters  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.models import Clinic  # noqa: E402
+from tests.datagen import STATUS_WEIGHTS, generate  # noqa: E402
+
+CLINIC = 1
+
+
+def build(path, animals):
+    # metade dos "Aguardando" sai sem clínica; o resto fica na clínica 1
+    share = 1 - dict(STATUS_WEIGHTS)['Aguardando'] / 2
+    generate(path, users=5000, clinics=1, animals=math.ceil(animals / share))
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO clinic (id, nome) VALUES (2, 'Clínica destino')")
+    conn.commit()
+    total = conn.execute('SELECT count(*) FROM animal WHERE clinic_id = ?', (CLINIC,)).fetchone()[0]
+    conn.close()
+    return total
+
+
+def copy(source, target):
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    src.backup(dst)
+    src.close()
+    dst.close()
+
+
+def run_mode(source, mode, chunk_size):
+    path = os.path.join(os.path.dirname(source), f'{mode}.db')
+    copy(source, path)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off',
+                      'JINJA_BYTECODE_CACHE': ''})
+    chunks = []
+    with app.app_context():
+        started = time.perf_counter()
+        if mode == 'orm':
+            # o que o ORM fazia sem passive_deletes: carregar os filhos,
+            # anular clinic_id um a um e apagar os horários
+            event.remove(Clinic, 'before_delete', clinic_deletion._release_children)
+            try:
+                clinic = db.session.get(Clinic, CLINIC)
+                for animal in clinic.animais:
+                    animal.clinic_id = None
+                for hours in clinic.horarios:
+                    db.session.delete(hours)
+                if clinic.user:
+                    db.session.delete(clinic.user)
+                db.session.delete(clinic)
+                db.session.commit()
+            finally:
+                event.listen(Clinic, 'before_delete', clinic_deletion._release_children)
+            detail = ''
+        elif mode == 'lotes':
+            original = db.session.commit
+            last = [time.perf_counter()]
+
+            def timed_commit():
+                original()
+                now = time.perf_counter()
+                chunks.append(now - last[0])
+                last[0] = now
+
+            db.session.commit = timed_commit
+            try:
+                result = clinic_deletion.delete_clinic(CLINIC, chunk_size=chunk_size)
+            finally:
+                del db.session.commit
+            detail = (f', {result.chunks} lotes, lote mais lento {max(chunks) * 1000:.0f}ms, '
+                      f'mediana {sorted(chunks)[len(chunks) // 2] * 1000:.0f}ms')
+        else:
+            result = clinic_deletion.delete_clinic(CLINIC, 2 if mode == 'transferir' else None)
+            detail = f', {result.released} agendamentos cancelados' if result.released else ''
+        elapsed = time.perf_counter() - started
+        drift = len(counters.drift())
+        dangling = db.session.scalar(text('SELECT count(*) FROM animal WHERE clinic_id = :id'), {'id': CLINIC})
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(path)
+    return f'  {mode:<11} {elapsed:8.2f}s{detail}; contadores divergentes: {drift}, animais órfãos: {dangling}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--animals', type=int, default=500000, help='Animais da clínica removida.')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--legacy', action='store_true', help='Mede também a remoção antiga pelo ORM.')
+    args = parser.parse_args()
+
+    source = os.path.join(tempfile.mkdtemp(prefix='bench_clinic_delete_'), 'base.db')
+    started = time.perf_counter()
+    total = build(source, args.animals)
+    print(f'clínica {CLINIC} com {total} animais (banco gerado em {time.perf_counter() - started:.1f}s)')
+    modes = (['orm'] if args.legacy else []) + ['fila', 'transferir', 'lotes']
+    for mode in modes:
+        print(run_mode(source, mode, args.chunk_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark da exportação em streaming sobre um banco sintético.
+
+Gera (ou reaproveita) um banco SQLite com ``--rows`` animais, tutores e
+clínicas e exporta tudo com ``generate_export`` para ``/dev/null``,
+mostrando linhas/s, bytes gerados e o pico de memória do processo antes e
+depois. Com ``--sizes`` roda para vários tamanhos de tabela (o pico deve
+ficar constante). ``--naive`` compara com carregar tudo via ``.all()``.
+
+Uso:
+    python scripts/bench_export.py --rows 1000000 --format csv --gzip
+    python scripts/bench_export.py --sizes 100000 1000000
+"""
+import argparse
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.exports import generate_export, build_query  # noqa: E402
+
+STATUSES = ['Aguardando', 'Agendado', 'Em Atendimento', 'Concluído']
+PROCEDIMENTOS = ['castração', 'consulta', 'vacina', 'cirurgia']
+
+
+def build_database(path, rows, tutors=None, clinics=50):
+    tutors = tutors or max(1, rows // 3)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany(
+        "INSERT INTO user (id, username, email, contato, password_hash, role) VALUES (?, ?, ?, ?, 'x', 'user')",
+        ((i, f'tutor{i}', f'tutor{i}@example.com', f'55{i:09d}') for i in range(1, tutors + 1)))
+    conn.executemany(
+        'INSERT INTO clinic (id, nome, endereco) VALUES (?, ?, ?)',
+        ((i, f'Clínica {i}', f'Rua {i}') for i in range(1, clinics + 1)))
+    base = datetime(2025, 1, 1)
+    rnd = random.Random(42)
+
+    def animals():
+        for i in range(1, rows + 1):
+            status = rnd.choice(STATUSES)
+            clinic_id = None if status == 'Aguardando' else rnd.randint(1, clinics)
+            when = base + timedelta(minutes=rnd.randint(0, 525600)) if clinic_id else None
+            yield (i, f'animal{i}', 'cão', 'srd', rnd.randint(0, 15), rnd.choice(PROCEDIMENTOS),
+                   rnd.randint(1, tutors), clinic_id, when, status, 0)
+
+    conn.executemany(
+        'INSERT INTO animal (id, nome, especie, raca, idade, procedimento, dono_id, clinic_id, '
+        'data_agendamento, status, token_validated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        animals())
+    conn.commit()
+    conn.close()
+
+
+def peak_rss_mb():
+    # ru_maxrss: KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_export(app, args):
+    with app.app_context():
+        before = peak_rss_mb()
+        started = time.perf_counter()
+        total_bytes = 0
+        rows = 0
+        if args.naive:
+            result = db.session.execute(build_query()).all()
+            rows = len(result)
+        else:
+            with open(os.devnull, 'wb') as sink:
+                for chunk in generate_export(args.format, compress=args.gzip, chunk_size=args.chunk_size):
+                    total_bytes += len(chunk)
+                    sink.write(chunk)
+            rows = db.session.execute(db.text('SELECT count(*) FROM animal')).scalar()
+        elapsed = time.perf_counter() - started
+        return rows, total_bytes, elapsed, before, peak_rss_mb()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=None)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--naive', action='store_true', help='Carrega tudo com .all() (comparação).')
+    parser.add_argument('--db', default=None, help='Reaproveita/gera o banco neste caminho.')
+    args = parser.parse_args()
+
+    print(f'{"linhas":>10}{"tempo":>9}{"linhas/s":>11}{"MB saída":>10}{"RSS antes":>11}{"RSS pico":>10}')
+    for size in args.sizes or [args.rows]:
+        path = args.db or os.path.join(tempfile.mkdtemp(prefix='bench_export_'), f'bench_{size}.db')
+        if not os.path.exists(path):
+            build_database(path, size)
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+        rows, total_bytes, elapsed, before, peak = run_export(app, args)
+        print(f'{rows:>10}{elapsed:>8.1f}s{rows / elapsed:>11.0f}{total_bytes / 2**20:>10.1f}'
+              f'{before:>9.0f}MB{peak:>8.0f}MB')
+
+
+if __name__ == '__main__':
+    main()
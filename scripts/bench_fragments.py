@@ -0,0 +1,116 @@
+"""Benchmark do cache de templates: fragmentos das listagens e bytecode do Jinja.
+
+1. **Fragmentos**: renderiza ``GET /?per_page=N`` (dashboard do admin com
+   ``N`` linhas; ``ANIMALS_MAX_PER_PAGE`` é elevado para isso) com o cache de
+   fragmentos desligado e ligado. Mede o tempo de template (sinais
+   ``before_render_template``/``template_rendered``) e da requisição
+   inteira, em regime (cache já quente), e confere que o HTML é idêntico.
+2. **Bytecode**: tempo para carregar todos os templates num processo novo,
+   sem cache em disco e com o cache já gravado por um processo anterior.
+
+Uso:
+    python scripts/bench_fragments.py --rows 10000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from flask import before_render_template, template_rendered  # noqa: E402
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from tests.datagen import generate  # noqa: E402
+
+
+def measure_render(path, rows, repeat, fragment_bytes):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off',
+                      'ANIMALS_MAX_PER_PAGE': rows, 'FRAGMENT_CACHE_BYTES': fragment_bytes,
+                      'JINJA_BYTECODE_CACHE': ''})
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['role'] = 'admin'
+    url = f'/?per_page={rows}'
+    starts, renders = [], []
+
+    def started(sender, template, context, **extra):
+        starts.append(time.perf_counter())
+
+    def rendered(sender, template, context, **extra):
+        renders.append(time.perf_counter() - starts.pop())
+
+    before_render_template.connect(started, app)
+    template_rendered.connect(rendered, app)
+    html = client.get(url).get_data()
+    renders.clear()
+    requests = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        assert client.get(url).get_data() == html
+        requests.append(time.perf_counter() - t0)
+    with app.app_context():
+        db.engine.dispose()
+    return statistics.median(renders) * 1000, statistics.median(requests) * 1000, html
+
+
+LOAD_TEMPLATES = '''
+import sys, time
+sys.path.insert(0, {root!r})
+from run import create_app
+app = create_app({{'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SMS_WORKER': 'off', 'JINJA_BYTECODE_CACHE': {cache!r}}})
+t0 = time.perf_counter()
+for name in app.jinja_env.list_templates(filter_func=lambda n: n.endswith('.html')):
+    app.jinja_env.get_template(name)
+print((time.perf_counter() - t0) * 1000)
+'''
+
+
+def measure_bytecode(runs):
+    cache = tempfile.mkdtemp(prefix='bench_jinja_')
+
+    def load(directory):
+        code = LOAD_TEMPLATES.format(root=ROOT, cache=directory)
+        env = dict(os.environ, SMS_WORKER='off')
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=env)
+        return float(out.stdout.strip().splitlines()[-1])
+
+    load(cache)  # grava o cache
+    cold = statistics.median(load('') for _ in range(runs))
+    warm = statistics.median(load(cache) for _ in range(runs))
+    return cold, warm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='Linhas da tabela da dashboard.')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', help='Banco gerado por tests/datagen.py (senão um novo é gerado).')
+    args = parser.parse_args()
+
+    path = args.db
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix='bench_fragments_'), 'vet.db')
+        print(generate(path, users=2000, clinics=20, animals=max(args.rows * 2, 1000)).summary())
+
+    off_render, off_request, off_html = measure_render(path, args.rows, args.repeat, 0)
+    on_render, on_request, on_html = measure_render(path, args.rows, args.repeat, 256 * 1024 * 1024)
+    print(f'GET /?per_page={args.rows} como admin (mediana de {args.repeat}):')
+    print(f'  sem cache de fragmentos:  template {off_render:8.1f}ms  requisição {off_request:8.1f}ms')
+    print(f'  cache quente:             template {on_render:8.1f}ms  requisição {on_request:8.1f}ms')
+    print(f'  ganho: template {off_render / on_render:.1f}x, requisição {off_request / on_request:.1f}x, '
+          f'HTML idêntico: {off_html == on_html}')
+
+    cold, warm = measure_bytecode(5)
+    print(f'carregar todos os templates num processo novo: sem bytecode {cold:.1f}ms, '
+          f'com bytecode em disco {warm:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
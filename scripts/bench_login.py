@@ -0,0 +1,116 @@
+"""Benchmark de vazão de login por tamanho do pool de hash de senhas.
+
+Para cada valor de ``--pool-sizes`` cria um banco temporário com um usuário,
+dispara ``--concurrency`` threads fazendo ``POST /login`` pelo cliente WSGI
+durante ``--seconds`` segundos e, em paralelo, uma thread medindo a latência
+de uma página barata (``GET /login``). Use para dimensionar
+``PASSWORD_POOL_SIZE``/``PASSWORD_HASH_ITERATIONS`` contra a meta de latência.
+
+Uso:
+    python scripts/bench_login.py --pool-sizes 0 2 4 --concurrency 16 --seconds 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run import create_app  # noqa: E402
+from backend import passwords  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.models import User  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(pool_size, args):
+    tmpdir = tempfile.mkdtemp(prefix='bench_login_')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        'SMS_WORKER': 'off',
+        'PASSWORD_POOL_SIZE': pool_size,
+        'PASSWORD_HASH_ITERATIONS': args.iterations,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(username='tutor', role='user')
+        user.set_password('segredo')
+        db.session.add(user)
+        db.session.commit()
+
+    stop = threading.Event()
+    login_latencies, page_latencies = [], []
+    lock = threading.Lock()
+
+    def login_worker():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/login', data={'username': 'tutor', 'password': 'segredo'})
+            elapsed = time.perf_counter() - started
+            client.get('/logout')
+            if response.status_code == 302:
+                with lock:
+                    login_latencies.append(elapsed)
+
+    def page_worker():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/login')
+            with lock:
+                page_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_worker) for _ in range(args.concurrency)]
+    threads.append(threading.Thread(target=page_worker))
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    with app.app_context():
+        passwords.shutdown()
+        db.engine.dispose()
+
+    return {
+        'logins_per_s': len(login_latencies) / elapsed,
+        'login_p50': percentile(login_latencies, 50) * 1000,
+        'login_p99': percentile(login_latencies, 99) * 1000,
+        'page_p50': percentile(page_latencies, 50) * 1000,
+        'page_p99': percentile(page_latencies, 99) * 1000,
+        'page_mean': statistics.fmean(page_latencies) * 1000 if page_latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[0, os.cpu_count() or 2])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--iterations', type=int, default=passwords.DEFAULT_ITERATIONS)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'{args.concurrency} logins concorrentes, {args.iterations} iterações pbkdf2, {args.seconds}s')
+    print(f'{"pool":>5}{"logins/s":>10}{"login p50":>11}{"login p99":>11}{"página p50":>12}{"página p99":>12}')
+    for size in args.pool_sizes:
+        r = run(size, args)
+        print(f'{size:>5}{r["logins_per_s"]:>10.1f}{r["login_p50"]:>9.0f}ms{r["login_p99"]:>9.0f}ms'
+              f'{r["page_p50"]:>10.1f}ms{r["page_p99"]:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
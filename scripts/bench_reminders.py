@@ -0,0 +1,121 @@
+"""Benchmark do job de lembretes de agendamento.
+
+Gera um banco com ``--appointments`` animais agendados nas próximas horas
+(mais ``--others`` fora da janela) e mede:
+
+1. uma execução interrompida no meio (falha simulada no lote ``--crash-at``);
+2. a execução seguinte, que retoma sem reenviar;
+3. uma terceira execução, que não deve enfileirar nada.
+
+No fim confere se cada agendamento tem exatamente uma marca e se a outbox
+tem exatamente um SMS por tutor/telefone.
+
+Uso:
+    python scripts/bench_reminders.py --appointments 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.migrations import upgrade  # noqa: E402
+from backend import reminders  # noqa: E402
+
+
+def build_database(path, appointments, others, clinics=50):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        db.create_all()
+        upgrade(db.engine)
+        db.engine.dispose()
+
+    rnd = random.Random(7)
+    tutors = max(1, appointments // 2)
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany(
+        "INSERT INTO user (id, username, contato, password_hash, role) VALUES (?, ?, ?, 'x', 'user')",
+        ((i, f'tutor{i}', f'55{i:09d}' if rnd.random() < 0.95 else None) for i in range(1, tutors + 1)))
+    conn.executemany('INSERT INTO clinic (id, nome) VALUES (?, ?)',
+                     ((i, f'Clínica {i}') for i in range(1, clinics + 1)))
+
+    def animals():
+        for i in range(1, appointments + others + 1):
+            if i <= appointments:
+                when = now + timedelta(minutes=rnd.randint(5, 20 * 60))
+            else:
+                when = now + timedelta(days=rnd.randint(2, 60), minutes=rnd.randint(0, 600))
+            yield (i, f'pet{i}', 'cão', rnd.randint(1, tutors), rnd.randint(1, clinics),
+                   str(when.replace(microsecond=0)), 'Agendado', 0)
+
+    conn.executemany(
+        'INSERT INTO animal (id, nome, especie, dono_id, clinic_id, data_agendamento, status, token_validated) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', animals())
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--appointments', type=int, default=100000)
+    parser.add_argument('--others', type=int, default=400000, help='Agendamentos fora da janela.')
+    parser.add_argument('--batch-size', type=int, default=reminders.DEFAULT_BATCH_SIZE)
+    parser.add_argument('--crash-at', type=int, default=10, help='Lote em que a 1ª execução falha.')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_reminders_'), 'bench.db')
+    started = time.perf_counter()
+    build_database(path, args.appointments, args.others)
+    print(f'banco gerado em {time.perf_counter() - started:.1f}s')
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        # 1) falha simulada no meio de um lote (depois das marcas, antes do commit)
+        original, calls = reminders.send_sms_batch, []
+
+        def crashing(messages):
+            calls.append(1)
+            if len(calls) == args.crash_at:
+                raise RuntimeError('falha simulada')
+            return original(messages)
+
+        reminders.send_sms_batch = crashing
+        started = time.perf_counter()
+        try:
+            reminders.send_reminders(24, batch_size=args.batch_size)
+        except RuntimeError:
+            db.session.rollback()
+        reminders.send_sms_batch = original
+        marked = db.session.scalar(db.text('SELECT count(*) FROM appointment_reminder'))
+        print(f'1ª execução (falha no lote {args.crash_at}): {marked} marcados em '
+              f'{time.perf_counter() - started:.2f}s')
+
+        # 2) retomada e 3) execução sem pendências
+        for label in ('2ª execução (retomada)', '3ª execução'):
+            result = reminders.send_reminders(24, batch_size=args.batch_size)
+            print(f'{label}: {result.summary()} '
+                  f'({result.appointments / result.elapsed if result.elapsed else 0:.0f} agendamentos/s)')
+
+        marks = db.session.scalar(db.text('SELECT count(*) FROM appointment_reminder'))
+        duplicated = db.session.scalar(db.text(
+            'SELECT count(*) FROM (SELECT phone FROM sms_outbox GROUP BY phone HAVING count(*) > 1)'))
+        expected = db.session.scalar(db.text(
+            "SELECT count(DISTINCT a.dono_id) FROM animal a JOIN user u ON u.id = a.dono_id "
+            "WHERE a.id <= :n AND u.contato IS NOT NULL"), {'n': args.appointments})
+        sms = db.session.scalar(db.text('SELECT count(*) FROM sms_outbox'))
+        print(f'marcas: {marks}/{args.appointments}; SMS na outbox: {sms} (tutores com telefone: {expected}); '
+              f'telefones com SMS duplicado: {duplicated}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark da busca textual: FTS5 (bm25) contra varredura com LIKE.
+
+Gera (ou reaproveita) um banco SQLite com ``--rows`` animais com nomes,
+raças e tutores variados, aplica as migrações (que criam e populam os
+índices FTS5) e mede a latência de ``search_animals`` para um conjunto de
+buscas, como admin (sem escopo), clínica e tutor, mostrando p50/p99 em
+milissegundos.
+
+Uso:
+    python scripts/bench_search.py --rows 1000000
+    python scripts/bench_search.py --db /tmp/busca.db --repeat 20
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.migrations import upgrade  # noqa: E402
+from backend.models import Animal  # noqa: E402
+from backend.search import search_animals  # noqa: E402
+
+NOMES = ['Rex', 'Thor', 'Luna', 'Mel', 'Bob', 'Nina', 'Fred', 'Lola', 'Toby', 'Amora', 'Pipoca',
+         'Max', 'Bidu', 'Frida', 'Zeus', 'Jade', 'Simba', 'Belinha', 'Pandora', 'Floquinho']
+ESPECIES = {'cão': ['labrador', 'poodle', 'vira-lata', 'pinscher', 'golden', 'shih-tzu'],
+            'gato': ['siamês', 'persa', 'sem raça', 'maine coon'],
+            'coelho': ['mini lop', 'angorá']}
+PROCEDIMENTOS = ['castração', 'consulta', 'vacina', 'cirurgia']
+SOBRENOMES = ['silva', 'santos', 'oliveira', 'souza', 'lima', 'pereira', 'costa', 'almeida']
+
+# termos comuns, prefixos, sem acento, várias palavras e um sem resultado (pior caso do LIKE)
+QUERIES = ['rex', 'luna gato', 'castracao', 'poodle', 'pand', 'silva', 'Clínica 17', 'floquinho coelho',
+           'zorro']
+
+
+def build_database(path, rows, tutors=None, clinics=50):
+    tutors = tutors or max(1, rows // 3)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany(
+        "INSERT INTO user (id, username, email, contato, password_hash, role) VALUES (?, ?, ?, ?, 'x', 'user')",
+        ((i, f'{rnd.choice(SOBRENOMES)}{i}', f'tutor{i}@example.com', f'55{i:09d}') for i in range(1, tutors + 1)))
+    conn.executemany(
+        'INSERT INTO clinic (id, nome, endereco) VALUES (?, ?, ?)',
+        ((i, f'Clínica {i}', f'Rua {rnd.choice(SOBRENOMES).title()}, {i}') for i in range(1, clinics + 1)))
+
+    def animals():
+        for i in range(1, rows + 1):
+            especie = rnd.choice(list(ESPECIES))
+            clinic_id = rnd.randint(1, clinics) if rnd.random() < 0.6 else None
+            yield (i, rnd.choice(NOMES), especie, rnd.choice(ESPECIES[especie]), rnd.randint(0, 15),
+                   rnd.choice(PROCEDIMENTOS), rnd.randint(1, tutors), clinic_id,
+                   'Agendado' if clinic_id else 'Aguardando', 0)
+
+    conn.executemany(
+        'INSERT INTO animal (id, nome, especie, raca, idade, procedimento, dono_id, clinic_id, '
+        'status, token_validated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        animals())
+    conn.commit()
+    conn.close()
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def measure(query, criteria, narrow, use_fts, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        search_animals(query, criteria, per_page=25, use_fts=use_fts, narrow_scope=narrow)
+        samples.append((time.perf_counter() - started) * 1000)
+        db.session.rollback()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=10, help='Execuções por busca.')
+    parser.add_argument('--db', default=None, help='Reaproveita/gera o banco neste caminho.')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='bench_search_'), f'bench_{args.rows}.db')
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        build_database(path, args.rows)
+        print(f'banco gerado em {time.perf_counter() - started:.1f}s')
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        started = time.perf_counter()
+        if upgrade(db.engine):
+            print(f'migrações/índice FTS5 em {time.perf_counter() - started:.1f}s')
+        total = db.session.query(db.func.count(Animal.id)).scalar()
+        print(f'{total} animais\n')
+
+        scopes = [('admin', [], False), ('clínica', [Animal.clinic_id == 17], False),
+                  ('tutor', [Animal.dono_id == 7], True)]
+        print(f'{"busca":<20}{"escopo":<9}{"FTS p50":>10}{"FTS p99":>10}{"LIKE p50":>11}{"LIKE p99":>11}')
+        fts_all, like_all = [], []
+        for query in QUERIES:
+            for scope, criteria, narrow in scopes:
+                fts = measure(query, criteria, narrow, True, args.repeat)
+                like = measure(query, criteria, narrow, False, max(1, args.repeat // 5))
+                fts_all += fts
+                like_all += like
+                print(f'{query:<20}{scope:<9}{percentile(fts, 50):>8.1f}ms{percentile(fts, 99):>8.1f}ms'
+                      f'{percentile(like, 50):>9.1f}ms{percentile(like, 99):>9.1f}ms')
+        print(f'\n{"todas":<29}{percentile(fts_all, 50):>8.1f}ms{percentile(fts_all, 99):>8.1f}ms'
+              f'{percentile(like_all, 50):>9.1f}ms{percentile(like_all, 99):>9.1f}ms'
+              f'  (p99 LIKE/FTS: {percentile(like_all, 99) / percentile(fts_all, 99):.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
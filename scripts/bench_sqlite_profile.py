@@ -0,0 +1,113 @@
+"""Benchmark de leitura/escrita concorrente por perfil SQLite.
+
+Para cada perfil (``default`` e ``tuned``) cria um banco temporário com
+``--animals`` animais e roda ``--writers`` threads atualizando animais
+(como ``claim``/``schedule``) e ``--readers`` threads lendo páginas da
+listagem durante ``--seconds`` segundos. Mostra operações por segundo e
+quantas escritas falharam com "database is locked".
+
+Uso:
+    python scripts/bench_sqlite_profile.py --animals 20000 --seconds 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+
+
+def seed(app, animals):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text(
+            "INSERT INTO user (id, username, password_hash, role) VALUES (1, 'tutor', 'x', 'user')"))
+        db.session.execute(
+            text("INSERT INTO animal (nome, especie, procedimento, dono_id, status, token_validated) "
+                 "VALUES (:nome, 'cao', 'vacina', 1, 'Aguardando', 0)"),
+            [{'nome': f'animal{i}'} for i in range(animals)]
+        )
+        db.session.commit()
+
+
+def run_profile(profile, args):
+    tmpdir = tempfile.mkdtemp(prefix='bench_sqlite_')
+    uri = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'SQLITE_PROFILE': profile, 'SMS_WORKER': 'off'})
+    seed(app, args.animals)
+
+    stop = threading.Event()
+    counters = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counters[key] += 1
+
+    def writer():
+        with app.app_context():
+            while not stop.is_set():
+                animal_id = random.randint(1, args.animals)
+                try:
+                    db.session.execute(
+                        text("UPDATE animal SET status='Agendado', verification_token=:t WHERE id=:id"),
+                        {'t': f'{random.randint(0, 999999):06d}', 'id': animal_id})
+                    db.session.commit()
+                    bump('writes')
+                except OperationalError:
+                    db.session.rollback()
+                    bump('locked')
+
+    def reader():
+        with app.app_context():
+            while not stop.is_set():
+                cursor = random.randint(1, args.animals)
+                db.session.execute(
+                    text('SELECT * FROM animal WHERE id < :c ORDER BY id DESC LIMIT 26'),
+                    {'c': cursor}).fetchall()
+                db.session.commit()
+                bump('reads')
+
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        db.engine.dispose()
+    return {key: value / elapsed for key, value in counters.items()}, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--animals', type=int, default=20000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--profiles', nargs='+', default=['default', 'tuned'])
+    args = parser.parse_args()
+
+    print(f'{args.animals} animais, {args.writers} escritores, {args.readers} leitores, {args.seconds}s')
+    print(f'{"perfil":<10}{"leituras/s":>12}{"escritas/s":>12}{"locked":>10}')
+    for profile in args.profiles:
+        rates, totals = run_profile(profile, args)
+        print(f'{profile:<10}{rates["reads"]:>12.0f}{rates["writes"]:>12.0f}{totals["locked"]:>10}')
+
+
+if __name__ == '__main__':
+    main()
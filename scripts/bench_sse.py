@@ -0,0 +1,152 @@
+"""Benchmark de assinantes SSE simultâneos em um único worker.
+
+Sobe a aplicação num servidor WSGI com threads (uma por conexão, como o
+gunicorn com ``--worker-class gthread``), abre ``--subscribers`` conexões em
+``/events/clinic`` com uma sessão de clínica e publica ``--events`` eventos
+no broker. Mostra o tempo para conectar todos, a latência de entrega
+(publicação -> recebido pelo cliente, p50/p99), memória e threads do
+processo e quantas consultas ao banco foram feitas com as conexões ociosas
+(deve ser 0).
+
+Uso:
+    python scripts/bench_sse.py --subscribers 1000 --events 50
+    python scripts/bench_sse.py --broker socket   # passando pelo relay local
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import selectors
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.serving import make_server  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.events import get_broker, serve_relay  # noqa: E402
+from backend.models import Clinic, User  # noqa: E402
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def setup_app(args, tmp):
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}',
+              'SMS_WORKER': 'off', 'EVENTS_BROKER': args.broker,
+              'EVENTS_SOCKET': os.path.join(tmp, 'events.sock')}
+    if args.broker == 'socket':
+        ready = threading.Event()
+        threading.Thread(target=serve_relay, args=(config['EVENTS_SOCKET'], ready), daemon=True).start()
+        ready.wait()
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        user = User(username='clinica', password_hash='x', role='clinic')
+        db.session.add(user)
+        db.session.flush()
+        clinic = Clinic(nome='Clínica', user_id=user.id)
+        db.session.add(clinic)
+        db.session.commit()
+        user_id, clinic_id = user.id, clinic.id
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['role'] = 'clinic'
+    return app, client.get_cookie('session').value, clinic_id
+
+
+def run_clients(port, cookie, subscribers, events, conn):
+    """Processo separado (sem disputar o GIL com o servidor) que abre as conexões e lê os eventos."""
+    selector = selectors.DefaultSelector()
+    request = (f'GET /events/clinic HTTP/1.1\r\nHost: localhost\r\n'
+               f'Cookie: session={cookie}\r\n\r\n').encode()
+    for _ in range(subscribers):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.sendall(request)
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+    conn.send('conectados')
+
+    latencies = []
+    expected = subscribers * events
+    deadline = time.time() + 60
+    while len(latencies) < expected and time.time() < deadline:
+        for key, _ in selector.select(timeout=1):
+            data = key.fileobj.recv(65536)
+            now = time.time()
+            for line in data.split(b'\n'):
+                if line.startswith(b'data:') and b'"bench"' in line:
+                    latencies.append((now - json.loads(line[5:])['at']) * 1000)
+    conn.send(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, default=500)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.1, help='Segundos entre eventos.')
+    parser.add_argument('--idle', type=float, default=3.0, help='Segundos ociosos medindo consultas.')
+    parser.add_argument('--broker', choices=['local', 'socket'], default='local')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_sse_')
+    app, cookie, clinic_id = setup_app(args, tmp)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.socket.listen(args.subscribers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rss_before, threads_before = rss_mb(), threading.active_count()
+
+    parent, child = multiprocessing.Pipe()
+    clients = multiprocessing.Process(
+        target=run_clients, args=(server.server_port, cookie, args.subscribers, args.events, child))
+    started = time.perf_counter()
+    clients.start()
+    parent.recv()
+    broker = get_broker(app)
+    while broker.subscriber_count() < args.subscribers:
+        time.sleep(0.05)
+    connect_time = time.perf_counter() - started
+
+    queries = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(a[2]))
+    time.sleep(args.idle)
+    idle_queries = len(queries)
+
+    for i in range(args.events):
+        broker.publish([f'clinic:{clinic_id}'], {'type': 'bench', 'seq': i, 'at': time.time()})
+        time.sleep(args.interval)
+    latencies = parent.recv()
+    expected = args.subscribers * args.events
+
+    print(f'broker: {args.broker}')
+    print(f'assinantes: {args.subscribers} conectados em {connect_time:.2f}s')
+    print(f'memória: {rss_before:.0f}MB -> {rss_mb():.0f}MB '
+          f'({(rss_mb() - rss_before) * 1024 / args.subscribers:.0f}KB por conexão); '
+          f'threads: {threads_before} -> {threading.active_count()}')
+    print(f'consultas ao banco em {args.idle:.0f}s ociosos: {idle_queries}')
+    print(f'entregas: {len(latencies)}/{expected}  latência p50 {percentile(latencies, 50):.1f}ms '
+          f'p99 {percentile(latencies, 99):.1f}ms  máx {max(latencies, default=0):.1f}ms')
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
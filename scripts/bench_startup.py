@@ -0,0 +1,138 @@
+"""Benchmark do tempo de inicialização: import, ``create_app`` e primeira requisição.
+
+Cada rodada é um processo Python novo (nada em cache no interpretador) que
+mede, nesta ordem:
+
+- ``import``: ``import run`` (Flask, SQLAlchemy, modelos e blueprints);
+- ``factory``: ``create_app()`` (rotas, extensões e, com ``--warmup``, o
+  aquecimento de templates e pool);
+- ``first``: a primeira requisição (``GET /`` como admin por padrão; é a
+  que compila templates, abre a conexão e configura os mappers);
+- ``second``: a mesma requisição de novo, já no regime normal;
+
+além do tempo total do processo visto de fora (``process``, inclui subir o
+interpretador). Os valores são medianas de ``--runs`` rodadas. O banco é
+gerado por ``tests/datagen.py`` (ou ``--db``) e já vem migrado, como em
+produção depois de ``python run.py init-db``.
+
+Os resultados são anexados a ``--results`` (JSON por linha) com o commit
+atual; ``--history`` mostra as execuções anteriores.
+
+Uso:
+    python scripts/bench_startup.py --runs 10
+    python scripts/bench_startup.py --runs 10 --warmup
+    python scripts/bench_startup.py --history
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_RESULTS = os.path.join(ROOT, 'instance', 'startup.jsonl')
+PHASES = ('import', 'factory', 'first', 'second', 'process')
+
+
+def child(args):
+    """Roda dentro do processo medido; imprime os tempos (ms) em JSON."""
+    t0 = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from run import create_app
+    t1 = time.perf_counter()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{args.db}', 'SMS_WORKER': 'off',
+                      'REMINDER_WORKER': 'off', 'WARMUP': args.warmup})
+    t2 = time.perf_counter()
+    client = app.test_client()
+    if args.role != 'anon':
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = args.role
+    t3 = time.perf_counter()
+    status = client.get(args.path).status_code
+    t4 = time.perf_counter()
+    client.get(args.path)
+    t5 = time.perf_counter()
+    print(json.dumps({'import': (t1 - t0) * 1000, 'factory': (t2 - t1) * 1000, 'first': (t4 - t3) * 1000,
+                      'second': (t5 - t4) * 1000, 'status': status}))
+
+
+def measure(args):
+    command = [sys.executable, os.path.abspath(__file__), '--child', '--db', args.db, '--path', args.path,
+               '--role', args.role] + (['--warmup'] if args.warmup else [])
+    env = dict(os.environ, SMS_WORKER='off', REMINDER_WORKER='off')
+    started = time.perf_counter()
+    output = subprocess.run(command, capture_output=True, text=True, env=env, check=True).stdout
+    elapsed = (time.perf_counter() - started) * 1000
+    sample = json.loads(output.strip().splitlines()[-1])
+    if sample.pop('status') >= 400:
+        raise RuntimeError(f'{args.path} respondeu com erro na rodada medida')
+    sample['process'] = elapsed
+    return sample
+
+
+def git_commit():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from loadtest import git_commit as commit
+    return commit()
+
+
+def history(path, last):
+    if not os.path.exists(path):
+        print(f'sem resultados em {path}')
+        return
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()][-last:]
+    for row in rows:
+        phases = '  '.join(f'{phase} {row[phase]:>7.1f}' for phase in PHASES)
+        print(f"{row['date']}  {row['commit']:<20} {'warmup' if row['warmup'] else '      '}  {phases}  (ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warmup', action='store_true', help='Liga WARMUP na aplicação medida.')
+    parser.add_argument('--db', help='Banco gerado por tests/datagen.py (senão um pequeno é gerado).')
+    parser.add_argument('--path', default='/', help='Rota da primeira requisição.')
+    parser.add_argument('--role', default='admin', choices=['admin', 'anon'])
+    parser.add_argument('--results', default=DEFAULT_RESULTS)
+    parser.add_argument('--history', nargs='?', const=20, type=int, metavar='N',
+                        help='Mostra as últimas N execuções e sai.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+    if args.history:
+        history(args.results, args.history)
+        return
+
+    if not args.db:
+        sys.path.insert(0, ROOT)
+        from tests.datagen import generate
+        args.db = os.path.join(tempfile.mkdtemp(prefix='bench_startup_'), 'vet.db')
+        generate(args.db, users=200, clinics=10, animals=5000)
+
+    # primeira rodada descartada: cache de disco do .pyc e do banco
+    measure(args)
+    samples = [measure(args) for _ in range(args.runs)]
+    medians = {phase: round(statistics.median(s[phase] for s in samples), 1) for phase in PHASES}
+    print(f"{args.runs} rodadas, GET {args.path} como {args.role}{' com WARMUP' if args.warmup else ''} "
+          f"(medianas, ms):")
+    for phase in PHASES:
+        print(f'  {phase:<8} {medians[phase]:>8.1f}')
+
+    os.makedirs(os.path.dirname(args.results), exist_ok=True)
+    row = {'commit': git_commit(), 'date': datetime.now().isoformat(timespec='seconds'), 'warmup': args.warmup,
+           'path': args.path, 'runs': args.runs, **medians}
+    with open(args.results, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""Teste de carga das páginas principais (``/``, ``/animals``, ``/login``, ``/clinics``).
+
+Gera um banco sintético (``tests/datagen.py``) ou usa ``--db``, dispara
+``--requests`` requisições por rota com ``--concurrency`` threads e mostra
+p50/p99 de latência e vazão. Dois modos:
+
+- ``wsgi``: chama a aplicação no próprio processo (``test_client``), sem
+  rede; mede só o código da aplicação;
+- ``http``: sobe a aplicação num servidor WSGI com threads em outro
+  processo e faz as requisições por HTTP local. Com ``--url`` usa um
+  servidor já rodando (gunicorn etc.) sobre o mesmo banco.
+
+Cada execução é anexada a ``--results`` (JSON por linha) com o commit
+atual. ``--history`` compara as execuções anteriores por rota.
+
+Uso:
+    python scripts/loadtest.py --animals 100000 --concurrency 8 --requests 500
+    python scripts/loadtest.py --mode http --db /tmp/vet.db
+    python scripts/loadtest.py --history
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from run import create_app  # noqa: E402
+from tests.datagen import ADMIN_USERNAME, PASSWORD, Dataset, generate  # noqa: E402
+
+DEFAULT_RESULTS = os.path.join(ROOT, 'instance', 'loadtest.jsonl')
+
+# (rota, método, papel): o papel define a sessão usada ('anon' = sem cookie)
+SCENARIOS = [
+    ('/', 'GET', 'clinic'),
+    ('/animals', 'GET', 'admin'),
+    ('/login', 'POST', 'anon'),
+    ('/clinics', 'GET', 'admin'),
+]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+    return commit + ('-modificado' if dirty else '')
+
+
+def app_config(args, path):
+    return {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off', 'REMINDER_WORKER': 'off',
+            'PASSWORD_HASH_ITERATIONS': args.iterations}
+
+
+class RouteResult:
+    def __init__(self, path, method, role):
+        self.path = path
+        self.method = method
+        self.role = role
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def requests(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {'route': f'{self.method} {self.path}', 'role': self.role, 'requests': self.requests,
+                'errors': self.errors, 'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+                'p99_ms': round(percentile(self.latencies, 99) * 1000, 2), 'rps': round(self.throughput, 1)}
+
+    def summary(self):
+        d = self.as_dict()
+        return (f"{d['route']:<16} {d['role']:<7} {d['requests']:>6} req  {d['errors']:>4} erros  "
+                f"p50 {d['p50_ms']:>8.1f}ms  p99 {d['p99_ms']:>8.1f}ms  {d['rps']:>8.1f} req/s")
+
+
+# --- modo wsgi ----------------------------------------------------------------
+
+class WsgiSender:
+    """Um ``test_client`` por thread; as sessões são gravadas direto no cookie."""
+
+    def __init__(self, app, dataset):
+        self.app = app
+        self.sessions = {'admin': (1, 'admin'), 'clinic': (dataset.clinic_user_id(1), 'clinic'),
+                         'user': (dataset.tutor_id(1), 'user')}
+        self.local = threading.local()
+
+    def _client(self, role):
+        clients = self.local.__dict__.setdefault('clients', {})
+        if role not in clients:
+            client = self.app.test_client(use_cookies=role != 'anon')
+            if role != 'anon':
+                user_id, session_role = self.sessions[role]
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user_id
+                    sess['role'] = session_role
+            clients[role] = client
+        return clients[role]
+
+    def send(self, method, path, role, data=None):
+        response = self._client(role).open(path, method=method, data=data)
+        response.get_data()
+        return response.status_code
+
+
+# --- modo http ----------------------------------------------------------------
+
+def serve(config, port_queue, threads):
+    from werkzeug.serving import make_server
+    from backend import passwords
+
+    def stop(signum, frame):
+        # encerra os processos do pool de hash junto; eles não percebem a
+        # saída do pai e segurariam o terminal
+        passwords.shutdown()
+        for child in multiprocessing.active_children():
+            child.kill()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    app = create_app(config)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server.socket.listen(threads * 4)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+class HttpSender:
+    """Conexão keep-alive por thread; as sessões vêm de logins reais por HTTP."""
+
+    def __init__(self, url, dataset):
+        parsed = urllib.parse.urlsplit(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.local = threading.local()
+        self.cookies = {
+            'admin': self._login(ADMIN_USERNAME),
+            'clinic': self._login(dataset.clinic_username(1)),
+            'user': self._login(dataset.tutor_username(1)),
+        }
+
+    def _connection(self):
+        if getattr(self.local, 'conn', None) is None:
+            self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        return self.local.conn
+
+    def _login(self, username):
+        status, headers = self._request('POST', '/login', None, {'username': username, 'password': PASSWORD})
+        cookie = headers.get('Set-Cookie', '').split(';')[0]
+        if status != 302 or not cookie:
+            raise RuntimeError(f'login de {username} falhou ({status})')
+        return cookie
+
+    def _request(self, method, path, cookie, data=None):
+        headers = {'Cookie': cookie} if cookie else {}
+        body = None
+        if data is not None:
+            body = urllib.parse.urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.local.conn = None
+            raise
+        return response.status, response.headers
+
+    def send(self, method, path, role, data=None):
+        return self._request(method, path, self.cookies.get(role), data)[0]
+
+
+# --- execução -----------------------------------------------------------------
+
+def run_route(sender, path, method, role, requests, concurrency, dataset):
+    result = RouteResult(path, method, role)
+    data = {'username': dataset.tutor_username(1), 'password': PASSWORD} if method == 'POST' else None
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        latencies, errors = [], 0
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+            started = time.perf_counter()
+            try:
+                status = sender.send(method, path, role, data)
+            except Exception:
+                status = 599
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        with lock:
+            result.latencies.extend(latencies)
+            result.errors += errors
+
+    # aquecimento: caches do processo e do SQLite
+    for _ in range(min(5, requests)):
+        sender.send(method, path, role, data)
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run(args, dataset):
+    """Roda os cenários e retorna a lista de :class:`RouteResult`."""
+    server = None
+    if args.mode == 'wsgi':
+        sender = WsgiSender(create_app(app_config(args, dataset.path)), dataset)
+    else:
+        url = args.url
+        if url is None:
+            ports = multiprocessing.Queue()
+            # não daemon: o servidor abre o pool de processos do hash de senhas
+            server = multiprocessing.Process(target=serve, args=(app_config(args, dataset.path), ports,
+                                                                 args.concurrency))
+            server.start()
+            url = f'http://127.0.0.1:{ports.get(timeout=60)}'
+        sender = HttpSender(url, dataset)
+    try:
+        scenarios = [s for s in SCENARIOS if not args.routes or s[0] in args.routes]
+        return [run_route(sender, path, method, role, args.requests, args.concurrency, dataset)
+                for path, method, role in scenarios]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join(10)
+
+
+def save(path, args, dataset, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    base = {'commit': git_commit(), 'date': datetime.now().isoformat(timespec='seconds'), 'mode': args.mode,
+            'concurrency': args.concurrency, 'animals': dataset.animals, 'iterations': args.iterations}
+    with open(path, 'a', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps({**base, **result.as_dict()}, ensure_ascii=False) + '\n')
+
+
+def history(path, last):
+    if not os.path.exists(path):
+        print(f'sem resultados em {path}')
+        return
+    with open(path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    by_route = {}
+    for row in rows:
+        by_route.setdefault(row['route'], []).append(row)
+    for route, runs in by_route.items():
+        print(route)
+        for row in runs[-last:]:
+            print(f"  {row['date']}  {row['commit']:<20} {row['mode']:<5} c={row['concurrency']:<3} "
+                  f"{row['animals']:>9} animais  p50 {row['p50_ms']:>8.1f}ms  p99 {row['p99_ms']:>8.1f}ms  "
+                  f"{row['rps']:>8.1f} req/s  erros {row['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['wsgi', 'http'], default='wsgi')
+    parser.add_argument('--url', help='Servidor já rodando (modo http), ex.: http://127.0.0.1:8000')
+    parser.add_argument('--db', help='Banco gerado por tests/datagen.py (senão um novo é gerado).')
+    parser.add_argument('--users', type=int, default=5000, help='Tamanho do banco gerado (sem --db).')
+    parser.add_argument('--clinics', type=int, default=50)
+    parser.add_argument('--animals', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=300, help='Requisições por rota.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--routes', nargs='*', help='Só estas rotas (ex.: / /animals).')
+    parser.add_argument('--iterations', type=int, default=600000,
+                        help='Custo do PBKDF2 (define o custo de POST /login).')
+    parser.add_argument('--results', default=DEFAULT_RESULTS)
+    parser.add_argument('--history', nargs='?', const=10, type=int, metavar='N',
+                        help='Mostra as últimas N execuções por rota e sai.')
+    args = parser.parse_args()
+
+    if args.history:
+        history(args.results, args.history)
+        return
+
+    if args.db:
+        dataset = Dataset.open(args.db)
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix='loadtest_'), 'vet.db')
+        dataset = generate(path, args.users, args.clinics, args.animals,
+                           app=create_app(app_config(args, path)))
+        print(f'banco gerado: {dataset.summary()}')
+
+    results = run(args, dataset)
+    print(f'modo {args.mode}, {args.concurrency} threads, commit {git_commit()}')
+    for result in results:
+        print(result.summary())
+    save(args.results, args, dataset, results)
+
+
+if __name__ == '__main__':
+    main()
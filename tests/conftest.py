@@ -0,0 +1,85 @@
+"""Fixtures: um banco sintético gerado uma vez por sessão e copiado a cada teste."""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from run import create_app  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from tests.datagen import generate  # noqa: E402
+
+TEST_CONFIG = {
+    'SMS_WORKER': 'off',
+    'REMINDER_WORKER': 'off',
+    # hash barato: os testes medem consultas, não o custo do PBKDF2
+    'PASSWORD_HASH_ITERATIONS': 1000,
+    'PASSWORD_POOL_SIZE': 0,
+    'IDENTITY_CACHE_TTL': 0,
+    # nada gravado em instance/ pelos testes
+    'JINJA_BYTECODE_CACHE': '',
+}
+
+# tamanho do banco dos testes; TEST_ANIMALS=1000000 roda a suíte num banco grande
+USERS = int(os.environ.get('TEST_USERS', 50))
+CLINICS = int(os.environ.get('TEST_CLINICS', 5))
+ANIMALS = int(os.environ.get('TEST_ANIMALS', 600))
+
+
+def make_app(path, **config):
+    return create_app({**TEST_CONFIG, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', **config})
+
+
+@pytest.fixture(scope='session')
+def dataset(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('dataset') / 'base.db')
+    return generate(path, USERS, CLINICS, ANIMALS, app=make_app(path))
+
+
+@pytest.fixture
+def app(dataset, tmp_path):
+    """Aplicação sobre uma cópia do banco sintético (cada teste pode escrever à vontade)."""
+    path = str(tmp_path / 'test.db')
+    source, target = sqlite3.connect(dataset.path), sqlite3.connect(path)
+    source.backup(target)
+    source.close()
+    target.close()
+    app = make_app(path)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(app):
+    """``login(user_id, role)`` -> cliente com a sessão já autenticada."""
+    def _login(user_id, role):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['role'] = role
+        return client
+    return _login
+
+
+@pytest.fixture
+def admin_client(login):
+    return login(1, 'admin')
+
+
+@pytest.fixture
+def clinic_client(login, dataset):
+    return login(dataset.clinic_user_id(1), 'clinic')
+
+
+@pytest.fixture
+def tutor_client(login, dataset):
+    return login(dataset.tutor_id(1), 'user')
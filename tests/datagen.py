@@ -0,0 +1,209 @@
+"""Gerador de dados sintéticos para testes e benchmarks.
+
+Cria um banco SQLite novo com ``users`` tutores, ``clinics`` clínicas (cada
+uma com seu usuário ``clinic``), um ``admin`` e ``animals`` animais
+distribuídos entre os status. As linhas entram por ``executemany`` direto no
+``sqlite3``, com milhões de linhas em segundos. Em seguida as migrações
+montam os contadores, a busca FTS5 e as versões, como num banco existente
+que é atualizado.
+
+Todos os usuários têm a senha ``PASSWORD``. O hash é calculado uma vez, com o
+custo configurado na aplicação, e reaproveitado em todos os usuários.
+
+Uso:
+    python -m tests.datagen /tmp/vet.db --users 100000 --clinics 200 --animals 1000000
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.extensions import db  # noqa: E402
+from backend.migrations import upgrade  # noqa: E402
+from backend.passwords import hash_password  # noqa: E402
+
+PASSWORD = 'senha123'
+ADMIN_USERNAME = 'admin'
+PROCEDIMENTOS = ('castração', 'consulta', 'vacina', 'cirurgia')
+ESPECIES = ('cão', 'gato', 'ave', 'coelho')
+# fração de cada status (o restante fica Aguardando sem clínica)
+STATUS_WEIGHTS = (('Aguardando', 0.35), ('Agendado', 0.35), ('Concluído', 0.3))
+BATCH = 50000
+# vagas de 30 min entre 08:00 e 18:00
+SLOTS_PER_DAY = 20
+
+
+class Dataset:
+    """Tamanhos e ids gerados (para montar requisições nos testes e no load test)."""
+
+    def __init__(self, path, users, clinics, animals):
+        self.path = path
+        self.users = users
+        self.clinics = clinics
+        self.animals = animals
+        self.elapsed = 0.0
+
+    @classmethod
+    def open(cls, path):
+        """Dataset de um banco já gerado (tamanhos lidos do próprio banco)."""
+        conn = sqlite3.connect(path)
+        try:
+            users, clinics, animals = conn.execute(
+                "SELECT (SELECT count(*) FROM user WHERE role = 'user'), (SELECT count(*) FROM clinic), "
+                "(SELECT count(*) FROM animal)"
+            ).fetchone()
+        finally:
+            conn.close()
+        return cls(path, users, clinics, animals)
+
+    @property
+    def uri(self):
+        return f'sqlite:///{self.path}'
+
+    def tutor_username(self, i=1):
+        return f'tutor{i}'
+
+    def clinic_username(self, i=1):
+        return f'clinica{i}'
+
+    def tutor_id(self, i=1):
+        # o admin é o id 1; tutores vêm logo depois
+        return 1 + i
+
+    def clinic_user_id(self, i=1):
+        return 1 + self.users + i
+
+    def summary(self):
+        return (f'{self.users} tutores, {self.clinics} clínicas, {self.animals} animais '
+                f'em {self.elapsed:.1f}s ({self.path})')
+
+
+def _batches(rows, size=BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _business_days(start, count):
+    days, day = [], start
+    while len(days) < count:
+        day += timedelta(days=1)
+        if day.weekday() < 5:
+            days.append(day)
+    return days
+
+
+def _animals(rnd, users, clinics, animals, now):
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    # agendamentos em vagas de 30 min do expediente padrão (08:00-18:00,
+    # segunda a sexta), sem sobreposição na clínica e ocupando cerca de metade
+    # das vagas do período
+    per_clinic = animals * dict(STATUS_WEIGHTS)['Agendado'] / max(clinics, 1)
+    days = _business_days(now.replace(hour=8, minute=0, second=0, microsecond=0),
+                          max(40, math.ceil(2 * per_clinic / SLOTS_PER_DAY)))
+    taken = set()
+    for i in range(1, animals + 1):
+        status = rnd.choices(statuses, weights)[0]
+        clinic_id = rnd.randint(1, clinics) if clinics else None
+        agendamento = conclusao = None
+        if status == 'Aguardando' and rnd.random() < 0.5:
+            clinic_id = None
+        elif status == 'Agendado' and clinic_id:
+            slot = (clinic_id, rnd.randrange(len(days)), rnd.randrange(SLOTS_PER_DAY))
+            while slot in taken:
+                slot = (clinic_id, rnd.randrange(len(days)), rnd.randrange(SLOTS_PER_DAY))
+            taken.add(slot)
+            agendamento = days[slot[1]] + timedelta(minutes=30 * slot[2])
+        elif status == 'Concluído':
+            conclusao = now - timedelta(days=rnd.randint(0, 400), minutes=rnd.randint(0, 600))
+            agendamento = conclusao - timedelta(hours=2)
+        if status != 'Aguardando' and clinic_id is None:
+            status, agendamento, conclusao = 'Aguardando', None, None
+        yield (i, f'pet{i}', rnd.choice(ESPECIES), f'raça {i % 50}', rnd.randint(0, 18), f'1199{i:07d}'[-11:],
+               rnd.choice(PROCEDIMENTOS), 1 + rnd.randint(1, users), clinic_id,
+               agendamento.isoformat(' ') if agendamento else None, status,
+               int(status == 'Concluído'), conclusao.isoformat(' ') if conclusao else None)
+
+
+def generate(path, users=1000, clinics=20, animals=10000, seed=1, app=None):
+    """Cria o banco em ``path`` (que não deve existir) e retorna um :class:`Dataset`.
+
+    ``app`` é usada para criar o esquema e calcular o hash da senha; sem ela
+    uma aplicação é criada com o banco em ``path``.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    started = time.perf_counter()
+    if app is None:
+        from run import create_app
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SMS_WORKER': 'off'})
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password(PASSWORD)
+        db.engine.dispose()
+
+    rnd = random.Random(seed)
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    # cache grande: as inserções mantêm os índices de animal em ordem aleatória
+    conn.execute('PRAGMA cache_size=-262144')
+    conn.execute("INSERT INTO user (id, username, password_hash, role) VALUES (1, ?, ?, 'admin')",
+                 (ADMIN_USERNAME, password_hash))
+    conn.executemany(
+        "INSERT INTO user (id, username, email, contato, password_hash, role) VALUES (?, ?, ?, ?, ?, 'user')",
+        ((1 + i, f'tutor{i}', f'tutor{i}@exemplo.com', f'1198{i:07d}'[-11:], password_hash)
+         for i in range(1, users + 1)))
+    conn.executemany(
+        "INSERT INTO user (id, username, password_hash, role) VALUES (?, ?, ?, 'clinic')",
+        ((1 + users + i, f'clinica{i}', password_hash) for i in range(1, clinics + 1)))
+    conn.executemany(
+        'INSERT INTO clinic (id, nome, endereco, telefone, user_id) VALUES (?, ?, ?, ?, ?)',
+        ((i, f'Clínica {i}', f'Rua {i}, {rnd.randint(1, 999)}', f'1130{i:06d}', 1 + users + i)
+         for i in range(1, clinics + 1)))
+    for batch in _batches(_animals(rnd, users, clinics, animals, now)):
+        conn.executemany(
+            'INSERT INTO animal (id, nome, especie, raca, idade, contato, procedimento, dono_id, clinic_id, '
+            'data_agendamento, status, token_validated, data_conclusao) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.close()
+
+    with app.app_context():
+        # como num banco existente: as migrações montam contadores, busca
+        # FTS5 e versões a partir das linhas já gravadas
+        upgrade(db.engine)
+        db.session.remove()
+        db.engine.dispose()
+
+    dataset = Dataset(path, users, clinics, animals)
+    dataset.elapsed = time.perf_counter() - started
+    return dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='Arquivo do banco a criar.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--clinics', type=int, default=20)
+    parser.add_argument('--animals', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print(generate(args.path, args.users, args.clinics, args.animals, args.seed).summary())
+
+
+if __name__ == '__main__':
+    main()
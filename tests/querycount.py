@@ -0,0 +1,62 @@
+"""Contagem de comandos SQL e orçamento de consultas por rota.
+
+:func:`count_queries` conta os comandos que passam pelo engine (evento
+``before_cursor_execute``). :func:`assert_max_queries` falha quando um bloco
+passa do orçamento e lista os comandos executados, com os repetidos
+primeiro, para o N+1 aparecer de cara.
+"""
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from backend.extensions import db
+
+_whitespace = re.compile(r'\s+')
+
+
+class QueryLog:
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def report(self):
+        lines = []
+        for statement, times in Counter(self.statements).most_common():
+            lines.append(f'  {times}x {statement[:300]}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def count_queries(app):
+    """Registra os comandos SQL executados dentro do bloco (``with ... as log``)."""
+    log = QueryLog()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(_whitespace.sub(' ', statement).strip())
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield log
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+@contextmanager
+def assert_max_queries(app, budget, label=''):
+    """Falha se o bloco executar mais de ``budget`` comandos SQL."""
+    with count_queries(app) as log:
+        yield log
+    if log.count > budget:
+        raise AssertionError(
+            f'{label or "bloco"} executou {log.count} comandos SQL (orçamento: {budget}):\n{log.report()}'
+        )
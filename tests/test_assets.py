@@ -0,0 +1,89 @@
+"""Estáticos com hash, pré-comprimidos e servidos com cache longo."""
+import gzip
+import json
+
+import pytest
+
+from backend import assets
+from tests.conftest import make_app
+
+
+@pytest.fixture()
+def built(app, tmp_path):
+    output = tmp_path / 'dist'
+    result = assets.build(app.static_folder, str(output))
+    return make_app(tmp_path / 'vazio.db', ASSETS_DIR=str(output)), result, output
+
+
+def test_build_writes_hashed_files_manifest_and_gzip(built):
+    _, result, output = built
+    manifest = json.loads((output / 'manifest.json').read_text())
+    assert manifest == result.manifest
+    hashed = manifest['css/style.css']
+    assert hashed.startswith('css/style.') and hashed.endswith('.css') and hashed != 'css/style.css'
+    data = (output / hashed).read_bytes()
+    assert gzip.decompress((output / (hashed + '.gz')).read_bytes()) == data
+    # imagens não são recomprimidas
+    assert not (output / (manifest['images/logo_ictim.png'] + '.gz')).exists()
+    # mesmo conteúdo, mesmo nome
+    assert assets.hashed_name('css/style.css', data) == hashed
+
+
+def test_css_urls_are_rewritten(tmp_path):
+    source = tmp_path / 'static'
+    (source / 'css').mkdir(parents=True)
+    (source / 'img').mkdir()
+    (source / 'img' / 'bg.png').write_bytes(b'png')
+    (source / 'css' / 'a.css').write_text('body { background: url("../img/bg.png"); }'
+                                          ' a { background: url(https://x/y.png); }')
+    result = assets.build(str(source), str(tmp_path / 'dist'))
+    css = (tmp_path / 'dist' / result.manifest['css/a.css']).read_text()
+    assert f'url("../{result.manifest["img/bg.png"]}")' in css
+    assert 'url(https://x/y.png)' in css
+
+
+def test_templates_use_hashed_urls_and_fall_back_without_build(built, tmp_path):
+    built_app, result, _ = built
+    plain = make_app(tmp_path / 'vazio.db', ASSETS_DIR=str(tmp_path / 'sem-build'))
+    with plain.test_client() as plain_client:
+        html = plain_client.get('/login').get_data(as_text=True)
+    assert '/static/css/style.css' in html
+
+    with built_app.test_client() as built_client:
+        html = built_client.get('/login').get_data(as_text=True)
+    assert f"/assets/{result.manifest['css/style.css']}" in html
+    assert f"/assets/{result.manifest['css/pages/auth.css']}" in html
+    assert '/static/' not in html
+
+
+@pytest.mark.parametrize('accept,encoding', [('gzip, deflate', 'gzip'), ('identity', None)])
+def test_hashed_assets_are_immutable_and_precompressed(built, accept, encoding):
+    built_app, result, output = built
+    hashed = result.manifest['css/style.css']
+    response = built_app.test_client().get(f'/assets/{hashed}', headers={'Accept-Encoding': accept})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/css'
+    assert response.headers.get('Content-Encoding') == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    cache_control = response.headers['Cache-Control']
+    assert 'immutable' in cache_control and 'max-age=31536000' in cache_control and 'public' in cache_control
+    body = response.get_data()
+    assert (gzip.decompress(body) if encoding else body) == (output / hashed).read_bytes()
+    response.close()
+
+
+def test_manifest_and_compressed_siblings_are_not_served_directly(built):
+    built_app, result, _ = built
+    client = built_app.test_client()
+    assert client.get('/assets/manifest.json').status_code == 404
+    assert client.get(f"/assets/{result.manifest['css/style.css']}.gz").status_code == 404
+
+
+def test_vendor_library_is_local_and_hashed(built):
+    built_app, result, _ = built
+    assert not result.missing_vendor
+    with built_app.test_request_context():
+        url = assets.asset_url('js/vendor/chart.umd.js')
+    assert url == f"/assets/{result.manifest['js/vendor/chart.umd.js']}"
+    with built_app.test_client() as client:
+        assert client.get(url, headers={'Accept-Encoding': 'gzip'}).headers['Content-Encoding'] == 'gzip'
@@ -0,0 +1,167 @@
+"""Remoção de clínicas em lote: política para animais, histórico, horários e conta."""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from backend import clinic_deletion, counters
+from backend.extensions import db
+from backend.models import Clinic
+from tests.querycount import assert_max_queries
+
+CLINIC = 1
+
+
+def _prepare(app):
+    """Horários e histórico da clínica; devolve os animais dela por status."""
+    with app.app_context():
+        db.session.execute(text("INSERT OR REPLACE INTO clinic_hours (clinic_id, weekday, abertura, fechamento, "
+                                "slot_minutos) VALUES (:id, 0, '08:00', '12:00', 30)"), {'id': CLINIC})
+        db.session.execute(text("INSERT INTO animal_history (id, animal_id, nome, especie, dono_id, clinic_id, "
+                                "status, token_validated, archived_at) VALUES (999999, 999999, 'antigo', 'cão', "
+                                "2, :id, 'Concluído', 1, '2024-01-01')"), {'id': CLINIC})
+        db.session.commit()
+        rows = db.session.execute(text('SELECT id, status FROM animal WHERE clinic_id = :id'), {'id': CLINIC})
+        by_status = {}
+        for animal_id, status in rows:
+            by_status.setdefault(status, []).append(animal_id)
+        assert by_status.get('Agendado') and by_status.get('Concluído')
+        return by_status
+
+
+def _animals(ids):
+    return {row.id: row for row in db.session.execute(
+        text('SELECT id, clinic_id, status, data_agendamento, verification_token FROM animal '
+             'WHERE id IN (SELECT value FROM json_each(:ids))'), {'ids': str(ids)})}
+
+
+def _assert_clinic_gone(user_id):
+    assert db.session.scalar(text('SELECT count(*) FROM clinic WHERE id = :id'), {'id': CLINIC}) == 0
+    assert db.session.scalar(text('SELECT count(*) FROM clinic_hours WHERE clinic_id = :id'), {'id': CLINIC}) == 0
+    assert db.session.scalar(text('SELECT count(*) FROM animal WHERE clinic_id = :id'), {'id': CLINIC}) == 0
+    assert db.session.scalar(text('SELECT count(*) FROM "user" WHERE id = :id'), {'id': user_id}) == 0
+    assert counters.drift() == {}
+
+
+def test_delete_releases_animals_to_queue_in_bulk(app, admin_client, dataset):
+    by_status = _prepare(app)
+    all_ids = [animal_id for ids in by_status.values() for animal_id in ids]
+    # custo fixo: nenhum animal é carregado, seja qual for o tamanho da clínica
+    with assert_max_queries(app, 20, 'POST /clinics/1/delete'):
+        response = admin_client.post(f'/clinics/{CLINIC}/delete')
+    assert response.status_code == 302
+
+    with app.app_context():
+        _assert_clinic_gone(dataset.clinic_user_id(CLINIC))
+        animals = _animals(all_ids)
+        assert {row.clinic_id for row in animals.values()} == {None}
+        for animal_id in by_status['Agendado']:
+            row = animals[animal_id]
+            assert (row.status, row.data_agendamento, row.verification_token) == ('Aguardando', None, None)
+        assert {animals[i].status for i in by_status['Concluído']} == {'Concluído'}
+        assert db.session.scalar(text('SELECT clinic_id FROM animal_history WHERE id = 999999')) is None
+        assert db.session.scalar(text('SELECT clinica FROM animal_search WHERE rowid = :id'),
+                                 {'id': all_ids[0]}) is None
+
+
+def test_delete_reassigns_to_another_clinic(app, admin_client, dataset):
+    by_status = _prepare(app)
+    all_ids = [animal_id for ids in by_status.values() for animal_id in ids]
+    with app.app_context():
+        before = _animals(all_ids)
+    response = admin_client.post(f'/clinics/{CLINIC}/delete', data={'reassign_to': 2})
+    assert response.status_code == 302
+
+    with app.app_context():
+        _assert_clinic_gone(dataset.clinic_user_id(CLINIC))
+        after = _animals(all_ids)
+        assert {row.clinic_id for row in after.values()} == {2}
+        # status, agendamento e token preservados
+        assert all(after[i][2:] == before[i][2:] for i in all_ids)
+        assert db.session.scalar(text('SELECT clinic_id FROM animal_history WHERE id = 999999')) == 2
+
+
+@pytest.mark.parametrize('target', [CLINIC, 12345])
+def test_invalid_target_keeps_clinic(app, admin_client, target):
+    response = admin_client.post(f'/clinics/{CLINIC}/delete', data={'reassign_to': target})
+    assert response.status_code == 302
+    assert f'/clinics/{CLINIC}/edit' in response.headers['Location']
+    with app.app_context():
+        assert db.session.scalar(text('SELECT count(*) FROM clinic WHERE id = :id'), {'id': CLINIC}) == 1
+
+
+def test_clinic_account_that_is_also_a_tutor_is_downgraded(app, dataset):
+    user_id = dataset.clinic_user_id(CLINIC)
+    with app.app_context():
+        db.session.execute(text('UPDATE animal SET dono_id = :user_id WHERE id = 1'), {'user_id': user_id})
+        db.session.commit()
+        clinic_deletion.delete_clinic(CLINIC)
+        assert db.session.scalar(text('SELECT role FROM "user" WHERE id = :id'), {'id': user_id}) == 'user'
+
+
+def test_large_clinic_is_removed_in_background(app, dataset):
+    _prepare(app)
+    app.config.update(CLINIC_DELETE_SYNC_LIMIT=10, CLINIC_DELETE_CHUNK_SIZE=7)
+    with app.app_context():
+        result = clinic_deletion.start_deletion(app, CLINIC)
+        assert result.background
+        # a conta perde o acesso antes de os animais serem movidos
+        user_id = dataset.clinic_user_id(CLINIC)
+        assert db.session.scalar(text('SELECT count(*) FROM "user" WHERE id = :id'), {'id': user_id}) == 0
+        deadline = time.monotonic() + 10
+        while clinic_deletion.in_progress(CLINIC) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not clinic_deletion.in_progress(CLINIC)
+        db.session.remove()
+        _assert_clinic_gone(user_id)
+
+
+def test_delete_clinic_command_in_chunks(app, dataset):
+    _prepare(app)
+    result = app.test_cli_runner().invoke(args=['delete-clinic', str(CLINIC), '--reassign-to', '3',
+                                                '--chunk-size', '10'])
+    assert result.exit_code == 0, result.output
+    assert 'movidos para a clínica 3' in result.output
+    with app.app_context():
+        _assert_clinic_gone(dataset.clinic_user_id(CLINIC))
+
+    result = app.test_cli_runner().invoke(args=['delete-clinic', str(CLINIC)])
+    assert result.exit_code != 0 and 'Clínica não encontrada.' in result.output
+
+
+def test_orm_delete_follows_policy_without_loading_animals(app):
+    by_status = _prepare(app)
+    with app.app_context():
+        clinic = db.session.get(Clinic, CLINIC)
+        with assert_max_queries(app, 12, 'session.delete(clinic)'):
+            db.session.delete(clinic)
+            db.session.commit()
+        animals = _animals(by_status['Agendado'])
+        assert {(row.clinic_id, row.status) for row in animals.values()} == {(None, 'Aguardando')}
+        assert db.session.scalar(text('SELECT count(*) FROM clinic_hours WHERE clinic_id = :id'), {'id': CLINIC}) == 0
+        assert counters.drift() == {}
+
+
+def test_deletion_in_progress_elsewhere_is_not_started_again(app):
+    _prepare(app)
+    app.config.update(CLINIC_DELETE_SYNC_LIMIT=10)
+    with app.app_context():
+        # marca gravada por outro worker que ainda está movendo os lotes
+        db.session.execute(text('UPDATE clinic SET deleting_since = :now WHERE id = :id'),
+                           {'now': datetime.utcnow(), 'id': CLINIC})
+        db.session.commit()
+        assert clinic_deletion.in_progress(CLINIC)
+        for start in (lambda: clinic_deletion.start_deletion(app, CLINIC),
+                      lambda: clinic_deletion.delete_clinic(CLINIC, chunk_size=10)):
+            with pytest.raises(clinic_deletion.DeletionError):
+                start()
+        assert db.session.scalar(text('SELECT user_id FROM clinic WHERE id = :id'), {'id': CLINIC}) is not None
+
+        # marca expirada (processo caiu): a remoção é retomada
+        db.session.execute(text('UPDATE clinic SET deleting_since = :old WHERE id = :id'),
+                           {'old': datetime.utcnow() - timedelta(hours=1), 'id': CLINIC})
+        db.session.commit()
+        assert not clinic_deletion.in_progress(CLINIC)
+        clinic_deletion.delete_clinic(CLINIC, chunk_size=10)
+        assert db.session.get(Clinic, CLINIC) is None
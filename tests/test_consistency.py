@@ -0,0 +1,113 @@
+"""Contadores, busca e agenda continuam consistentes depois das escritas."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+from backend import counters
+from backend.archive import archive_completed
+from backend.extensions import db
+from backend.models import Animal, AnimalHistory
+from backend.reminders import send_reminders
+from backend.scheduling import SchedulingError, next_free_slots
+from backend.services import claim_next_animals, schedule_animal
+
+
+def _claimed_waiting(clinic_id):
+    return db.session.scalars(
+        select(Animal.id).where(Animal.clinic_id == clinic_id, Animal.status == 'Aguardando').limit(2)
+    ).all()
+
+
+def test_claim_and_schedule_keep_counters(app):
+    with app.app_context():
+        claimed = claim_next_animals(1, limit=3)
+        assert claimed
+        first, second = _claimed_waiting(1)
+        slot = next_free_slots(1, n=1, after=datetime.now() + timedelta(days=1))[0]
+        schedule_animal(first, slot)
+        with pytest.raises(SchedulingError):
+            schedule_animal(second, slot)
+        assert counters.drift() == {}
+
+
+def test_past_slot_is_rejected(app):
+    with app.app_context():
+        claim_next_animals(1, limit=1)
+        animal_id = _claimed_waiting(1)[0]
+        slot = next_free_slots(1, n=1, after=datetime.now() - timedelta(days=7))[0]
+        assert slot < datetime.now()
+        with pytest.raises(SchedulingError, match='já passou'):
+            schedule_animal(animal_id, slot)
+        assert db.session.get(Animal, animal_id).data_agendamento is None
+
+
+def test_archive_moves_rows_and_keeps_counters(app):
+    with app.app_context():
+        result = archive_completed(older_than_days=30, chunk_size=50)
+        assert result.moved > 0
+        assert db.session.scalar(select(db.func.count()).select_from(AnimalHistory)) == result.moved
+        assert counters.drift() == {}
+        hot = db.session.scalar(select(db.func.count()).select_from(Animal))
+        assert db.session.scalar(text('SELECT count(*) FROM animal_search')) == hot
+
+
+def test_reminders_are_sent_once(app):
+    with app.app_context():
+        first = send_reminders(hours=24 * 7)
+        again = send_reminders(hours=24 * 7)
+        assert first.appointments > 0
+        assert again.appointments == 0
+
+
+def test_old_overlap_does_not_block_new_bookings(app):
+    with app.app_context():
+        claim_next_animals(1, limit=4)
+        legacy_a, legacy_b, new_animal = db.session.scalars(
+            select(Animal.id).where(Animal.clinic_id == 1, Animal.status == 'Aguardando').limit(3)
+        ).all()
+        slots = next_free_slots(1, n=40, after=datetime.now() + timedelta(days=1))
+        first, later = next((a, b) for a, b in zip(slots, slots[2:]) if a.date() == b.date())
+        # duas linhas legadas sobrepostas no mesmo dia (gravadas sem passar pela agenda)
+        db.session.execute(
+            text('UPDATE animal SET data_agendamento = :when WHERE id IN (:a, :b)'),
+            {'when': first, 'a': legacy_a, 'b': legacy_b},
+        )
+        db.session.commit()
+        assert schedule_animal(new_animal, later).data_agendamento == later
+
+
+def test_reused_animal_id_can_be_archived_again(app):
+    with app.app_context():
+        archive_completed(older_than_days=30, chunk_size=50)
+        archived = db.session.scalar(select(AnimalHistory).limit(1))
+        # o SQLite devolve ids removidos de animal; simula a reutilização
+        reused = Animal(id=archived.animal_id, nome='novo', especie='gato', dono_id=archived.dono_id,
+                        clinic_id=archived.clinic_id, status='Concluído',
+                        data_conclusao=datetime.utcnow() - timedelta(days=60))
+        db.session.add(reused)
+        db.session.commit()
+        assert archive_completed(older_than_days=30).moved == 1
+        assert db.session.scalar(
+            select(db.func.count()).where(AnimalHistory.animal_id == archived.animal_id)
+        ) == 2
+        assert counters.drift() == {}
+
+
+def test_archive_skips_rows_changed_after_selection(app, monkeypatch):
+    from backend import archive
+
+    with app.app_context():
+        candidate = db.session.scalar(select(Animal.id).where(*archive.archive_criteria(datetime.utcnow() - timedelta(days=1))))
+        original = archive._move_chunk
+
+        def touch_then_move(ids, cutoff, now):
+            # alterada entre a leitura dos candidatos e o lote
+            db.session.execute(text('UPDATE animal SET data_conclusao = :now WHERE id = :id'),
+                               {'now': datetime.utcnow(), 'id': candidate})
+            return original(ids, cutoff, now)
+
+        monkeypatch.setattr(archive, '_move_chunk', touch_then_move)
+        archive_completed(older_than_days=1)
+        assert db.session.get(Animal, candidate) is not None
+        assert not db.session.scalar(select(db.func.count()).where(AnimalHistory.animal_id == candidate))
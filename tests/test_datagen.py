@@ -0,0 +1,33 @@
+"""O banco sintético sai consistente: contadores, busca e login funcionando."""
+from sqlalchemy import func, select, text
+
+from backend import counters
+from backend.extensions import db
+from backend.models import Animal, Clinic, User
+from tests.datagen import PASSWORD, Dataset
+
+
+def test_sizes_match_request(app, dataset):
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).select_from(Animal)) == dataset.animals
+        assert db.session.scalar(select(func.count()).select_from(Clinic)) == dataset.clinics
+        assert db.session.scalar(select(func.count()).where(User.role == 'user')) == dataset.users
+    opened = Dataset.open(dataset.path)
+    assert (opened.users, opened.clinics, opened.animals) == (dataset.users, dataset.clinics, dataset.animals)
+
+
+def test_derived_tables_are_consistent(app, dataset):
+    with app.app_context():
+        assert counters.drift() == {}
+        assert db.session.scalar(text('SELECT count(*) FROM animal_search')) == dataset.animals
+        # todo animal fora da fila tem clínica
+        assert not db.session.scalar(
+            select(func.count()).where(Animal.status != 'Aguardando', Animal.clinic_id.is_(None)))
+
+
+def test_generated_users_can_log_in(client, dataset):
+    response = client.post('/login', data={'username': dataset.clinic_username(1), 'password': PASSWORD})
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        assert sess['user_id'] == dataset.clinic_user_id(1)
+        assert sess['role'] == 'clinic'
@@ -0,0 +1,24 @@
+"""Entrega de eventos aos assinantes."""
+import threading
+
+from backend.events import LocalBroker, Subscription
+
+
+def test_concurrent_publishers_never_overflow_a_slow_subscriber():
+    subscription = Subscription(LocalBroker(), ['admin'], maxsize=1)
+    errors = []
+
+    def publish(n):
+        try:
+            for i in range(5000):
+                subscription.put({'type': 'ping', 'n': n, 'i': i})
+        except Exception as exc:  # escaparia do hook after_commit
+            errors.append(exc)
+
+    threads = [threading.Thread(target=publish, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert subscription.get(timeout=0) == {'type': 'reset'}
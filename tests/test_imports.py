@@ -0,0 +1,26 @@
+"""Importação em lote de tutores e animais."""
+import io
+
+from sqlalchemy import func, select, text
+
+from backend.extensions import db
+from backend.imports import import_records
+from backend.models import User
+
+
+def test_existing_tutor_is_found_by_email_in_any_case(app):
+    with app.app_context():
+        email = db.session.scalar(text('SELECT email FROM user WHERE email IS NOT NULL LIMIT 1'))
+        csv_data = ('tutor_username,tutor_email,nome,especie\n'
+                    f'outro-nome,{email.upper()},Rex,cão\n')
+        result = import_records(io.StringIO(csv_data))
+        assert (result.animals, result.users_created, result.users_reused) == (1, 0, 1)
+        assert db.session.scalar(
+            select(func.count()).select_from(User).where(func.lower(User.email) == email.lower())) == 1
+
+
+def test_email_lookup_uses_index(app):
+    with app.app_context():
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM user WHERE lower(email) IN ('a@b.c')")).all()
+        assert any('ix_user_email_lower' in row[-1] for row in plan)
@@ -0,0 +1,35 @@
+"""O runner de carga (scripts/loadtest.py) roda as rotas sem erros no modo WSGI."""
+import argparse
+import importlib.util
+import json
+import os
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'loadtest.py')
+
+
+@pytest.fixture(scope='module')
+def loadtest():
+    spec = importlib.util.spec_from_file_location('loadtest', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_wsgi_run_reports_percentiles(loadtest, dataset, tmp_path):
+    args = argparse.Namespace(mode='wsgi', url=None, requests=12, concurrency=3, routes=None, iterations=1000)
+    results = loadtest.run(args, dataset)
+    assert [result.path for result in results] == ['/', '/animals', '/login', '/clinics']
+    for result in results:
+        row = result.as_dict()
+        assert row['errors'] == 0, row
+        assert row['requests'] == 12
+        assert 0 < row['p50_ms'] <= row['p99_ms']
+
+    path = str(tmp_path / 'results.jsonl')
+    loadtest.save(path, args, dataset, results)
+    with open(path, encoding='utf-8') as f:
+        saved = [json.loads(line) for line in f]
+    assert {row['route'] for row in saved} == {'GET /', 'GET /animals', 'POST /login', 'GET /clinics'}
+    assert all(row['commit'] for row in saved)
@@ -0,0 +1,118 @@
+"""Correções de dados em lote (``maintenance run``): resultado, simulação e retomada."""
+import pytest
+from sqlalchemy import text
+
+from backend import counters, maintenance
+from backend.extensions import db
+
+
+def _legacy_state(app):
+    """Contas de clínica de antes de ``clinic.user_id``: animais apontando para o id da conta."""
+    with app.app_context():
+        run = db.session.execute
+        linked = run(text("INSERT INTO user (username, password_hash, role) "
+                          "VALUES ('clinica-legado', 'x', 'clinic') RETURNING id")).scalar()
+        created = run(text("INSERT INTO user (username, contato, password_hash, role) "
+                           "VALUES ('clinica-sem-cadastro', '1199990000', 'x', 'clinic') RETURNING id")).scalar()
+        clinic = run(text("INSERT INTO clinic (nome) VALUES ('clinica-legado') RETURNING id")).scalar()
+        ids = db.session.scalars(text('SELECT id FROM animal ORDER BY id LIMIT 40')).all()
+        run(text('UPDATE animal SET clinic_id = :account WHERE id IN (SELECT value FROM json_each(:ids))'),
+            {'account': linked, 'ids': str(ids[:25])})
+        run(text('UPDATE animal SET clinic_id = :account WHERE id IN (SELECT value FROM json_each(:ids))'),
+            {'account': created, 'ids': str(ids[25:])})
+        run(text("INSERT INTO animal_history (id, animal_id, nome, especie, dono_id, clinic_id, status, "
+                 "token_validated, archived_at) VALUES (999999, 999999, 'antigo', 'cão', 2, :account, "
+                 "'Concluído', 1, '2024-01-01')"),
+            {'account': linked})
+        # contadores coerentes com o estado legado, como num banco antigo
+        counters.rebuild()
+        db.session.commit()
+        return {'linked': linked, 'created': created, 'clinic': clinic, 'animals': ids}
+
+
+def _clinic_of(account):
+    return db.session.scalar(text('SELECT min(id) FROM clinic WHERE user_id = :id'), {'id': account})
+
+
+def test_fixes_repair_legacy_clinic_accounts(app):
+    legacy = _legacy_state(app)
+    with app.app_context():
+        results = [maintenance.run_fix(fix, chunk_size=100) for fix in maintenance.FIXES]
+        assert [r.changed for r in results] == [1, 1, 40, 1]
+        assert _clinic_of(legacy['linked']) == legacy['clinic']
+        new_clinic = _clinic_of(legacy['created'])
+        assert db.session.execute(text('SELECT nome, telefone FROM clinic WHERE id = :id'),
+                                  {'id': new_clinic}).one() == ('clinica-sem-cadastro', '1199990000')
+        rows = dict(db.session.execute(text('SELECT id, clinic_id FROM animal WHERE id IN '
+                                            '(SELECT value FROM json_each(:ids))'),
+                                       {'ids': str(legacy['animals'])}).all())
+        assert {rows[i] for i in legacy['animals'][:25]} == {legacy['clinic']}
+        assert {rows[i] for i in legacy['animals'][25:]} == {new_clinic}
+        assert db.session.scalar(text('SELECT clinic_id FROM animal_history WHERE id = 999999')) == legacy['clinic']
+        # contadores, busca e checkpoints continuam coerentes
+        assert counters.drift() == {}
+        indexed = db.session.scalar(text('SELECT clinica FROM animal_search WHERE rowid = :id'),
+                                    {'id': legacy['animals'][30]})
+        assert indexed == 'clinica-sem-cadastro'
+        assert maintenance.checkpoints() == {}
+
+        # idempotente
+        assert [maintenance.run_fix(fix).changed for fix in maintenance.FIXES] == [0, 0, 0, 0]
+
+
+def test_dry_run_only_counts(app):
+    _legacy_state(app)
+    with app.app_context():
+        assert maintenance.run_fix('link-clinic-users', dry_run=True).changed == 1
+        assert maintenance.run_fix('create-user-clinics', dry_run=True).changed == 2
+        assert maintenance.run_fix('animal-clinic-ids', dry_run=True).changed == 0
+        assert db.session.scalar(text("SELECT count(*) FROM clinic WHERE nome LIKE 'clinica-%'")) == 1
+
+
+def test_interrupted_run_resumes_from_checkpoint(app, monkeypatch):
+    legacy = _legacy_state(app)
+    with app.app_context():
+        maintenance.run_fix('link-clinic-users')
+        maintenance.run_fix('create-user-clinics')
+
+        fix = maintenance.FIXES_BY_NAME['animal-clinic-ids']
+        original = maintenance.Fix.apply
+        calls = []
+
+        def failing_apply(self, conn, lo, hi):
+            calls.append(lo)
+            if len(calls) == 3:
+                raise RuntimeError('queda no meio do lote')
+            return original(self, conn, lo, hi)
+
+        monkeypatch.setattr(maintenance.Fix, 'apply', failing_apply)
+        with pytest.raises(RuntimeError):
+            maintenance.run_fix(fix, chunk_size=10)
+        last_id, changed, _ = maintenance.checkpoints()[fix.name]
+        assert last_id == legacy['animals'][19] and changed == 20
+        # o lote que falhou foi desfeito inteiro
+        assert counters.drift() == {}
+
+        monkeypatch.setattr(maintenance.Fix, 'apply', original)
+        result = maintenance.run_fix(fix, chunk_size=10)
+        assert result.resumed_from == last_id
+        assert result.changed == 40
+        assert fix.name not in maintenance.checkpoints()
+        assert counters.drift() == {}
+
+
+def test_maintenance_cli(app):
+    _legacy_state(app)
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['maintenance', 'run', '--dry-run'])
+    assert result.exit_code == 0, result.output
+    assert '[simulação] link-clinic-users: 1 linhas seriam alteradas' in result.output
+
+    result = runner.invoke(args=['maintenance', 'run', 'link-clinic-users', 'create-user-clinics',
+                                 'animal-clinic-ids', '--chunk-size', '200'])
+    assert result.exit_code == 0, result.output
+    assert 'animal-clinic-ids: 40 linhas alteradas' in result.output
+
+    assert runner.invoke(args=['maintenance', 'run', 'nada']).exit_code != 0
+    result = runner.invoke(args=['maintenance', 'status'])
+    assert 'history-clinic-ids' in result.output and 'interrompida' not in result.output
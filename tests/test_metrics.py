@@ -0,0 +1,21 @@
+"""``/metrics``: token e gauges de negócio."""
+import pytest
+
+from backend.metrics import collect_gauges
+from backend.models import Animal
+from backend.services import create_animal, waiting_for_clinic_criteria
+from tests.conftest import make_app
+
+
+@pytest.mark.parametrize('header', ['Bearer errado', 'Bearer çãé', ''])
+def test_wrong_token_is_unauthorized(dataset, header):
+    app = make_app(dataset.path, METRICS_TOKEN='segredo')
+    assert app.test_client().get('/metrics', headers={'Authorization': header}).status_code == 401
+
+
+def test_waiting_gauge_matches_the_queue(app):
+    with app.app_context():
+        # variante de status que a fila de reivindicação também aceita
+        create_animal('Rex', 'cão', None, 'consulta', 2, status='Aguardando retorno')
+        queue = Animal.query.filter(waiting_for_clinic_criteria()).count()
+        assert dict(collect_gauges()['waiting'])[''] == queue
@@ -0,0 +1,53 @@
+"""Migrações versionadas aplicadas a bancos antigos."""
+from sqlalchemy import text
+
+from backend import counters, migrations, versions
+from backend.extensions import db
+
+
+def _triggers(conn, prefix):
+    return {row[0] for row in conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE :prefix"),
+        {'prefix': prefix + '%'})}
+
+
+def test_old_database_gets_each_version_schema(app):
+    with app.app_context():
+        # banco de antes dos contadores, da busca e das versões
+        with db.engine.begin() as conn:
+            for name in _triggers(conn, 'change_version_') | _triggers(conn, 'animal_search_') \
+                    | _triggers(conn, 'clinic_search_'):
+                conn.execute(text(f'DROP TRIGGER {name}'))
+            for table in ('change_version', 'animal_counter', 'animal_search', 'clinic_search'):
+                conn.execute(text(f'DROP TABLE {table}'))
+            conn.execute(text('DELETE FROM schema_migrations WHERE version IN (3, 4, 5, 10, 12)'))
+
+        assert migrations.upgrade(db.engine, target=5) == [3, 4, 5]
+        with db.engine.connect() as conn:
+            # a migração 5 cria só os triggers da sua versão
+            assert _triggers(conn, 'change_version_') == {
+                'change_version_animal_ai', 'change_version_animal_au', 'change_version_animal_ad',
+                'change_version_clinic_ai', 'change_version_clinic_au', 'change_version_clinic_ad',
+            }
+        assert not versions.available()
+
+        assert migrations.upgrade(db.engine) == [10, 12]
+        with db.engine.connect() as conn:
+            assert _triggers(conn, 'change_version_') == set(versions.TRIGGERS)
+            assert conn.scalar(text('SELECT count(*) FROM animal_search')) == \
+                conn.scalar(text('SELECT count(*) FROM animal'))
+        assert versions.available()
+        assert counters.drift() == {}
+
+
+def test_history_migration_keeps_original_ids(app):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP TABLE animal_history'))
+            migrations._add_animal_history(conn)
+            conn.execute(text("INSERT INTO animal_history (id, nome, especie, dono_id, status, token_validated, "
+                              "archived_at) VALUES (42, 'antigo', 'cão', 2, 'Concluído', 1, '2024-01-01')"))
+            conn.execute(text('DELETE FROM schema_migrations WHERE version = 11'))
+        assert migrations.upgrade(db.engine) == [11]
+        row = db.session.execute(text("SELECT id, animal_id FROM animal_history WHERE nome = 'antigo'")).one()
+        assert row.animal_id == 42
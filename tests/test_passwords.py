@@ -0,0 +1,44 @@
+"""Hash de senhas no pool de processos."""
+import time
+
+import pytest
+
+from backend import passwords
+from backend.passwords import PasswordPoolBusy
+
+
+@pytest.fixture
+def pool(app):
+    app.config.update(PASSWORD_POOL_SIZE=1, PASSWORD_POOL_TIMEOUT=0.2)
+    with app.app_context():
+        yield
+        passwords.shutdown()
+
+
+def test_slow_pool_raises_busy_instead_of_timeout(pool):
+    with pytest.raises(PasswordPoolBusy):
+        passwords._run(time.sleep, 2)
+
+
+def test_login_backs_off_when_pool_times_out(app, client, dataset, monkeypatch):
+    def timed_out(*args):
+        raise PasswordPoolBusy('pool de hash de senha não respondeu a tempo')
+
+    monkeypatch.setattr(passwords, '_run', timed_out)
+    response = client.post('/login', data={'username': dataset.tutor_username(1), 'password': 'x'})
+    assert response.status_code == 503
+
+
+@pytest.mark.parametrize('url,data,role', [
+    ('/register', {'username': 'novo', 'email': 'novo@exemplo.com', 'password': 'x', 'confirm_password': 'x',
+                   'contato': '11999999999'}, None),
+    ('/clinics/add', {'username': 'nova-clinica', 'password': 'x', 'nome': 'Nova', 'endereco': 'Rua',
+                      'telefone': '1133334444'}, 'admin'),
+])
+def test_account_creation_backs_off_when_pool_times_out(app, login, monkeypatch, url, data, role):
+    def timed_out(*args):
+        raise PasswordPoolBusy('pool de hash de senha não respondeu a tempo')
+
+    monkeypatch.setattr(passwords, '_run', timed_out)
+    client = login(1, role) if role else app.test_client()
+    assert client.post(url, data=data).status_code == 503
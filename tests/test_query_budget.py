@@ -0,0 +1,109 @@
+"""Orçamento de consultas SQL por rota e papel.
+
+Os orçamentos valem para qualquer tamanho de banco (``TEST_ANIMALS``): uma
+rota que passa a consultar por linha (N+1) estoura aqui, e não em produção.
+Ao otimizar uma rota, baixe o número; aumentar exige justificativa.
+
+Cada rota é chamada uma vez antes da medição: a primeira requisição de um
+processo faz verificações únicas (FTS5 e triggers de versão disponíveis?)
+que ficam em cache, e o orçamento vale para o regime normal. O cache de
+fragmentos é esvaziado antes de medir, para valer o pior caso (linhas
+alteradas desde a última visita).
+"""
+import pytest
+
+from backend.templating import get_fragment_cache
+from tests.querycount import assert_max_queries, count_queries
+
+# (papel, url, orçamento); as listagens com linhas em cache de fragmentos
+# (backend/templating.py) contam duas consultas de versões: a da tabela e,
+# como o cache é esvaziado antes da medição, a das linhas
+BUDGETS = [
+    ('admin', '/', 6),
+    ('admin', '/?historico=1', 7),
+    ('admin', '/animals', 4),
+    ('admin', '/animals?page=3', 4),
+    ('admin', '/animals?q=pet1', 4),
+    ('admin', '/clinics', 4),
+    ('admin', '/clinics?q=Clínica', 4),
+    ('admin', '/animals/5/edit', 2),
+    ('admin', '/animals/5/schedule', 4),
+    ('admin', '/clinics/1/hours', 3),
+    ('admin', '/api/v1/animals', 4),
+    ('admin', '/api/v1/clinics', 3),
+    ('admin', '/api/v1/stats', 4),
+    ('admin', '/api/v1/clinics/1/slots', 4),
+    ('admin', '/metrics', 4),
+    ('clinic', '/', 4),
+    ('clinic', '/?historico=1', 5),
+    ('clinic', '/animals', 4),
+    ('clinic', '/animals?q=pet1', 4),
+    ('clinic', '/clinics/1/hours', 3),
+    ('clinic', '/api/v1/animals', 3),
+    ('clinic', '/api/v1/stats', 4),
+    ('user', '/', 2),
+    ('user', '/?historico=1', 2),
+    ('user', '/animals', 4),
+    ('user', '/clinics', 4),
+    ('user', '/api/v1/animals', 3),
+    ('anon', '/login', 0),
+    ('anon', '/', 0),
+]
+
+# listagens que não podem crescer com o tamanho da página
+LISTINGS = [
+    ('admin', '/'),
+    ('admin', '/?historico=1'),
+    ('admin', '/animals'),
+    ('clinic', '/'),
+    ('clinic', '/animals'),
+    ('user', '/'),
+    ('user', '/animals'),
+    ('admin', '/api/v1/animals'),
+]
+
+
+@pytest.fixture
+def clients(client, admin_client, clinic_client, tutor_client):
+    return {'anon': client, 'admin': admin_client, 'clinic': clinic_client, 'user': tutor_client}
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.is_streamed:
+        response.get_data()
+    return response
+
+
+@pytest.mark.parametrize('role,url,budget', BUDGETS, ids=[f'{role}:{url}' for role, url, _ in BUDGETS])
+def test_route_within_query_budget(app, clients, role, url, budget):
+    _get(clients[role], url)
+    get_fragment_cache(app).clear()
+    with assert_max_queries(app, budget, label=f'{role} GET {url}'):
+        response = _get(clients[role], url)
+    assert response.status_code < 400
+
+
+@pytest.mark.parametrize('role,url', LISTINGS, ids=[f'{role}:{url}' for role, url in LISTINGS])
+def test_listing_queries_do_not_grow_with_page_size(app, clients, role, url):
+    _get(clients[role], url)
+    counts = []
+    for per_page in (5, 100):
+        separator = '&' if '?' in url else '?'
+        get_fragment_cache(app).clear()
+        with count_queries(app) as log:
+            _get(clients[role], f'{url}{separator}per_page={per_page}')
+        counts.append(log.count)
+    assert counts[0] == counts[1], f'{role} GET {url}: {counts[0]} consultas com 5 linhas, {counts[1]} com 100'
+
+
+def test_budget_failure_lists_repeated_statements(app, admin_client):
+    from backend.extensions import db
+    from backend.models import Animal
+
+    with pytest.raises(AssertionError) as excinfo:
+        with assert_max_queries(app, 2):
+            with app.app_context():
+                for animal in Animal.query.limit(5).all():
+                    db.session.get(Animal, animal.id + 1000)
+    assert '5x SELECT' in str(excinfo.value)
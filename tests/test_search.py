@@ -0,0 +1,38 @@
+"""Busca textual: ranking na janela e paginação além dela."""
+import pytest
+from sqlalchemy import select
+
+from backend.extensions import db
+from backend.models import Animal
+from backend.search import search_animals
+
+
+def _all_pages(query, per_page, **kwargs):
+    ids, scores, page = [], [], 1
+    while page:
+        result = search_animals(query, page=page, per_page=per_page, **kwargs)
+        ids += [animal.id for animal in result.items]
+        scores += result.scores
+        page = result.next_page
+    return ids, scores
+
+
+@pytest.mark.parametrize('per_page', [4, 7])
+def test_paging_continues_past_rank_window(app, per_page):
+    app.config['SEARCH_RANK_WINDOW'] = 10
+    with app.app_context():
+        expected = db.session.scalars(select(Animal.id).where(Animal.especie == 'gato')).all()
+        assert len(expected) > 10
+        ids, scores = _all_pages('gato', per_page)
+        assert sorted(ids) == sorted(expected)
+        # a janela (os 10 mais recentes) vem pontuada; o restante, por id decrescente
+        assert set(ids[:10]) == set(sorted(expected, reverse=True)[:10])
+        assert all(score is not None for score in scores[:10])
+        assert scores[10:] == [None] * (len(ids) - 10)
+        assert ids[10:] == sorted(ids[10:], reverse=True)
+
+
+def test_small_result_is_fully_ranked(app):
+    with app.app_context():
+        ids, scores = _all_pages('gato', 25)
+        assert len(ids) < 1000 and None not in scores
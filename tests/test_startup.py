@@ -0,0 +1,78 @@
+"""Inicialização: ``init-db`` explícito e aquecimento opcional."""
+from sqlalchemy import inspect
+
+from backend import migrations, search, versions, warmup
+from backend.extensions import db
+from backend.models import User
+from tests.conftest import make_app
+from tests.querycount import count_queries
+
+
+def test_factory_does_not_touch_schema(tmp_path):
+    app = make_app(tmp_path / 'novo.db')
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+        db.engine.dispose()
+
+
+def test_init_db_command_creates_schema_and_admin(tmp_path):
+    app = make_app(tmp_path / 'novo.db')
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['init-db', '--admin-password', 'segredo'])
+    assert result.exit_code == 0, result.output
+    assert 'Usuário admin criado.' in result.output
+    with app.app_context():
+        assert not migrations.pending_migrations(db.engine)
+        assert User.query.filter_by(username='admin').one().check_password('segredo')
+
+    # idempotente: segunda execução não recria nada
+    result = runner.invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    assert 'admin criado' not in result.output
+    with app.app_context():
+        assert User.query.filter_by(role='admin').count() == 1
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_warmup_compiles_templates_and_opens_pool(dataset):
+    search._available.clear()
+    versions._available.clear()
+    app = make_app(dataset.path, WARMUP=True, WARMUP_CONNECTIONS=2)
+    try:
+        env = app.jinja_env
+        assert env.cache and all(name in {key[1] for key in env.cache.keys()}
+                                 for name in env.list_templates(filter_func=lambda n: n.endswith('.html')))
+        with app.app_context():
+            assert db.engine.pool.checkedin() == 2
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'admin'
+        # as checagens de sqlite_master já foram feitas no aquecimento
+        with count_queries(app) as log:
+            assert client.get('/').status_code == 200
+        assert not [s for s in log.statements if 'sqlite_master' in s]
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+
+def test_fork_handler_covers_every_warmed_app(dataset):
+    apps = [make_app(dataset.path, WARMUP=True) for _ in range(2)]
+    try:
+        engines = []
+        for app in apps:
+            with app.app_context():
+                engines.append(db.engine)
+        assert all(engine in warmup._warmed_engines for engine in engines)
+        assert all(engine.pool.checkedin() == 1 for engine in engines)
+        # o que um processo filho roda logo depois do fork
+        warmup._dispose_after_fork()
+        assert all(engine.pool.checkedin() == 0 for engine in engines)
+    finally:
+        for app in apps:
+            with app.app_context():
+                db.engine.dispose()
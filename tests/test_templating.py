@@ -0,0 +1,118 @@
+"""Cache de fragmentos das listagens e bytecode dos templates."""
+import os
+
+import pytest
+from sqlalchemy import text
+
+from backend.extensions import db
+from backend.templating import FragmentCache, get_fragment_cache
+from tests.conftest import make_app
+
+PAGES = [
+    ('admin', '/?per_page=50'),
+    ('admin', '/animals?per_page=50'),
+    ('admin', '/clinics'),
+    ('clinic', '/animals'),
+    ('user', '/animals'),
+]
+
+
+def _client(app, user_id, role):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['role'] = role
+    return client
+
+
+def _user_id(dataset, role):
+    return {'admin': 1, 'clinic': dataset.clinic_user_id(1), 'user': dataset.tutor_id(1)}[role]
+
+
+@pytest.mark.parametrize('role,url', PAGES, ids=[f'{role}:{url}' for role, url in PAGES])
+def test_cached_rows_render_same_html(app, dataset, role, url):
+    uncached = make_app(dataset.path, FRAGMENT_CACHE_BYTES=0)
+    expected = _client(uncached, _user_id(dataset, role), role).get(url).get_data(as_text=True)
+    client = _client(app, _user_id(dataset, role), role)
+    assert client.get(url).get_data(as_text=True) == expected
+    # segunda vez: tabela inteira do cache
+    assert client.get(url).get_data(as_text=True) == expected
+    assert get_fragment_cache(app).hits >= 1
+    with uncached.app_context():
+        db.engine.dispose()
+
+
+def test_writes_outside_routes_are_never_served_stale(app, admin_client):
+    with app.app_context():
+        animal_id = db.session.scalar(text('SELECT max(id) FROM animal'))
+        clinic_id = db.session.scalar(text('SELECT clinic_id FROM animal WHERE id = :id'), {'id': animal_id})
+    assert 'pet-renomeado' not in admin_client.get('/animals').get_data(as_text=True)
+
+    with app.app_context():
+        # SQL direto (como um UPDATE em lote ou outro worker): nenhuma invalidação explícita
+        db.session.execute(text("UPDATE animal SET nome = 'pet-renomeado' WHERE id = :id"), {'id': animal_id})
+        if clinic_id:
+            db.session.execute(text("UPDATE clinic SET nome = 'Clínica Renomeada' WHERE id = :id"),
+                               {'id': clinic_id})
+        db.session.commit()
+    html = admin_client.get('/animals').get_data(as_text=True)
+    assert 'pet-renomeado' in html
+    if clinic_id:
+        assert 'Clínica Renomeada' in html
+
+
+def test_username_changes_are_never_served_stale(app, admin_client):
+    with app.app_context():
+        owner_id, clinic_user_id = db.session.execute(text(
+            'SELECT animal.dono_id, clinic.user_id FROM animal JOIN clinic ON clinic.id = animal.clinic_id '
+            'WHERE clinic.user_id IS NOT NULL ORDER BY animal.id DESC LIMIT 1'
+        )).one()
+    admin_client.get('/animals')
+    admin_client.get('/clinics')
+
+    with app.app_context():
+        db.session.execute(text("UPDATE user SET username = 'tutor-renomeado' WHERE id = :id"), {'id': owner_id})
+        db.session.execute(text("UPDATE user SET username = 'conta-renomeada' WHERE id = :id"),
+                           {'id': clinic_user_id})
+        db.session.commit()
+    assert 'tutor-renomeado' in admin_client.get('/animals').get_data(as_text=True)
+    assert 'conta-renomeada' in admin_client.get('/clinics').get_data(as_text=True)
+
+
+def test_route_writes_invalidate_rows(app, admin_client):
+    with app.app_context():
+        animal_id = db.session.scalar(text('SELECT max(id) FROM animal'))
+    admin_client.get('/animals')
+    cache = get_fragment_cache(app)
+    assert ('animal', animal_id) in cache._by_row
+    response = admin_client.post(f'/animals/{animal_id}/delete')
+    assert response.status_code == 302
+    assert ('animal', animal_id) not in cache._by_row
+
+
+def test_fragment_cache_is_lru_and_bounded():
+    cache = FragmentCache(max_bytes=2000)
+    for i in range(50):
+        cache.set(('linha', i), 'x' * 100, row=('animal', i))
+    assert cache.size <= 2000
+    assert cache.get(('linha', 0)) is None
+    assert cache.get(('linha', 49)) is not None
+    # a mais usada sobrevive à próxima inserção
+    survivor = min(key for key in cache._entries)
+    cache.get(survivor)
+    cache.set(('linha', 50), 'x' * 100, row=('animal', 50))
+    assert cache.get(survivor) is not None
+    cache.invalidate('animal', 49)
+    assert cache.get(('linha', 49)) is None
+    assert ('animal', 49) not in cache._by_row
+
+
+def test_bytecode_cache_is_written(dataset, tmp_path):
+    directory = tmp_path / 'jinja'
+    app = make_app(dataset.path, JINJA_BYTECODE_CACHE=str(directory))
+    app.jinja_env.get_template('base.html')
+    assert os.listdir(directory)
+    # outro processo (aqui, outra aplicação) carrega do disco sem recompilar
+    other = make_app(dataset.path, JINJA_BYTECODE_CACHE=str(directory))
+    assert other.jinja_env.bytecode_cache is not None
+    assert other.jinja_env.get_template('base.html').render
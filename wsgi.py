@@ -0,0 +1,10 @@
+"""Ponto de entrada para servidores WSGI (gunicorn, uWSGI, waitress).
+
+A aplicação é criada uma única vez, na importação; o esquema do banco não
+é tocado aqui (rode `python run.py init-db` no deploy). Exemplo:
+
+    WARMUP=1 gunicorn -w 4 wsgi:app
+"""
+from run import create_app
+
+app = create_app()